@@ -0,0 +1,85 @@
+"""
+Measures the gain of the ASCII fast path of Normaliser.normalise and
+Recogniser.recognise on mixes of ASCII-only and other IPA strings, by linting
+the same strings once as they are and once disguised as non-ASCII (which makes
+both methods take the general path).
+
+Usage: python benchmarks/ascii.py [num_strings]
+"""
+import random
+import sys
+import time
+
+from ipalint.ipa import Recogniser
+from ipalint.strnorm import Normaliser
+
+
+
+"""
+Strings that are ASCII-only and strings that are not, in the proportions of
+typical IPA datasets; the latter include precomposed chars that are decomposed
+by the Normaliser.
+"""
+ASCII_STRINGS = ['pata', 'kan', 'mana', 'tu ku', 'hale', 'lima', 'nalu', 'ika ']
+OTHER_STRINGS = ['pʰaːta', 'ʔakʰɔ', 'tʃɛ̃', 'ŋáma', 'ɾuβa', 'çiʃ', 'ʦa']
+
+
+
+class NonAscii(str):
+	"""
+	A str that claims not to be ASCII.
+	"""
+
+	def isascii(self):
+		return False
+
+
+
+def make_strings(num_strings, ascii_share):
+	"""
+	Returns a [] of random strings, the given share of which is ASCII-only.
+	"""
+	rand = random.Random(42)
+
+	return [rand.choice(ASCII_STRINGS if rand.random() < ascii_share else OTHER_STRINGS)
+			for _ in range(num_strings)]
+
+
+
+def lint(strings, disguise=False):
+	"""
+	Normalises and recognises the given strings and returns the time taken in
+	seconds. If the flag is set, the ASCII fast path is not taken.
+	"""
+	recog = Recogniser()
+	norm = Normaliser(recog.get_nfc_chars())
+
+	if disguise:
+		strings = [NonAscii(string) for string in strings]
+
+	start = time.perf_counter()
+
+	for line_num, string in enumerate(strings):
+		string = norm.normalise(string, line_num)
+		recog.recognise(NonAscii(string) if disguise else string, line_num)
+
+	return time.perf_counter() - start
+
+
+
+def main():
+	num_strings = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+	for ascii_share in [1.0, 0.8, 0.5, 0.2, 0.0]:
+		strings = make_strings(num_strings, ascii_share)
+
+		general = min([lint(strings, disguise=True) for _ in range(3)])
+		fast = min([lint(strings) for _ in range(3)])
+
+		print('{:>4.0%} ASCII: general {:.3f}s, fast path {:.3f}s ({:.2f}x)'.format(
+				ascii_share, general, fast, general / fast))
+
+
+
+if __name__ == '__main__':
+	main()
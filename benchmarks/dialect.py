@@ -0,0 +1,75 @@
+"""
+Compares the time it takes to determine the dialect of a large csv file using
+Reader.get_dialect against the brute-force approach of parsing the whole file
+with each candidate dialect in turn.
+
+Usage: python benchmarks/dialect.py [num_lines]
+"""
+import csv
+import os.path
+import sys
+import time
+
+from tempfile import TemporaryDirectory
+
+from ipalint.read import CSV_DELIMITERS, CSV_ESCAPECHARS, CSV_QUOTECHARS
+from ipalint.read import Reader
+
+
+
+def brute_force(file_path):
+	"""
+	The dialect detection of ipalint 0.0.1: tries each (delimiter, quotechar,
+	escapechar) permutation on all the lines of the file.
+	"""
+	with open(file_path, encoding='utf-8', newline='') as f:
+		lines = f.read().splitlines()
+
+	permuts = [(quotechar, escapechar)
+			for quotechar in CSV_QUOTECHARS
+			for escapechar in CSV_ESCAPECHARS]
+
+	for delim in CSV_DELIMITERS:
+		if min([line.count(delim) for line in lines]) == 0:
+			continue
+
+		for quotechar, escapechar in permuts:
+			reader = csv.reader(lines, delimiter=delim, quotechar=quotechar,
+						doublequote=escapechar is None, escapechar=escapechar)
+			if len(set([len(line) for line in reader])) == 1:
+				return delim, quotechar, escapechar
+
+
+
+def write_dataset(file_path, num_lines):
+	"""
+	Writes a tab-separated file the fields of which include quoted tabs and
+	backslash-escaped quotes.
+	"""
+	with open(file_path, 'w', encoding='utf-8', newline='') as f:
+		writer = csv.writer(f, delimiter='\t', doublequote=False,
+						escapechar='\\', lineterminator='\n')
+		for i in range(num_lines):
+			writer.writerow([i, 'word', 'pʰata', '"note" {}\t{}'.format(i, i % 3)])
+
+
+
+def main(num_lines=500000):
+	with TemporaryDirectory() as temp_dir:
+		file_path = os.path.join(temp_dir, 'dataset.csv')
+		write_dataset(file_path, num_lines)
+
+		start = time.perf_counter()
+		res = brute_force(file_path)
+		print('brute force: {:.3f}s {}'.format(time.perf_counter() - start, res))
+
+		start = time.perf_counter()
+		reader = Reader(file_path)
+		res = reader.get_dialect()
+		print('get_dialect: {:.3f}s {} (confidence {:.2f})'.format(
+			time.perf_counter() - start, tuple(res), reader.dialect_confidence))
+
+
+
+if __name__ == '__main__':
+	main(*map(int, sys.argv[1:]))
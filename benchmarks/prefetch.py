@@ -0,0 +1,98 @@
+"""
+Measures the gain of reading the dataset in a background thread (--prefetch)
+when reading is slow, by linting a generated file the reads of which are each
+delayed, as these would be on a network file system, with and without
+prefetching.
+
+Usage: python benchmarks/prefetch.py [num_rows] [latency_ms]
+"""
+import io
+import os.path
+import random
+import sys
+import time
+
+from tempfile import TemporaryDirectory
+
+from ipalint.core import Core
+from ipalint.read import Reader
+
+
+
+"""
+The strings the rows of the generated file are made of.
+"""
+STRINGS = ['pata', 'pʰaːta', 'ʔakʰɔ', 'tʃɛ̃', 'ŋáma', 'ɾuβa', 'çiʃ', 'ʦa', 'hale']
+
+
+
+class SlowFileIO(io.FileIO):
+	"""
+	A raw file each read of which takes the given extra time.
+	"""
+
+	latency = 0
+
+	def readinto(self, buffer):
+		time.sleep(self.latency)
+		return super().readinto(buffer)
+
+
+
+def slow_open(self, file_path=None):
+	"""
+	Replaces Reader._open, opening the file as a SlowFileIO.
+	"""
+	raw = SlowFileIO(file_path or self.file_path)
+	return io.TextIOWrapper(io.BufferedReader(raw, buffer_size=8192),
+							encoding='utf-8', newline='')
+
+
+
+def make_dataset(file_path, num_rows):
+	"""
+	Writes a TSV file with the given number of random rows.
+	"""
+	rand = random.Random(42)
+
+	with open(file_path, 'w', encoding='utf-8') as f:
+		f.write('id\tgloss\tipa\n')
+		for i in range(num_rows):
+			f.write('{}\tgloss{}\t{} {}\n'.format(i, i,
+					rand.choice(STRINGS), rand.choice(STRINGS)))
+
+
+
+def lint(file_path, prefetch):
+	"""
+	Lints the given file and returns the time taken in seconds.
+	"""
+	start = time.perf_counter()
+	Core().lint(file_path, prefetch=prefetch)
+	return time.perf_counter() - start
+
+
+
+def main():
+	num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+	latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+	Reader._open = slow_open
+
+	with TemporaryDirectory() as temp_dir:
+		file_path = os.path.join(temp_dir, 'data.tsv')
+		make_dataset(file_path, num_rows)
+
+		for ms in [0, latency / 2, latency]:
+			SlowFileIO.latency = ms / 1000
+
+			plain = min([lint(file_path, False) for _ in range(3)])
+			prefetch = min([lint(file_path, True) for _ in range(3)])
+
+			print('{:>4.1f}ms per read: plain {:.3f}s, prefetch {:.3f}s ({:.2f}x)'.format(
+					ms, plain, prefetch, plain / prefetch))
+
+
+
+if __name__ == '__main__':
+	main()
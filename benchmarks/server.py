@@ -0,0 +1,110 @@
+"""
+Measures the throughput and the latency of the lint server under concurrent
+load: a number of client threads each send single-string requests over a
+keep-alive connection, first with request batching disabled, then with the
+default batching settings, and then with batches waiting for 5ms to fill up.
+
+Usage: python benchmarks/server.py [num_clients] [requests_per_client]
+"""
+import http.client
+import json
+import os.path
+import sys
+import threading
+import time
+
+from ipalint.core import Core
+from ipalint.server import BATCH_MAX_SIZE, BATCH_MAX_WAIT, Server
+
+
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__),
+					'..', 'ipalint', 'tests', 'fixtures', 'hawaiian.txt')
+
+
+
+def load_strings():
+	"""
+	Returns the [] of IPA strings to send, taken from the Hawaiian fixture.
+	"""
+	with open(FIXTURE_PATH, encoding='utf-8') as f:
+		return [line.strip() for line in f if line.strip()]
+
+
+
+def run_client(address, strings, num_requests, latencies):
+	"""
+	Sends the given number of single-string requests, cycling through the
+	strings, and appends the latency of each request (in seconds) to the
+	given [].
+	"""
+	conn = http.client.HTTPConnection(*address)
+
+	for index in range(num_requests):
+		body = json.dumps({'string': strings[index % len(strings)]})
+
+		start = time.perf_counter()
+		conn.request('POST', '/lint', body=body.encode('utf-8'))
+		res = conn.getresponse()
+		res.read()
+		latencies.append(time.perf_counter() - start)
+
+		assert res.status == 200
+
+	conn.close()
+
+
+
+def run(core, max_size, max_wait, num_clients, num_requests):
+	"""
+	Runs a server with the given batching settings, loads it, and returns the
+	(requests per second, sorted [] of latencies) tuple.
+	"""
+	server = Server(core, ('127.0.0.1', 0), max_size, max_wait)
+	thread = threading.Thread(target=server.serve_forever)
+	thread.start()
+
+	strings = load_strings()
+	latencies = []
+
+	clients = [threading.Thread(target=run_client, args=(
+					server.server_address[:2], strings, num_requests, latencies))
+				for _ in range(num_clients)]
+
+	start = time.perf_counter()
+	for client in clients: client.start()
+	for client in clients: client.join()
+	elapsed = time.perf_counter() - start
+
+	server.shutdown()
+	server.server_close()
+	thread.join()
+
+	return len(latencies) / elapsed, sorted(latencies)
+
+
+
+def main():
+	num_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+	num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+	core = Core()
+
+	print('{} clients x {} requests'.format(num_clients, num_requests))
+
+	for label, max_size, max_wait in [
+			('no batching', 1, 0),
+			('batching', BATCH_MAX_SIZE, BATCH_MAX_WAIT),
+			('wait 5ms', BATCH_MAX_SIZE, 0.005)]:
+		rate, latencies = run(core, max_size, max_wait, num_clients, num_requests)
+
+		p50 = latencies[len(latencies) // 2]
+		p99 = latencies[int(len(latencies) * 0.99)]
+
+		print('{:12} {:8.0f} req/s  p50 {:6.2f} ms  p99 {:6.2f} ms'.format(
+				label, rate, p50 * 1000, p99 * 1000))
+
+
+
+if __name__ == '__main__':
+	main()
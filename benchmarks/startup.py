@@ -0,0 +1,84 @@
+"""
+Measures the start-up cost of the command-line interface: the cumulative
+import time of ipalint.cli as reported by python -X importtime, and the wall
+time of running ipalint --version and of linting a small file. Exits with 1 if
+the import takes longer than IMPORT_TIME_THRESHOLD.
+
+Usage: python benchmarks/startup.py [num_runs]
+"""
+import os.path
+import subprocess
+import sys
+import time
+
+
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__),
+					'..', 'ipalint', 'tests', 'fixtures', 'hawaiian.txt')
+
+ENTRY_POINT = 'import sys; from ipalint.cli import main; sys.argv[0] = "ipalint"; main()'
+
+"""
+The max cumulative time, in microseconds, that importing ipalint.cli should
+take; this is generous, it is there to catch regressions such as a heavy module
+being imported eagerly. It is not checked by the test suite, as wall times
+vary too much between machines and under load.
+"""
+IMPORT_TIME_THRESHOLD = 50000
+
+
+
+def get_import_times(module='ipalint.cli'):
+	"""
+	Returns the {module: cumulative import time in microseconds} dict for a
+	fresh interpreter importing the given module.
+	"""
+	proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+				'import {}'.format(module)], stderr=subprocess.PIPE,
+				universal_newlines=True, check=True)
+
+	times = {}
+
+	for line in proc.stderr.splitlines():
+		parts = line.split('|')
+		if len(parts) == 3 and parts[1].strip().isdigit():
+			times[parts[2].strip()] = int(parts[1])
+
+	return times
+
+
+
+def time_run(args, num_runs):
+	"""
+	Returns the best wall time of running the cli with the given args.
+	"""
+	best = None
+
+	for _ in range(num_runs):
+		start = time.perf_counter()
+		subprocess.run([sys.executable, '-c', ENTRY_POINT] + args,
+					stdout=subprocess.DEVNULL, check=True)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+
+	return best
+
+
+
+def main(num_runs=10):
+	times = get_import_times()
+	print('import ipalint.cli: {:.1f}ms'.format(times['ipalint.cli'] / 1000))
+	print('modules imported: {}'.format(', '.join(sorted(
+				[name for name in times if name.startswith('ipalint')]))))
+
+	print('ipalint --version: {:.1f}ms'.format(time_run(['--version'], num_runs) * 1000))
+	print('ipalint small.txt: {:.1f}ms'.format(time_run([FIXTURE_PATH], num_runs) * 1000))
+
+	if times['ipalint.cli'] > IMPORT_TIME_THRESHOLD:
+		print('import ipalint.cli exceeds {:.1f}ms'.format(IMPORT_TIME_THRESHOLD / 1000))
+		sys.exit(1)
+
+
+
+if __name__ == '__main__':
+	main(*map(int, sys.argv[1:]))
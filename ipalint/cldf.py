@@ -0,0 +1,168 @@
+from collections import namedtuple
+
+import logging
+import os.path
+
+
+
+"""
+The file name suffix that identifies CLDF metadata files; this is the suffix
+the CLDF spec requires, other JSON files are not taken for metadata.
+"""
+METADATA_SUFFIX = '-metadata.json'
+
+
+
+"""
+The propertyUrl and dc:conformsTo terms (without the CLDF ontology's prefix)
+that identify form tables and the column holding the segmented IPA data.
+"""
+FORM_TABLE_TERM = 'FormTable'
+SEGMENTS_TERM = 'segments'
+
+
+
+"""
+The CSVW default dialect, as specified in the W3C's Metadata Vocabulary for
+Tabular Data; individual keys can be overridden by the metadata.
+"""
+DEFAULT_DIALECT = {
+	'delimiter': ',',
+	'quoteChar': '"',
+	'doubleQuote': True,
+	'header': True
+}
+
+
+
+"""
+Represents a table referenced in a metadata file. Its attributes are the path
+to the table's csv file, the Dialect named tuple to read it with, whether the
+file has a header row, and the name (or the index, if there is no header) of
+the IPA column or None if this is not specified in the metadata.
+"""
+Table = namedtuple('Table', ['file_path', 'dialect', 'has_header', 'ipa_col'])
+
+
+
+def is_metadata(file_path):
+	"""
+	Returns True if the given path looks like a CLDF metadata file.
+	"""
+	return isinstance(file_path, str) and file_path.lower().endswith(METADATA_SUFFIX)
+
+
+
+def _has_term(value, term):
+	"""
+	Returns True if the given property URL (or list thereof) ends with the
+	given CLDF term, e.g. http://cldf.clld.org/v1.0/terms.rdf#segments.
+	"""
+	if isinstance(value, list):
+		return any([_has_term(item, term) for item in value])
+
+	return isinstance(value, str) and value.rsplit('#', maxsplit=1)[-1] == term
+
+
+
+def _get_dialect(spec):
+	"""
+	Returns the (Dialect named tuple, has header flag) tuple for the given
+	CSVW dialect description.
+
+	Helper for the read_metadata function.
+	"""
+	from ipalint.read import Dialect
+
+	spec = dict(DEFAULT_DIALECT, **spec)
+	doublequote = bool(spec['doubleQuote'])
+
+	dialect = Dialect(spec['delimiter'], spec['quoteChar'],
+				doublequote, None if doublequote else '\\')
+
+	return dialect, bool(spec['header'])
+
+
+
+def _get_columns(schema, base_dir):
+	"""
+	Returns the [] of the non-virtual column descriptions of the given CSVW
+	table schema, which is either a dict or the URL (relative to the given
+	dir) of the JSON file holding it. Raises ValueError if the schema cannot
+	be read.
+
+	Helper for the read_metadata function.
+	"""
+	import json
+
+	if isinstance(schema, str):
+		try:
+			with open(os.path.join(base_dir, schema), encoding='utf-8') as f:
+				schema = json.load(f)
+		except (OSError, ValueError):
+			raise ValueError('Could not read table schema: {}'.format(schema))
+
+	if not isinstance(schema, dict):
+		raise ValueError('Bad table schema: {}'.format(schema))
+
+	return [column for column in schema.get('columns', [])
+			if isinstance(column, dict) and not column.get('virtual')]
+
+
+
+def read_metadata(file_path):
+	"""
+	Reads the given CLDF metadata file and returns a [] of Table named
+	tuples, one for each form table. Form tables the schema of which cannot
+	be read are skipped with a warning. Raises ValueError if the file cannot
+	be read or does not describe any (readable) form tables.
+	"""
+	import json
+
+	log = logging.getLogger(__name__)
+
+	try:
+		with open(file_path, encoding='utf-8') as f:
+			metadata = json.load(f)
+	except (OSError, ValueError) as err:
+		log.error(str(err))
+		raise ValueError('Could not read metadata file: {}'.format(file_path))
+
+	if not isinstance(metadata, dict):
+		raise ValueError('Bad metadata file: {}'.format(file_path))
+
+	tables = metadata.get('tables', [metadata] if 'url' in metadata else [])
+	tables = [table for table in tables if isinstance(table, dict) and 'url' in table]
+
+	form_tables = [table for table in tables
+				if _has_term(table.get('dc:conformsTo'), FORM_TABLE_TERM)]
+
+	if not form_tables:
+		raise ValueError('No form tables found in: {}'.format(file_path))
+
+	base_dir = os.path.dirname(file_path)
+	res = []
+
+	for table in form_tables:
+		spec = dict(metadata.get('dialect', {}), **table.get('dialect', {}))
+		dialect, has_header = _get_dialect(spec)
+
+		try:
+			columns = _get_columns(table.get('tableSchema', {}), base_dir)
+		except ValueError as err:
+			log.warning('Skipping form table {}: {}'.format(table['url'], err))
+			continue
+
+		ipa_col = None
+		for index, column in enumerate(columns):
+			if _has_term(column.get('propertyUrl'), SEGMENTS_TERM):
+				ipa_col = column.get('name') if has_header else index
+				break
+
+		res.append(Table(os.path.join(base_dir, table['url']),
+						dialect, has_header, ipa_col))
+
+	if not res:
+		raise ValueError('No readable form tables found in: {}'.format(file_path))
+
+	return res
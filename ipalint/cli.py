@@ -1,33 +1,74 @@
 import argparse
+import os.path
 import sys
 
-from ipalint.core import Core
 from ipalint import __version__
 
 
 
+"""
+The escape sequence that clears the terminal, written before each report in
+watch mode if stdout is a terminal.
+"""
+CLEAR_SCREEN = '\x1b[2J\x1b[H'
+
+
+
+"""
+The commands that can be given as the first argument instead of a dataset; a
+first argument that is also the path of an existing file is linted instead.
+"""
+COMMANDS = ['merge', 'index', 'query']
+
+
+
+def positive_int(value):
+	"""
+	Returns the given command-line arg as an int. Raises ArgumentTypeError if
+	it is not a positive integer; used as an argparse type.
+	"""
+	try:
+		value = int(value)
+		assert value > 0
+	except (ValueError, AssertionError):
+		raise argparse.ArgumentTypeError(
+				'should be a positive integer: {}'.format(value))
+
+	return value
+
+
+
 class Cli:
 	"""
 	Singleton that handles the user input, inits the whole machinery, and takes
 	care of exiting the programme.
 	"""
 
-	def __init__(self):
+	def _get_parser(self):
 		"""
-		Constructor. Inits the argparse parser.
+		Returns the argparse parser of the lint command, i.e. of ipalint
+		without a command. The parsers are only built when needed, so that only
+		the parser of the command being run is built.
+
+		Helper for the run method.
 		"""
-		usage = 'ipalint dataset [options]'
+		usage = ('ipalint dataset [options]\n'
+				'       ipalint merge state [state ...] [options]\n'
+				'       ipalint index index dataset [dataset ...] [options]\n'
+				'       ipalint query index (--symbol S | --error E | --file F) [options]')
 		desc = ('simple linter that checks datasets for '
 				'IPA errors and inconsistencies')
 
-		self.parser = argparse.ArgumentParser(usage=usage,
+		parser = argparse.ArgumentParser(usage=usage,
 				description=desc, add_help=False)
 
-		input_args = self.parser.add_argument_group('dataset arguments')
+		input_args = parser.add_argument_group('dataset arguments')
 		input_args.add_argument('dataset', nargs='?', default=sys.stdin, help=(
 			'the dataset file to be linted; '
 			'if omitted, ipalint reads from stdin '
-			'(thus, ipalint X and cat X | ipalint are equivalent)'))
+			'(thus, ipalint X and cat X | ipalint are equivalent); '
+			'merge, index and query are taken as commands unless '
+			'there is a file of that name'))
 		input_args.add_argument('--col', help=(
 			'specify the column containing the IPA data; '
 			'this could be the column index (starting from 0) '
@@ -35,48 +76,379 @@ class Cli:
 		input_args.add_argument('--no-header', action='store_true', help=(
 			'do not skip the first row of the file; '
 			'if this flag is not set, the first row will be skipped'))
+		input_args.add_argument('--table', help=(
+			'the table to read from if the dataset is an SQLite database '
+			'(can be omitted if there is only one table), or the sheet if '
+			'it is an XLSX or ODS spreadsheet (by default, the first one)'))
+		input_args.add_argument('--profile', action='append', help=(
+			'use the symbols of this profile instead of the IPA; '
+			'a profile is either a tsv file listing symbols and their names '
+			'or a dir with ipa.tsv and/or common_errors.tsv files; '
+			'can be repeated to layer profiles on top of each other, '
+			'use ipa to refer to the built-in IPA data'))
+		input_args.add_argument('--diff', metavar='REF', help=(
+			'only lint the lines that have been added or modified since '
+			'the given git commit or branch; the rest of the file is '
+			'only used to determine its format (text files only)'))
+		input_args.add_argument('--line-offset', type=int, default=0,
+			metavar='N', help=(
+			'add N to the line numbers in the report; useful when '
+			'linting a shard of a larger file'))
+
+		input_args.add_argument('--watch', action='store_true', help=(
+			'keep running and print the report again whenever the dataset '
+			'changes; the dataset can also be a dir, in which case its csv, '
+			'tsv, txt, Parquet, Arrow, XLSX and ODS files are linted, each '
+			'in its own section, and only the changed files are re-linted; '
+			'--table, --diff, --line-offset, --group-by, --bad-bytes, '
+			'--prefetch, --memory-limit, --export, --dump-state and '
+			'--progress do not apply'))
+
+		input_args.add_argument('--group-by', metavar='COL', help=(
+			'lint the rows of each value of the given column (name or '
+			'index, e.g. a language ID) as a group of its own, each in its '
+			'own section of the report; the dataset is still read once'))
+
+		input_args.add_argument('--bad-bytes', action='store_true', help=(
+			'do not stop at bytes that are not valid UTF-8, but report '
+			'these (with their line numbers and byte offsets within the '
+			'lines) and lint the rest of the dataset'))
+
+		input_args.add_argument('--prefetch', action='store_true', help=(
+			'read and parse the dataset in a background thread, ahead of '
+			'the linting; useful if reading is slow, e.g. on network '
+			'file systems'))
+
+		input_args.add_argument('--memory-limit', type=positive_int, metavar='MB', help=(
+			'keep the line numbers of the errors found within roughly '
+			'this many megabytes of memory, spilling the rest to a '
+			'temporary file; useful for very large datasets'))
+
+		output_args = parser.add_argument_group('output arguments')
+		self._add_report_args(output_args)
+		output_args.add_argument('--rule', action='append', dest='rules',
+			metavar='RULE', help=(
+			'also check for violations of this rule: double-space, '
+			'other-whitespace (e.g. tabs or NBSP), leading-diacritic '
+			'(a combining diacritic without a base symbol) or '
+			'stacked-diacritics (more than two on a symbol); '
+			'can be repeated, use all to enable all the rules'))
+		output_args.add_argument('--export', metavar='FILE', help=(
+			'while linting, also write each row\'s normalised IPA string '
+			'and its space-separated segments to this tsv file; '
+			'non-IPA symbols are enclosed in angle brackets'))
+		output_args.add_argument('--dump-state', metavar='FILE', help=(
+			'instead of a report, write the errors and symbols found '
+			'to this file (gzipped if the name ends with .gz); '
+			'the files of several runs can be combined into a single '
+			'report with ipalint merge'))
+		output_args.add_argument('--metrics', metavar='FILE', help=(
+			'also write the rows and bytes read, the number of occurrences '
+			'of each error and the wall time of each stage to this file, '
+			'in the Prometheus text format; name it *.prom and put it in '
+			'the dir of node_exporter\'s textfile collector'))
+		output_args.add_argument('--progress', action='store_true', help=(
+			'while linting, periodically write the number of rows '
+			'linted per second, megabytes read per second, errors found '
+			'so far and the estimated time left to stderr'))
+
+		server_args = parser.add_argument_group('server arguments')
+		server_args.add_argument('--serve', metavar='[HOST:]PORT', help=(
+			'instead of linting a dataset, run an HTTP server that lints '
+			'the strings POST-ed to /lint as JSON, '
+			'either {"string": ...} or {"strings": [...]}; '
+			'the host defaults to 127.0.0.1; '
+			'only --profile, --rule and --ignore-* apply to the server'))
+		server_args.add_argument('--lsp', action='store_true', help=(
+			'instead of linting a dataset, run a language server '
+			'over stdin and stdout that lints the documents open in '
+			'an editor as these are edited; '
+			'--col, --no-header, --profile, --rule and --ignore-* apply'))
+
+		meta_args = parser.add_argument_group('meta arguments')
+		meta_args.add_argument('-h', '--help', action='help', help=(
+			'show this help message and exit'))
+		meta_args.add_argument('-v', '--version', action='version',
+			version=__version__,
+			help='show the version number and exit')
+
+		return parser
+
+
+	def _get_merge_parser(self):
+		"""
+		Returns the argparse parser of the merge command.
+
+		Helper for the run_merge method.
+		"""
+		parser = argparse.ArgumentParser(prog='ipalint merge',
+				usage='ipalint merge state [state ...] [options]',
+				description=('combine the files written by --dump-state '
+					'(e.g. on the shards of a dataset) into a single report'),
+				add_help=False)
+
+		merge_args = parser.add_argument_group('merge arguments')
+		merge_args.add_argument('states', nargs='+', help=(
+			'the state files to be merged'))
+
+		output_args = parser.add_argument_group('output arguments')
+		self._add_report_args(output_args)
+
+		meta_args = parser.add_argument_group('meta arguments')
+		meta_args.add_argument('-h', '--help', action='help', help=(
+			'show this help message and exit'))
+
+		return parser
+
+
+	def _get_index_parser(self):
+		"""
+		Returns the argparse parser of the index command.
+
+		Helper for the run_index method.
+		"""
+		parser = argparse.ArgumentParser(prog='ipalint index',
+				usage='ipalint index index dataset [dataset ...] [options]',
+				description=('add the symbols and errors of the given files '
+					'and dirs to an SQLite index, linting only the files '
+					'that are new or have changed since; see ipalint query'),
+				add_help=False)
+
+		index_args = parser.add_argument_group('index arguments')
+		index_args.add_argument('index_path', metavar='index', help=(
+			'the index file; created if it does not exist'))
+		index_args.add_argument('dataset', nargs='+', help=(
+			'the files and dirs to be indexed; dirs are searched for csv, '
+			'tsv, txt, Parquet, Arrow, XLSX and ODS files, and files that '
+			'are gone are removed from the index'))
+		index_args.add_argument('--col', help=(
+			'specify the column containing the IPA data; '
+			'as in ipalint itself'))
+		index_args.add_argument('--no-header', action='store_true', help=(
+			'do not skip the first row of the files'))
+		index_args.add_argument('--profile', action='append', help=(
+			'use the symbols of this profile instead of the IPA; '
+			'as in ipalint itself'))
+		index_args.add_argument('--rule', action='append', dest='rules',
+			metavar='RULE', help=(
+			'also check for violations of this rule; as in ipalint itself'))
+
+		meta_args = parser.add_argument_group('meta arguments')
+		meta_args.add_argument('-h', '--help', action='help', help=(
+			'show this help message and exit'))
+
+		return parser
+
+
+	def _get_query_parser(self):
+		"""
+		Returns the argparse parser of the query command.
+
+		Helper for the run_query method.
+		"""
+		parser = argparse.ArgumentParser(prog='ipalint query',
+				usage='ipalint query index (--symbol S | --error E | --file F) [options]',
+				description='look up an index built by ipalint index',
+				add_help=False)
+
+		query_args = parser.add_argument_group('query arguments')
+		query_args.add_argument('index_path', metavar='index', help=(
+			'the index file'))
+		lookup_args = query_args.add_mutually_exclusive_group(required=True)
+		lookup_args.add_argument('--symbol', metavar='S', help=(
+			'list the files the symbol occurs in, with the line numbers; '
+			'if several symbols are given, each is looked up'))
+		lookup_args.add_argument('--error', metavar='E', help=(
+			'list the files with errors the message of which contains '
+			'this text, ignoring case (e.g. nfd or "not part of IPA")'))
+		lookup_args.add_argument('--file', metavar='F', help=(
+			'list the errors and the inventory of IPA symbols of the file'))
 
-		output_args = self.parser.add_argument_group('output arguments')
-		output_args.add_argument('--ignore-nfd', action='store_true', help=(
+		output_args = parser.add_argument_group('output arguments')
+		output_args.add_argument('--no-lines', action='store_true', help=(
+			'only list the files or the errors and symbols, '
+			'without the line numbers'))
+		output_args.add_argument('--counts', action='store_true', help=(
+			'instead of line numbers, list the number of occurrences '
+			'and the number of lines'))
+
+		meta_args = parser.add_argument_group('meta arguments')
+		meta_args.add_argument('-h', '--help', action='help', help=(
+			'show this help message and exit'))
+
+		return parser
+
+
+	def _add_report_args(self, group):
+		"""
+		Adds the arguments that determine the contents and format of the
+		report to the given argparse argument group.
+
+		Helper for the _get_parser and _get_merge_parser methods.
+		"""
+		group.add_argument('--ignore-nfd', action='store_true', help=(
 			'ignore warnings about strings that are not compliant with '
 			'Unicode\'s NFD normal form'))
-		output_args.add_argument('--ignore-ws', action='store_true', help=(
+		group.add_argument('--ignore-ws', action='store_true', help=(
 			'ignore warnings about whitespace issues '
 			'(e.g. leading or trailing whitespace)'))
-		output_args.add_argument('--linewise', action='store_true', help=(
+		group.add_argument('--linewise', action='store_true', help=(
 			'show errors line-by-line; '
 			'by default each error is only shown once with '
 			'the offending lines\' numbers stacked together'))
-		output_args.add_argument('--no-lines', action='store_true', help=(
+		group.add_argument('--no-lines', action='store_true', help=(
 			'only show the error messages, '
 			'without the line numbers where the errors originate; '
 			'ignored if --linewise is set'))
-
-		meta_args = self.parser.add_argument_group('meta arguments')
-		meta_args.add_argument('-h', '--help', action='help', help=(
-			'show this help message and exit'))
-		meta_args.add_argument('-v', '--version', action='version',
-			version=__version__,
-			help='show the version number and exit')
+		group.add_argument('--ranges', action='store_true', help=(
+			'collapse consecutive line numbers into ranges (e.g. 3-7); '
+			'ignored if --linewise or --no-lines is set'))
+		group.add_argument('--max-lines-per-error', type=positive_int,
+			metavar='N', help=(
+			'only show the first N line numbers (or ranges) of each error, '
+			'followed by the total number of lines; '
+			'ignored if --linewise or --no-lines is set'))
+		group.add_argument('--counts', action='store_true', help=(
+			'instead of line numbers, only show how many times and '
+			'on how many lines each error occurs, followed by '
+			'the inventory of IPA symbols found in the dataset; '
+			'overrides the other output arguments, except for --ignore-*'))
 
 
 	def run(self, raw_args=None):
 		"""
 		Parses the given arguments (if these are None, then argparse's parser
 		defaults to parsing sys.argv), inits a Core instance, calls its lint
-		method with the respective arguments, and then exits.
+		method with the respective arguments, and then exits. The report is
+		written to stdout as it is being generated. If --serve or --lsp is
+		set, a lint server or a language server is run instead; if --watch is
+		set, the report is written anew whenever the dataset changes, until
+		the user interrupts the programme. If the first
+		argument is merge, index or query (and there is no such file), the rest
+		are parsed by the respective parser and the respective method of Core
+		is called instead.
+		"""
+		if raw_args is None:
+			raw_args = sys.argv[1:]
+
+		if raw_args and raw_args[0] in COMMANDS and not os.path.exists(raw_args[0]):
+			return getattr(self, 'run_' + raw_args[0])(raw_args[1:])
+
+		parser = self._get_parser()
+		args = vars(parser.parse_args(raw_args))
+		serve = args.pop('serve')
+		lsp = args.pop('lsp')
+		watch = args.pop('watch')
+
+		from ipalint.core import Core  # not needed for --help and --version
+		core = Core()
+		status = 0
+
+		try:
+			if lsp:
+				from ipalint.lsp import serve as run_lsp
+				status = run_lsp(core, col=args['col'],
+					no_header=args['no_header'], profile=args['profile'],
+					rules=args['rules'], ignore_nfd=args['ignore_nfd'],
+					ignore_ws=args['ignore_ws'])
+			elif serve:
+				from ipalint.server import serve as run_server
+				run_server(core, serve, profile=args['profile'],
+					ignore_nfd=args['ignore_nfd'], ignore_ws=args['ignore_ws'],
+					rules=args['rules'])
+			elif watch:
+				self.write_reports(core.watch(args['dataset'],
+					col=args['col'], no_header=args['no_header'],
+					profile=args['profile'], ignore_nfd=args['ignore_nfd'],
+					ignore_ws=args['ignore_ws'], rules=args['rules'],
+					linewise=args['linewise'], no_lines=args['no_lines'],
+					ranges=args['ranges'],
+					max_lines_per_error=args['max_lines_per_error'],
+					counts=args['counts']), sys.stdout)
+			else:
+				core.lint(output=sys.stdout, **args)
+		except KeyboardInterrupt:
+			pass
+		except Exception as err:
+			parser.error(str(err))
+
+		parser.exit(status)
+
+
+	def write_reports(self, reports, stream):
+		"""
+		Writes each of the given reports to the given text stream as soon as
+		it is yielded. If the stream is a terminal, it is cleared before each
+		report; otherwise the reports are separated by blank lines.
+		"""
+		is_tty = stream.isatty()
+
+		for index, report in enumerate(reports):
+			if is_tty:
+				stream.write(CLEAR_SCREEN)
+			elif index:
+				stream.write('\n')
+
+			stream.write(report + '\n' if report else '')
+			stream.flush()
+
+
+	def run_merge(self, raw_args):
+		"""
+		Parses the given arguments with the merge parser, calls Core's merge
+		method with these, and then exits.
+		"""
+		parser = self._get_merge_parser()
+		args = vars(parser.parse_args(raw_args))
+
+		from ipalint.core import Core
+		core = Core()
+
+		try:
+			core.merge(output=sys.stdout, **args)
+		except Exception as err:
+			parser.error(str(err))
+
+		parser.exit()
+
+
+	def run_index(self, raw_args):
+		"""
+		Parses the given arguments with the index parser, calls Core's index
+		method with these, and then exits.
+		"""
+		parser = self._get_index_parser()
+		args = vars(parser.parse_args(raw_args))
+
+		from ipalint.core import Core
+		core = Core()
+
+		try:
+			linted, removed = core.index(**args)
+		except Exception as err:
+			parser.error(str(err))
+
+		sys.stdout.write('{} file(s) linted, {} removed\n'.format(linted, removed))
+		parser.exit()
+
+
+	def run_query(self, raw_args):
+		"""
+		Parses the given arguments with the query parser, calls Core's query
+		method with these, and then exits.
 		"""
-		args = self.parser.parse_args(raw_args)
+		parser = self._get_query_parser()
+		args = vars(parser.parse_args(raw_args))
 
+		from ipalint.core import Core
 		core = Core()
 
 		try:
-			report = core.lint(**vars(args))
+			core.query(output=sys.stdout, **args)
 		except Exception as err:
-			self.parser.error(str(err))
+			parser.error(str(err))
 
-		print(report)
-		self.parser.exit()
+		parser.exit()
 
 
 
@@ -1,36 +1,100 @@
-import logging.config
+from collections import OrderedDict
+
+import copy
+import functools
+import itertools
 import logging
+import io
+import operator
+import os.path
+import time
+
+from ipalint.cldf import is_metadata
+
+
+
+"""
+The format of the log messages, which are output to stderr. The min log level
+is INFO, unless the verbose flag is set (see Core.__init__). Logging is set up
+by hand rather than via logging.config, as importing the latter noticeably adds
+to the start-up time.
+"""
+LOG_FORMAT = '%(message)s'
+
 
-from ipalint.ipa import Recogniser
-from ipalint.read import Reader
-from ipalint.report import Reporter
-from ipalint.strnorm import Normaliser
+
+"""
+The label of the group of the rows with an empty group column (see the lint
+method's group_by) in the section headings of the report.
+"""
+EMPTY_GROUP = '(empty)'
 
 
 
 """
-The default logging configuration to be used; it will be slightly altered if
-the verbose flag is set (see Core.__init__).
+The number of rows that are read and then passed through each stage of the
+linting together; see lint_rows. This way the clock is only checked a few times
+per chunk when collecting metrics, rather than around each function call, which
+would noticeably slow down the linting.
 """
-DEFAULT_LOGGING = {
-	'version': 1,
-	'formatters': {
-		'simple': {
-			'format': '%(message)s'
-		}
-	},
-	'handlers': {
-		'console': {
-			'class': 'logging.StreamHandler',
-			'level': logging.DEBUG,
-			'formatter': 'simple'
-		}
-	},
-	'root': {
-		'handlers': ['console'],
-		'level': logging.INFO
-	}
-}
+CHUNK_SIZE = 1024
+
+
+
+def gen_chunks(data, size=CHUNK_SIZE):
+	"""
+	Yields the items of the given iterable in lists of the given size (the
+	last one possibly shorter).
+	"""
+	data = iter(data)
+
+	while True:
+		chunk = list(itertools.islice(data, size))
+		if not chunk:
+			break
+
+		yield chunk
+
+
+
+def lint_rows(rows, recog, norm, engine=None, stages=None):
+	"""
+	Lints the given [] of (IPA string, line number) tuples with the given
+	Recogniser, Normaliser and RuleEngine (if not None), one stage after the
+	other: the strings are normalised, checked for rule violations and split
+	into symbols. Returns the [] of (normalised string, unknown symbols)
+	tuples of the rows. If stages is set to a dict (e.g. that of Metrics), the
+	time each stage takes is added to its normalise, rules and recognise keys.
+	"""
+	clock = time.perf_counter
+	timed = stages is not None
+
+	if timed:
+		start = clock()
+
+	strings = [norm.normalise(datum, line_num) for datum, line_num in rows]
+
+	if timed:
+		end = clock()
+		stages['normalise'] += end - start
+		start = end
+
+	if engine is not None:
+		for string, (datum, line_num) in zip(strings, rows):
+			engine.check(string, line_num)
+
+	if timed:
+		end = clock()
+		stages['rules'] += end - start
+		start = end
+
+	unknowns = [recog.recognise(string, line_num)[1]
+				for string, (datum, line_num) in zip(strings, rows)]
+
+	if timed:
+		stages['recognise'] += clock() - start
+
+	return list(zip(strings, unknowns))
 
 
 
@@ -45,33 +109,853 @@ class Core:
 		Constructor. Configures the logging. The verbosity flag determines
 		whether the min log level would be DEBUG or INFO.
 		"""
-		config = dict(DEFAULT_LOGGING)
+		handler = logging.StreamHandler()
+		handler.setLevel(logging.DEBUG)
+		handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
-		if verbose:
-			config['root']['level'] = logging.DEBUG
+		root = logging.getLogger()
+		for old_handler in list(root.handlers):
+			root.removeHandler(old_handler)
 
-		logging.config.dictConfig(config)
+		root.addHandler(handler)
+		root.setLevel(logging.DEBUG if verbose else logging.INFO)
 
 		self.log = logging.getLogger(__name__)
 
+		self.linters = {}  # see get_linters
+
 
-	def lint(self, dataset=None, col=None, no_header=False,
-				ignore_nfd=False, ignore_ws=False, linewise=False, no_lines=False):
+	def lint(self, dataset=None, col=None, no_header=False, table=None,
+				profile=None, diff=None, line_offset=0, ignore_nfd=False,
+				ignore_ws=False, rules=None, linewise=False, no_lines=False, ranges=False,
+				max_lines_per_error=None, counts=False, export=None,
+				dump_state=None, metrics=None, memory_limit=None, prefetch=False,
+				bad_bytes=False, group_by=None, progress=False, output=None):
 		"""
 		Returns a string containing all the issues found in the dataset
-		defined by the given file path.
+		defined by the given file path. If the latter is a CLDF metadata file,
+		all its form tables are linted, each in its own section of the report.
+		If the dataset is an SQLite database, the table arg specifies which
+		table to read from. The dataset can also be a DB-API cursor that has
+		executed a query.
+
+		The profile arg, if set, should be a list of profiles to be used
+		instead of the built-in IPA data. The diff arg, if set, should be a git
+		ref; only the lines changed since that ref are then linted. The
+		line_offset arg is added to the line numbers of the dataset (but not
+		to row keys, e.g. these of databases); useful when linting a shard of
+		a larger file.
+
+		The rules arg, if set, should be a list of names of extra checks to be
+		enabled (or all); see the rules module.
+
+		If the counts flag is set, only the number of occurrences of each error
+		and IPA symbol is kept track of and reported; memory use then does not
+		depend on the size of the dataset.
+
+		If memory_limit is set to a number of megabytes, the line numbers of
+		the errors are spilled to a temporary file once they would take more
+		than that much memory; this does not include the IPA data and the
+		symbols themselves.
+
+		If export is set to a file path, the normalised IPA strings and their
+		segments are written to that file as a side effect of linting; see the
+		export module.
+
+		If dump_state is set to a file path, the errors and symbols found are
+		written to that file instead of a report; see the merge method.
+
+		If metrics is set to a file path, the rows and bytes read, the errors
+		found and the wall time of each stage of the run are written to that
+		file in the Prometheus text format; see the metrics module.
+
+		If the prefetch flag is set, the dataset is read and parsed in a
+		background thread, a chunk of rows ahead of the linting, so that slow
+		reads (e.g. from network file systems) overlap with the linting.
+
+		If the bad_bytes flag is set, bytes that are not valid UTF-8 do not
+		stop the run; these are replaced with U+FFFD and reported as errors,
+		together with their line numbers and byte offsets within the lines.
+
+		If group_by is set to a column (name or index), the rows are grouped by
+		the value of that column (e.g. a language ID) and each group has its
+		own section in the report (and its own inventory, in counts mode),
+		unless there is nothing to report; the dataset is still read once.
+
+		If progress is set, the rows per second, megabytes per second, number
+		of errors so far and ETA are periodically written to stderr while
+		linting. It can also be set to a function, which is then called with
+		ProgressInfo named tuples instead; see the progress module.
+
+		If output is set to a text stream, the report is written directly to
+		it (one line at a time) and None is returned instead.
+		"""
+		from ipalint.ipa import Recogniser
+		from ipalint.rules import RuleEngine
+		from ipalint.spill import ITEM_SIZE, SORT_LIMIT, SpillStore
+		from ipalint.strnorm import Normaliser
+
+		if metrics:
+			from ipalint.metrics import Metrics
+			collector = Metrics()
+		else:
+			collector = None
+
+		if memory_limit and not counts:
+			store = SpillStore(max(memory_limit * 2**20 // ITEM_SIZE, 1))
+		else:
+			store = None
+
+		recog = Recogniser(profiles=profile, counts=counts, store=store)
+		norm = Normaliser(nfc_chars=recog.get_nfc_chars(),
+						counts=counts, store=store)
+		engine = RuleEngine(rules or [], counts=counts, store=store)
+
+		if collector:
+			collector.add_time('load', collector.started)
+
+		readers = self._get_readers(dataset, col, no_header, table, bad_bytes,
+									group_by)
+		groups = {}  # group: (Recogniser, Normaliser, RuleEngine)
+
+		report_args = (ignore_nfd, ignore_ws,
+			linewise, no_lines, ranges, max_lines_per_error, counts)
+		stream = io.StringIO() if output is None else output
+		sources = []  # for dump_state
+
+		if export:
+			from ipalint.export import Exporter
+			exporter = Exporter(export)
+		else:
+			exporter = None
+
+		if progress:
+			from ipalint.progress import Progress, write_progress
+			import sys
+
+			tracker = Progress(
+				progress if callable(progress) else write_progress(sys.stderr),
+				lambda: sum([r.count_errors() + e.count_errors()
+						+ n.count_errors(ignore_nfd, ignore_ws)
+						for r, n, e in [(recog, norm, engine)] + list(groups.values())]))
+		else:
+			tracker = None
+
+		num_sections = 0
+
+		try:
+			for heading, reader in readers:
+				if tracker:
+					tracker.start(reader, heading if len(readers) > 1 else None)
+
+				changed = self._get_changed_lines(reader, diff) if diff else None
+				data = self._get_data(reader, changed, line_offset, prefetch)
+
+				if exporter and len(readers) > 1:
+					write = functools.partial(self._export_row, exporter, heading)
+				else:
+					write = exporter.write if exporter else None
+
+				if collector:
+					collector.start_source(heading)
+
+				if group_by is None:
+					runs = [(None, data)]
+				else:
+					runs = self._gen_group_runs(data)
+
+				for group, rows in runs:
+					if group_by is None:
+						linters = recog, norm, engine
+					elif group in groups:
+						linters = groups[group]
+					else:
+						linters = groups[group] = self._copy_linters(recog, norm, engine)
+
+					if collector:
+						collector.lint_rows(rows, *linters, write=write,
+							update=tracker.update if tracker else None)
+						continue
+
+					for chunk in gen_chunks(rows):
+						results = lint_rows(chunk, *linters)
+
+						if write:
+							for (datum, line_num), (string, unknown) in zip(chunk, results):
+								write(line_num, string, unknown)
+
+						if tracker:
+							for row in chunk:
+								tracker.update()
+
+				if tracker:
+					tracker.finish()
+
+				for message, lines in reader.get_bad_bytes(line_offset, changed):
+					norm.add_bad_bytes(message, lines)
+
+				if collector:
+					collector.set_bytes(reader.get_position())
+					start = time.perf_counter()
+
+				source = heading if len(readers) > 1 else None
+
+				if group_by is None:
+					sections = [(source, None, (recog, norm, engine))]
+				else:
+					sections = [(self._get_group_heading(group, source),
+								str(group), groups[group])
+								for group in sorted(groups, key=str)]
+					if norm.byte_errors:  # these are not part of any group
+						sections.insert(0, (source, None, (recog, norm, engine)))
+
+				if store and store.f is not None:  # leave the budget to the sorting
+					store.flush()
+
+				sort_limit = store.limit if store else SORT_LIMIT
+
+				for section_heading, group, linters in sections:
+					if dump_state:
+						from ipalint.state import get_source_state
+						sources.append(get_source_state(*linters,
+											section_heading, group, source))
+					else:
+						rep = self._write_section(stream, *linters, section_heading,
+									num_sections, sort_limit, *report_args,
+									skip_empty=group is not None)
+						if rep is not None:
+							num_sections += 1
+
+					if collector:
+						collector.add_errors(*linters, ignore_nfd, ignore_ws)
+
+				if collector:
+					collector.add_time('report', start)
+
+				recog.clear()
+				norm.clear()
+				engine.clear()
+				groups.clear()
+
+			if dump_state:
+				from ipalint.state import write_state
+				write_state(dump_state, sources, profile,
+						[rule.name for rule in engine.rules], counts)
+
+			if collector:
+				collector.write(metrics)
+
+		finally:
+			if exporter:
+				exporter.close()
+			if store:
+				store.close()
+
+		if output is None:
+			return stream.getvalue().rstrip('\n')
+
+
+	def _get_group_heading(self, group, file_heading=None):
+		"""
+		Returns the heading of the report section of the given group of rows
+		of the file with the given heading (None if there is only one file).
+		The group of the rows with an empty group column is labelled as such.
+
+		Helper for the lint and merge methods.
+		"""
+		label = str(group) if str(group) else EMPTY_GROUP
+
+		if file_heading is None:
+			return label
+
+		return '{} ({})'.format(file_heading, label)
+
+
+	def _gen_group_runs(self, data):
+		"""
+		Yields a (group, generator of (IPA string, line number) tuples) tuple
+		for each run of consecutive rows of the same group in the given data,
+		which should yield (IPA string, line number, group) tuples. Each run's
+		generator should be exhausted before moving on to the next run.
+
+		Helper for the lint method.
+		"""
+		for group, rows in itertools.groupby(data, operator.itemgetter(2)):
+			yield group, ((datum, line_num) for datum, line_num, _ in rows)
+
+
+	def _copy_linters(self, recog, norm, engine):
+		"""
+		Returns a copy of the given (Recogniser, Normaliser, RuleEngine) tuple
+		that shares the loaded data (e.g. the IPA data and the compiled rules)
+		but not the errors and symbols collected, so that a group of rows can be
+		linted separately without loading the data again.
+
+		Helper for the lint method.
 		"""
-		reader = Reader(dataset, has_header=not no_header, ipa_col=col)
+		linters = tuple([copy.copy(linter) for linter in (recog, norm, engine)])
 
-		recog = Recogniser()
-		norm = Normaliser(nfc_chars=recog.get_nfc_chars())
+		for linter in linters:
+			linter.clear()
+
+		return linters
+
+
+	def _export_row(self, exporter, heading, line_num, ipa_string, unknown):
+		"""
+		Writes a row to the given Exporter, prefixing the line number with the
+		heading of the source.
+
+		Helper for the lint method.
+		"""
+		exporter.write('{}:{}'.format(heading, line_num), ipa_string, unknown)
+
+
+	def merge(self, states, ignore_nfd=False, ignore_ws=False, linewise=False,
+				no_lines=False, ranges=False, max_lines_per_error=None,
+				counts=False, output=None):
+		"""
+		Returns the report of the combined state files written by the lint
+		method's dump_state option, e.g. by linting the shards of a dataset on
+		different machines (using line_offset so that the line numbers are
+		these of the whole dataset). The report is the same as the one of
+		linting the whole dataset at once. The rest of the args are as these of
+		the lint method.
+
+		Raises ValueError if a file cannot be read, if the files were dumped
+		using different profiles, or if counts is not set but some of the files
+		were dumped with counts.
+		"""
+		from ipalint.ipa import Recogniser
+		from ipalint.rules import RuleEngine
+		from ipalint.spill import SORT_LIMIT
+		from ipalint.state import load_source_state, read_state
+		from ipalint.strnorm import Normaliser
+
+		states = [read_state(file_path) for file_path in states]
+
+		profiles = set([tuple(state.get('profile') or ()) for state in states])
+		if len(profiles) > 1:
+			raise ValueError('The states were dumped using different profiles')
+
+		if not counts and any([state.get('counts') for state in states]):
+			raise ValueError('Some of the states only have counts, use --counts')
+
+		profile = list(profiles.pop()) if profiles else None
+
+		rules = []
+		for state in states:
+			rules.extend([name for name in state.get('rules', []) if name not in rules])
+
+		recog = Recogniser(profiles=profile, counts=counts)
+		norm = Normaliser(counts=counts)
+		engine = RuleEngine(rules, counts=counts)
+
+		headings = OrderedDict()  # heading: (file heading, group)
+		for state in states:
+			for source in state.get('sources', []):
+				heading = source.get('heading')
+				if heading not in headings:
+					headings[heading] = (source.get('file', heading),
+										source.get('group'))
+
+		files = []
+		for file_heading, group in headings.values():
+			if file_heading not in files:
+				files.append(file_heading)
+
+		# the order of the sections of the lint method: by file and then by
+		# group, with the section of the file's bad bytes before its groups
+		sections = sorted(headings.items(), key=lambda item: (
+			files.index(item[1][0]), item[1][1] is not None, str(item[1][1])))
+
+		report_args = (ignore_nfd, ignore_ws,
+			linewise, no_lines, ranges, max_lines_per_error, counts)
+		stream = io.StringIO() if output is None else output
+		num_sections = 0
+
+		for heading, (file_heading, group) in sections:
+			for state in states:
+				for source in state.get('sources', []):
+					if source.get('heading') == heading:
+						load_source_state(recog, norm, engine, source)
+
+			if group is not None:  # relabel the empty group of older states
+				heading = self._get_group_heading(group, file_heading)
+
+			rep = self._write_section(stream, recog, norm, engine, heading,
+								num_sections, SORT_LIMIT, *report_args,
+								skip_empty=group is not None)
+			if rep is not None:
+				num_sections += 1
+
+			recog.clear()
+			norm.clear()
+			engine.clear()
+
+		if output is None:
+			return stream.getvalue().rstrip('\n')
+
+
+	def watch(self, dataset, col=None, no_header=False, profile=None,
+				ignore_nfd=False, ignore_ws=False, rules=None, linewise=False,
+				no_lines=False, ranges=False, max_lines_per_error=None,
+				counts=False, interval=None):
+		"""
+		Yields the report of the given dataset, a file or a dir (or a [] of
+		such), and then yields it again each time some of its files change.
+		Dirs are watched recursively for files with one of the extensions in
+		watch.WATCH_EXTENSIONS. Never stops on its own.
+
+		Only the changed files are re-linted, using the same warm Recogniser,
+		Normaliser and RuleEngine; the report sections of the rest are kept
+		from before. If there are several files, each has its own section and
+		the files without errors are left out. If a file cannot be linted (e.g.
+		because it is being written), its section is the error message. The
+		form tables of CLDF metadata files are watched too, a change to any of
+		these re-linting the metadata file.
+
+		The interval, if set, is the number of seconds between two scans if
+		the files have to be polled, i.e. if inotify is not available. The rest
+		of the args are as these of the lint method.
+		"""
+		from ipalint.watch import Watcher
 
-		for ipa_string, line_num in reader.gen_ipa_data():
-			ipa_string = norm.normalise(ipa_string, line_num)
-			recog.recognise(ipa_string, line_num)
+		paths = dataset if isinstance(dataset, list) else [dataset]
+		if not all([isinstance(path, str) for path in paths]):
+			raise ValueError('Only files and dirs can be watched')
 
-		rep = Reporter()
+		linters = self.get_linters(profile, rules, counts)
+		report_args = (ignore_nfd, ignore_ws,
+			linewise, no_lines, ranges, max_lines_per_error, counts)
+
+		watcher = Watcher(paths) if interval is None else Watcher(paths, interval)
+		sections = {}  # file path: [] of (heading, section)
+
+		try:
+			for changed, removed in watcher.gen_changes():
+				for file_path in removed:
+					del sections[file_path]
+
+				for file_path in changed:
+					sections[file_path] = self._lint_file(file_path, col,
+											no_header, *linters, *report_args)
+					if is_metadata(file_path):
+						watcher.set_deps(file_path, self._get_table_paths(file_path))
+
+				self.log.debug('Re-linted {} file(s)'.format(len(changed)))
+
+				sections_list = [section for file_path in sorted(sections)
+										for section in sections[file_path]]
+
+				if len(sections_list) == 1:
+					yield sections_list[0][1]
+				else:
+					yield '\n\n'.join(['==> {} <==\n{}'.format(heading, section)
+								for heading, section in sections_list if section])
+
+		finally:
+			watcher.close()
+
+
+	def _lint_file(self, file_path, col, no_header, recog, norm, engine,
+					*report_args):
+		"""
+		Lints the given file with the given Recogniser, Normaliser and
+		RuleEngine and returns the [] of (heading, report section) tuples; this
+		is a single tuple unless the file is a CLDF metadata file. The report
+		args are as in the _write_section method.
+
+		Helper for the watch method.
+		"""
+		from ipalint.spill import SORT_LIMIT
+
+		try:
+			readers = self._get_readers(file_path, col, no_header)
+			sections = []
+
+			for heading, reader in readers:
+				try:
+					self._lint_reader(reader, recog, norm, engine)
+
+					stream = io.StringIO()
+					self._write_section(stream, recog, norm, engine, None, 0,
+										SORT_LIMIT, *report_args)
+				finally:
+					recog.clear()
+					norm.clear()
+					engine.clear()
+
+				sections.append((heading, stream.getvalue().rstrip('\n')))
+
+		except Exception as err:
+			return [(file_path, 'Could not lint the file: {}'.format(err))]
+
+		return sections
+
+
+	def _get_table_paths(self, file_path):
+		"""
+		Returns the [] of the paths of the form tables of the given CLDF
+		metadata file; this is empty if the metadata cannot be read.
+
+		Helper for the watch method.
+		"""
+		from ipalint.cldf import read_metadata
+
+		try:
+			return [table.file_path for table in read_metadata(file_path)]
+		except ValueError:
+			return []
+
+
+	def _lint_reader(self, reader, recog, norm, engine):
+		"""
+		Lints the data of the given Reader instance with the given Recogniser,
+		Normaliser and RuleEngine, which are not cleared afterwards.
+
+		Helper for the _lint_file and index methods.
+		"""
+		for chunk in gen_chunks(self._get_data(reader)):
+			lint_rows(chunk, recog, norm, engine)
+
+
+	def index(self, index_path, dataset, col=None, no_header=False,
+				profile=None, rules=None):
+		"""
+		Adds the symbols and errors of the given dataset, a file or a dir (or
+		a [] of such), to the SQLite index at the given path, which is created
+		if it does not exist; see the query method. Dirs are searched for
+		files as in the watch method.
+
+		The index is updated incrementally: only the files that are new or the
+		contents of which have changed since the last update are linted, and
+		the files that are gone are removed. The files that cannot be linted
+		are logged and left out. Returns the (number of files linted, number
+		of files removed) tuple.
+
+		Raises ValueError if the index cannot be opened or if it was built
+		with other profiles or rules.
+		"""
+		from ipalint.index import Index
+		from ipalint.watch import Watcher
+
+		paths = dataset if isinstance(dataset, list) else [dataset]
+		if not all([isinstance(path, str) for path in paths]):
+			raise ValueError('Only files and dirs can be indexed')
+
+		paths = [os.path.abspath(path) for path in paths]
+
+		index = Index(index_path)
+
+		try:
+			index.set_settings(profile, rules)
+			recog, norm, engine = self.get_linters(profile, rules)
+
+			watcher = Watcher(paths, use_inotify=False)
+			watcher.files = indexed = index.get_signatures(paths)
+
+			changed, removed = watcher.scan()
+
+			for file_path in removed:
+				index.remove_file(file_path)
+
+			for file_path, signature in watcher.files.items():
+				if file_path in indexed and file_path not in changed \
+						and signature != indexed[file_path]:
+					index.set_signature(file_path, signature)
+
+			for file_path in changed:
+				try:
+					for heading, reader in self._get_readers(file_path, col, no_header):
+						self._lint_reader(reader, recog, norm, engine)
+
+					index.add_file(file_path, watcher.files[file_path],
+									recog, norm, engine)
+				except Exception as err:
+					self.log.warning('Could not index {}: {}'.format(file_path, err))
+					index.remove_file(file_path)
+				finally:
+					recog.clear()
+					norm.clear()
+					engine.clear()
+
+		finally:
+			index.close()
+
+		return len(changed), len(removed)
+
+
+	def query(self, index_path, symbol=None, error=None, file=None,
+				no_lines=False, counts=False, output=None):
+		"""
+		Looks up the index built by the index method and returns the report of
+		one of the following, depending on which arg is set: the files the
+		given symbol occurs in (if several symbols are given, each has its own
+		section); the files with an error the message of which contains the
+		given text, ignoring case (e.g. nfd); or the errors and the inventory of
+		IPA symbols of the given file.
+
+		The lines of each entry are listed as ranges, unless no_lines is set.
+		If counts is set, the number of occurrences and lines are listed
+		instead. If output is set to a text stream, the report is written to
+		it and None is returned instead.
+
+		Raises ValueError if the index does not exist or if the file is not
+		in the index.
+		"""
+		from ipalint.index import Index
+		from ipalint.report import format_counts
+
+		if not os.path.exists(index_path):
+			raise ValueError('No such index: {}'.format(index_path))
+
+		index = Index(index_path)
+		sections = []  # (heading, [] of (desc, occurrences, rows, lines))
+
+		try:
+			if symbol:
+				for char in sorted(set(symbol) - set(' ')):
+					rows = index.find_symbol(char)
+					heading = char
+					if rows:
+						heading = '{} ({}) {}'.format(char, rows[0][1],
+									rows[0][2] or 'is not part of IPA')
+					sections.append((heading, [(os.path.relpath(row[0]),) + row[3:]
+											for row in rows]))
+
+			elif error:
+				for message, path, *row in index.find_error(error):
+					if not sections or sections[-1][0] != message:
+						sections.append((message, []))
+					sections[-1][1].append((os.path.relpath(path),) + tuple(row))
+
+			elif file:
+				errors, symbols = index.get_inventory(os.path.abspath(file))
+				if errors:
+					sections.append((None, errors))
+
+				inventory = [('{} ({}) {}'.format(char, name, ipa_name),) + tuple(row)
+							for char, name, ipa_name, *row in symbols if ipa_name]
+				if inventory:
+					sections.append((None, inventory))
+
+			else:
+				raise ValueError('Nothing to look up')
+
+		finally:
+			index.close()
+
+		stream = io.StringIO() if output is None else output
+
+		for num, (heading, entries) in enumerate(sections):
+			if num:
+				stream.write('\n')
+
+			if heading is not None and len(sections) > 1:
+				stream.write('==> {} <==\n'.format(heading))
+
+			for desc, occurrences, rows, lines in entries:
+				if counts:
+					stream.write('{} ← {}\n'.format(
+									desc, format_counts(occurrences, rows)))
+				elif no_lines:
+					stream.write(desc + '\n')
+				else:
+					stream.write('{} ← {}\n'.format(desc, lines))
+
+		if output is None:
+			return stream.getvalue().rstrip('\n')
+
+
+	def _write_section(self, stream, recog, norm, engine, heading=None,
+				index=0, sort_limit=None, ignore_nfd=False, ignore_ws=False,
+				linewise=False, no_lines=False, ranges=False,
+				max_lines_per_error=None, counts=False, skip_empty=False):
+		"""
+		Writes the report of the errors (and, in counts mode, the symbols)
+		collected by the given Recogniser, Normaliser and RuleEngine to the
+		given stream and returns the Reporter instance used.
+		If heading is set, the report is preceded by a section heading; the
+		index is that of the section. If skip_empty is set and there is
+		nothing to report, nothing is written and None is returned.
+
+		Helper for the lint and merge methods.
+		"""
+		rep = self._get_reporter(recog, norm, engine, sort_limit,
+								ignore_nfd, ignore_ws, counts)
+
+		if skip_empty and not rep.errors and not (counts and rep.symbols):
+			return None
+
+		if heading is not None:
+			stream.write('{}==> {} <==\n'.format('\n' if index else '', heading))
+
+		rep.write_report(stream, linewise, no_lines, ranges,
+						max_lines_per_error, counts)
+
+		return rep
+
+
+	def _get_reporter(self, recog, norm, engine, sort_limit=None,
+						ignore_nfd=False, ignore_ws=False, counts=False):
+		"""
+		Returns a Reporter instance with the errors (and, in counts mode, the
+		symbols) collected by the given Recogniser, Normaliser and RuleEngine.
+
+		Helper for the lint and _write_section methods.
+		"""
+		from ipalint.report import Reporter
+
+		rep = Reporter(sort_limit) if sort_limit else Reporter()
 		norm.report(rep, ignore_nfd, ignore_ws)
-		recog.report(rep)
+		engine.report(rep)
+		recog.report(rep, inventory=counts)
+
+		return rep
+
+
+	def get_linters(self, profile=None, rules=None, counts=False):
+		"""
+		Returns a (Recogniser, Normaliser, RuleEngine) tuple for the given
+		profiles, rules and counts flag. The tuple is created on the first call
+		and then kept around, so that the IPA data is only loaded once; the
+		accumulators are cleared after each use by lint_strings and watch.
+		"""
+		from ipalint.ipa import Recogniser
+		from ipalint.rules import RuleEngine
+		from ipalint.strnorm import Normaliser
+
+		key = tuple(profile or ()), tuple(rules or ()), counts
+
+		if key not in self.linters:
+			recog = Recogniser(profiles=profile, counts=counts)
+			norm = Normaliser(nfc_chars=recog.get_nfc_chars(), counts=counts)
+			engine = RuleEngine(rules or [], counts=counts)
+			self.linters[key] = recog, norm, engine
+
+		return self.linters[key]
+
+
+	def lint_strings(self, strings, profile=None, ignore_nfd=False,
+						ignore_ws=False, rules=None):
+		"""
+		Lints the given [] of strings as a batch and returns a [] of dicts, one
+		per string, each with the keys string, normalised (the normalised
+		string), and errors (the [] of error messages). Unlike the lint method,
+		this reuses the same Recogniser, Normaliser and RuleEngine across
+		calls; it is not thread-safe.
+		"""
+		from ipalint.report import Reporter
+
+		recog, norm, engine = self.get_linters(profile, rules)
+
+		results = []
+
+		try:
+			rows = [(string, index) for index, string in enumerate(strings)]
+
+			for string, (normalised, unknown) in zip(strings,
+									lint_rows(rows, recog, norm, engine)):
+				results.append({
+					'string': string, 'normalised': normalised, 'errors': []})
+
+			rep = Reporter()
+			norm.report(rep, ignore_nfd, ignore_ws)
+			engine.report(rep)
+			recog.report(rep)
+
+		finally:
+			recog.clear()
+			norm.clear()
+			engine.clear()
+
+		for error, lines in rep.errors.items():
+			for index in sorted(set(lines)):
+				results[index]['errors'].append(error.string)
+
+		return results
+
+
+	def _get_changed_lines(self, reader, diff):
+		"""
+		Returns the diff.LineRanges of the lines of the given Reader's file
+		that have been changed since the given git ref, or None if all its
+		lines are new. Raises ValueError if the Reader cannot be diffed.
+
+		Helper for the lint method.
+		"""
+		if not reader.is_text():
+			raise ValueError('--diff is only supported for text files')
+
+		if reader.temp_dir:
+			raise ValueError('Cannot use a git diff when reading from stdin')
+
+		from ipalint.diff import get_changed_lines
+		return get_changed_lines(reader.file_path, diff)
+
+
+	def _get_data(self, reader, changed=None, line_offset=0, prefetch=False):
+		"""
+		Returns the generator of (IPA string, line number) tuples of the given
+		Reader instance. If changed is set to a diff.LineRanges (see
+		_get_changed_lines), only the rows on these lines are included. The
+		line offset is added to the (integer) line numbers, but not to row keys
+		(see Reader.has_row_keys). If the prefetch flag is set, the data is
+		read in a background thread; see read.gen_prefetched.
+
+		Helper for the lint method.
+		"""
+		data = reader.gen_ipa_data()
+
+		if changed is not None:
+			data = changed.filter(data)
+
+		if line_offset and not reader.has_row_keys():
+			data = ((datum, line_num + line_offset
+					if isinstance(line_num, int) else line_num, *rest)
+					for datum, line_num, *rest in data)
+
+		if prefetch:
+			if reader.cursor is not None:  # cursors may be bound to their thread
+				self.log.debug('Not prefetching from a DB-API cursor')
+			else:
+				from ipalint.read import gen_prefetched
+				data = gen_prefetched(data)
+
+		return data
+
+
+	def _get_readers(self, dataset, col=None, no_header=False, table=None,
+						bad_bytes=False, group_by=None):
+		"""
+		Returns a [] of (heading, Reader instance) tuples for the given dataset.
+		This is a single tuple, unless the dataset is a CLDF metadata file, in
+		which case there is one tuple per form table. The column and header
+		arguments, if set, override the ones specified in the metadata.
+
+		Helper for the lint method.
+		"""
+		from ipalint.read import Reader
+
+		if not is_metadata(dataset):
+			reader = Reader(dataset, has_header=not no_header, ipa_col=col,
+							table=table, group_col=group_by, bad_bytes=bad_bytes)
+			return [(dataset, reader)]
+
+		from ipalint.cldf import read_metadata
+
+		readers = []
+
+		for table in read_metadata(dataset):
+			reader = Reader(table.file_path,
+					has_header=table.has_header and not no_header,
+					ipa_col=col if col is not None else table.ipa_col,
+					delimiter=table.dialect.delimiter,
+					quotechar=table.dialect.quotechar,
+					escapechar=table.dialect.escapechar,
+					group_col=group_by, bad_bytes=bad_bytes)
+
+			readers.append((os.path.relpath(table.file_path), reader))
 
-		return rep.get_report(linewise, no_lines)
+		return readers
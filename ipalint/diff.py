@@ -0,0 +1,150 @@
+import bisect
+import logging
+import os.path
+import re
+import subprocess
+
+
+
+"""
+Regex matching the hunk headers of a unified diff; the groups capture the
+start line and the line count of the new version of the hunk.
+"""
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@', re.MULTILINE)
+
+
+
+class LineRanges:
+	"""
+	A sorted collection of (first, last) ranges of line numbers, both ends
+	inclusive, that can be efficiently checked for membership.
+	"""
+
+	def __init__(self, ranges):
+		"""
+		Constructor. Expects an iterable of non-overlapping (first, last)
+		tuples.
+		"""
+		ranges = sorted(ranges)
+
+		self.firsts = [first for first, last in ranges]
+		self.lasts = [last for first, last in ranges]
+
+
+	def __contains__(self, line_num):
+		"""
+		Returns True if the given line number is within one of the ranges.
+		"""
+		index = bisect.bisect_right(self.firsts, line_num) - 1
+		return index >= 0 and line_num <= self.lasts[index]
+
+
+	def __len__(self):
+		"""
+		Returns the number of ranges.
+		"""
+		return len(self.firsts)
+
+
+	def overlaps(self, first, last):
+		"""
+		Returns True if any of the lines from first to last (both inclusive)
+		is within one of the ranges.
+		"""
+		index = bisect.bisect_right(self.firsts, last) - 1
+		return index >= 0 and first <= self.lasts[index]
+
+
+	def filter(self, data):
+		"""
+		Yields those of the given (datum, line number) tuples (as yielded by
+		Reader.gen_ipa_data, possibly with further elements) any line of which
+		falls within the ranges. The line number of a row is that of its last
+		line, so a row is taken to span the lines after the previous row's;
+		this way a record spanning multiple lines is matched by a change on
+		any of these. Stops iterating over the data once the last range is
+		passed.
+		"""
+		if not self.lasts:
+			return
+
+		end = self.lasts[-1]
+		prev = 0
+
+		for row in data:
+			first, prev = prev + 1, row[1]
+
+			if first > end:
+				break
+
+			if self.overlaps(first, row[1]):
+				yield row
+
+
+
+def parse_diff(diff):
+	"""
+	Returns the LineRanges of the added or modified lines in the new version
+	of the file, given the latter's unified diff as a string.
+	"""
+	ranges = []
+
+	for match in HUNK_HEADER.finditer(diff):
+		start = int(match.group(1))
+		count = int(match.group(2)) if match.group(2) is not None else 1
+
+		if count:
+			ranges.append((start, start + count - 1))
+
+	return LineRanges(ranges)
+
+
+
+def _run_git(args, cwd):
+	"""
+	Runs git with the given args in the given dir and returns its stdout.
+	Raises ValueError if git cannot be run or exits with an error.
+
+	Helper for the get_changed_lines function.
+	"""
+	try:
+		proc = subprocess.run(['git'] + args, cwd=cwd,
+					stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+	except OSError as err:
+		logging.getLogger(__name__).error(str(err))
+		raise ValueError('Could not run git')
+
+	if proc.returncode:
+		raise ValueError(proc.stderr.decode('utf-8', 'replace').strip()
+					or 'git exited with {}'.format(proc.returncode))
+
+	return proc.stdout.decode('utf-8', 'replace')
+
+
+
+def get_changed_lines(file_path, ref):
+	"""
+	Returns the LineRanges of the lines of the given file that have been added
+	or modified since the given git ref (commit, branch, etc.), or None if the
+	file is not tracked by git (i.e. all its lines are new). Raises ValueError
+	if the file is not within a git repo or if the ref is not valid.
+	"""
+	file_path = os.path.abspath(file_path)
+	cwd, name = os.path.split(file_path)
+
+	try:
+		_run_git(['rev-parse', '--verify', '--quiet', ref + '^{commit}'], cwd)
+	except ValueError as err:
+		if 'fatal' in str(err):
+			raise
+		raise ValueError('Could not find git ref: {}'.format(ref))
+
+	try:
+		_run_git(['ls-files', '--error-unmatch', '--', name], cwd)
+	except ValueError:
+		return None
+
+	diff = _run_git(['diff', '--no-color', '--no-ext-diff', '--unified=0',
+					ref, '--', name], cwd)
+
+	return parse_diff(diff)
@@ -0,0 +1,141 @@
+import csv
+import logging
+import unicodedata
+
+from ipalint.ipa import SPACE
+
+
+
+"""
+The chars that join the symbols on both of their sides into one segment.
+"""
+TIE_BARS = ['͡', '͜']
+
+
+
+"""
+Modifier letters that do not modify the preceding symbol and thus should form
+segments of their own: the stress marks and the downstep and upstep arrows.
+"""
+STANDALONE_MODIFIERS = ['ˈ', 'ˌ', 'ꜜ', 'ꜛ']
+
+
+
+"""
+The Chao tone letters; consecutive tone letters form a single segment.
+"""
+TONE_LETTERS = ['˥', '˦', '˧', '˨', '˩']
+
+
+
+"""
+The segment that word boundaries (i.e. spaces) are exported as.
+"""
+WORD_BOUNDARY = '_'
+
+
+
+"""
+Format string for exporting unknown (i.e. non-IPA) symbols.
+"""
+UNKNOWN_TEMPL = '<{}>'
+
+
+
+"""
+The column names of the export file.
+"""
+EXPORT_HEADER = ['line', 'ipa', 'segments']
+
+
+
+class Exporter:
+	"""
+	Writes the normalised IPA strings and their segments to a tsv file, one
+	row at a time, while the dataset is being linted.
+	"""
+
+	def __init__(self, file_path):
+		"""
+		Constructor. Opens the export file, overwriting it if it exists. Raises
+		ValueError if the file cannot be opened.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		try:
+			self.f = open(file_path, 'w', encoding='utf-8', newline='')
+		except OSError as err:
+			self.log.error(str(err))
+			raise ValueError('Could not open file: {}'.format(file_path))
+
+		self.writer = csv.writer(self.f, dialect='excel-tab', lineterminator='\n')
+		self.writer.writerow(EXPORT_HEADER)
+
+
+	def _is_attached(self, char, prev):
+		"""
+		Returns True if the given char belongs to the same segment as the char
+		preceding it (the second arg).
+
+		Helper for the segment method.
+		"""
+		if char in TONE_LETTERS:
+			return prev in TONE_LETTERS
+
+		if unicodedata.combining(char):
+			return True
+
+		category = unicodedata.category(char)
+
+		if category == 'Lm':
+			return char not in STANDALONE_MODIFIERS
+
+		return category == 'Sk'
+
+
+	def segment(self, string, unknown=()):
+		"""
+		Splits the given normalised IPA string into segments and returns these
+		as a list. A segment is a base symbol together with the diacritics and
+		modifiers following it; tied symbols form a single segment. Spaces are
+		turned into WORD_BOUNDARY segments. The chars in the optional second
+		arg are marked as unknown.
+		"""
+		segments = []
+		prev = None
+
+		for char in string:
+			if char == SPACE:
+				segments.append(WORD_BOUNDARY)
+				prev = None
+				continue
+
+			text = UNKNOWN_TEMPL.format(char) if char in unknown else char
+
+			if prev is not None and (prev in TIE_BARS or self._is_attached(char, prev)):
+				segments[-1] += text
+			else:
+				segments.append(text)
+
+			prev = char
+
+		return segments
+
+
+	def write(self, line_num, string, unknown=()):
+		"""
+		Writes a row comprising the line number, the normalised IPA string and
+		its space-separated segments. The last arg should be the tuple of
+		UnknownSymbol named tuples returned by Recogniser.recognise.
+		"""
+		unknown = set([symbol.char for symbol in unknown])
+		segments = self.segment(string, unknown)
+
+		self.writer.writerow([line_num, string, ' '.join(segments)])
+
+
+	def close(self):
+		"""
+		Closes the export file.
+		"""
+		self.f.close()
@@ -0,0 +1,268 @@
+import json
+import logging
+import os.path
+import sqlite3
+
+from ipalint.report import gen_ranges, Reporter
+from ipalint.spill import gen_sorted, gen_unique
+from ipalint.watch import FileSignature
+
+
+
+"""
+The version of the index schema; indices with another version are rejected.
+"""
+INDEX_VERSION = 1
+
+
+
+"""
+The schema of the index. Each indexed file has a row in files, and a row in
+symbols for each distinct symbol (IPA or not) found in it and a row in errors
+for each distinct error, as these would appear in its report. The lines are
+stored as in the report, with consecutive line numbers collapsed into ranges.
+"""
+INDEX_SCHEMA = '''
+	CREATE TABLE IF NOT EXISTS meta (
+		key TEXT PRIMARY KEY,
+		value TEXT NOT NULL
+	);
+
+	CREATE TABLE IF NOT EXISTS files (
+		id INTEGER PRIMARY KEY,
+		path TEXT NOT NULL UNIQUE,
+		mtime INTEGER NOT NULL,
+		size INTEGER NOT NULL,
+		digest TEXT NOT NULL
+	);
+
+	CREATE TABLE IF NOT EXISTS symbols (
+		file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+		char TEXT NOT NULL,
+		name TEXT NOT NULL,
+		ipa_name TEXT,
+		occurrences INTEGER NOT NULL,
+		rows INTEGER NOT NULL,
+		lines TEXT NOT NULL
+	);
+
+	CREATE TABLE IF NOT EXISTS errors (
+		file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+		message TEXT NOT NULL,
+		occurrences INTEGER NOT NULL,
+		rows INTEGER NOT NULL,
+		lines TEXT NOT NULL
+	);
+
+	CREATE INDEX IF NOT EXISTS symbols_char ON symbols (char);
+	CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file_id);
+	CREATE INDEX IF NOT EXISTS errors_file ON errors (file_id);
+'''
+
+
+
+def format_lines(lines):
+	"""
+	Returns the (occurrences, rows, lines) tuple for the given [] of line
+	numbers, the last being the string of the sorted distinct line numbers,
+	with consecutive ones collapsed into ranges (e.g. 3-7,9).
+	"""
+	rows = 0
+	parts = []
+
+	for first, last in gen_ranges(gen_unique(gen_sorted(lines))):
+		if first == last:
+			parts.append(str(first))
+			rows += 1
+		else:
+			parts.append('{}-{}'.format(first, last))
+			rows += last - first + 1
+
+	return len(lines), rows, ','.join(parts)
+
+
+
+class Index:
+	"""
+	A persistent SQLite index of the symbols and errors found in a set of
+	files, which allows to look these up without linting the files again.
+	The index is updated file by file; see Core's index method.
+	"""
+
+	def __init__(self, db_path):
+		"""
+		Constructor. Opens the index at the given path, creating it if it does
+		not exist. Raises ValueError if the index cannot be opened or is of
+		another version.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		try:
+			self.conn = sqlite3.connect(db_path)
+			self.conn.execute('PRAGMA foreign_keys = ON')
+			self.conn.executescript(INDEX_SCHEMA)
+
+			self.meta = dict(self.conn.execute('SELECT key, value FROM meta'))
+		except sqlite3.Error as err:
+			self.log.error(str(err))
+			raise ValueError('Could not open index: {}'.format(db_path))
+
+		version = self.meta.setdefault('version', str(INDEX_VERSION))
+		if version != str(INDEX_VERSION):
+			self.close()
+			raise ValueError('Unsupported index version: {}'.format(version))
+
+
+	def set_settings(self, profile=None, rules=None):
+		"""
+		Sets the profiles and rules the files are linted with. Raises
+		ValueError if the index already has files linted with other such, as
+		the index would be inconsistent otherwise.
+		"""
+		settings = {
+			'version': str(INDEX_VERSION),
+			'profile': json.dumps(profile or []),
+			'rules': json.dumps(rules or [])}
+
+		if settings == self.meta:
+			return
+
+		if self.conn.execute('SELECT 1 FROM files LIMIT 1').fetchone():
+			raise ValueError((
+				'The index was built with other profiles or rules; '
+				'use these or a new index file'))
+
+		with self.conn:
+			self.conn.execute('DELETE FROM meta')
+			self.conn.executemany('INSERT INTO meta VALUES (?, ?)', settings.items())
+
+		self.meta = settings
+
+
+	def close(self):
+		"""
+		Closes the database connection.
+		"""
+		self.conn.close()
+
+
+	def get_signatures(self, paths):
+		"""
+		Returns the {file path: FileSignature} dict of the indexed files that
+		are or are within the given absolute paths.
+		"""
+		res = {}
+
+		for path, mtime, size, digest in self.conn.execute(
+				'SELECT path, mtime, size, digest FROM files'):
+			for prefix in paths:
+				if path == prefix or path.startswith(os.path.join(prefix, '')):
+					res[path] = FileSignature(mtime, size, digest)
+					break
+
+		return res
+
+
+	def set_signature(self, file_path, signature):
+		"""
+		Updates the signature of an indexed file, e.g. if its mtime has changed
+		but its contents have not.
+		"""
+		with self.conn:
+			self.conn.execute(
+				'UPDATE files SET mtime = ?, size = ?, digest = ? WHERE path = ?',
+				tuple(signature) + (file_path,))
+
+
+	def add_file(self, file_path, signature, recog, norm, engine):
+		"""
+		Replaces the entries of the given file with the symbols and errors
+		collected by the given Recogniser, Normaliser and RuleEngine, which
+		should have linted the file (and only it).
+		"""
+		rep = Reporter()
+		norm.report(rep)
+		engine.report(rep)
+		recog.report(rep)
+
+		symbols = [(symbol.char, symbol.name, symbol.ipa_name, lines)
+					for symbol, lines in recog.ipa_symbols.items()]
+		symbols.extend([(symbol.char, symbol.name, None, lines)
+					for symbol, lines in recog.unk_symbols.items()])
+
+		with self.conn:
+			self.conn.execute('DELETE FROM files WHERE path = ?', (file_path,))
+
+			file_id = self.conn.execute(
+				'INSERT INTO files (path, mtime, size, digest) VALUES (?, ?, ?, ?)',
+				(file_path,) + tuple(signature)).lastrowid
+
+			self.conn.executemany('INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?)', [
+				(file_id, char, name, ipa_name) + format_lines(lines)
+				for char, name, ipa_name, lines in symbols])
+
+			self.conn.executemany('INSERT INTO errors VALUES (?, ?, ?, ?, ?)', [
+				(file_id, error.string) + format_lines(lines)
+				for error, lines in rep.errors.items()])
+
+
+	def remove_file(self, file_path):
+		"""
+		Removes the entries of the given file, if such.
+		"""
+		with self.conn:
+			self.conn.execute('DELETE FROM files WHERE path = ?', (file_path,))
+
+
+	def find_symbol(self, char):
+		"""
+		Returns the [] of (file path, name, IPA name, occurrences, rows, lines)
+		tuples of the files in which the given symbol occurs, sorted by path.
+		The IPA name is None if the symbol is not part of the IPA.
+		"""
+		return self.conn.execute('''
+			SELECT files.path, symbols.name, symbols.ipa_name,
+				symbols.occurrences, symbols.rows, symbols.lines
+			FROM symbols JOIN files ON files.id = symbols.file_id
+			WHERE symbols.char = ?
+			ORDER BY files.path''', (char,)).fetchall()
+
+
+	def find_error(self, text):
+		"""
+		Returns the [] of (message, file path, occurrences, rows, lines)
+		tuples of the errors the message of which contains the given text
+		(ignoring case), sorted by message and path.
+		"""
+		text = text.lower()
+
+		return [row for row in self.conn.execute('''
+			SELECT errors.message, files.path,
+				errors.occurrences, errors.rows, errors.lines
+			FROM errors JOIN files ON files.id = errors.file_id
+			ORDER BY errors.message, files.path''')
+			if text in row[0].lower()]
+
+
+	def get_inventory(self, file_path):
+		"""
+		Returns the ([] of errors, [] of symbols) tuple for the given file. The
+		errors are (message, occurrences, rows, lines) tuples in the order of
+		the report; the symbols are (char, name, IPA name, occurrences, rows,
+		lines) tuples sorted by char. Raises ValueError if the file is not in
+		the index.
+		"""
+		row = self.conn.execute('SELECT id FROM files WHERE path = ?',
+								(file_path,)).fetchone()
+		if row is None:
+			raise ValueError('Not in the index: {}'.format(file_path))
+
+		errors = self.conn.execute('''
+			SELECT message, occurrences, rows, lines FROM errors
+			WHERE file_id = ? ORDER BY rowid''', row).fetchall()
+
+		symbols = self.conn.execute('''
+			SELECT char, name, ipa_name, occurrences, rows, lines FROM symbols
+			WHERE file_id = ? ORDER BY char''', row).fetchall()
+
+		return errors, symbols
@@ -2,9 +2,11 @@ from collections import defaultdict, namedtuple
 
 import csv
 import logging
+import os
 import os.path
 import unicodedata
 
+from ipalint.report import Tally
 
 
 """
@@ -28,6 +30,41 @@ COMMON_ERR_DATA_PATH = os.path.join(DATA_DIR, 'common_errors.tsv')
 
 
 
+"""
+The name by which the built-in data (i.e. the two files above) can be referred
+to when layering profiles; e.g. [BUILTIN_PROFILE, 'americanist.tsv'] extends
+the IPA with the symbols listed in the latter.
+"""
+BUILTIN_PROFILE = 'ipa'
+
+
+"""
+The names of the data files within a profile dir. A profile dir should contain
+at least one of these; a profile that is a file, rather than a dir, is treated
+as if it were the first of these.
+"""
+PROFILE_IPA_FILE = 'ipa.tsv'
+PROFILE_COMMON_ERR_FILE = 'common_errors.tsv'
+
+
+"""
+Path to the dir in which compiled profiles are cached. Each compiled profile is
+stored in a JSON file named after the hash of the paths, modification times and
+sizes of the profile's data files.
+"""
+CACHE_DIR = os.path.join(
+		os.environ.get('XDG_CACHE_HOME') or
+		os.path.join(os.path.expanduser('~'), '.cache'), 'ipalint')
+
+
+"""
+Should be incremented whenever the format of the cached profiles changes, so
+that stale cache files are not used.
+"""
+CACHE_VERSION = 2
+
+
+
 """
 The only non-IPA character allowed in an IPA string. Any other whitespace
 character will be reported as unknown symbols.
@@ -50,6 +87,13 @@ Unicode name.
 UnknownSymbol = namedtuple('UnknownSymbol', ['char', 'name'])
 
 
+"""
+Represents a compiled profile. Its attributes are the {symbol: name} and the
+{bad: good} dicts as these are used by the Recogniser.
+"""
+Profile = namedtuple('Profile', ['ipa', 'common_err'])
+
+
 
 class IPADataError(ValueError):
 	"""
@@ -65,17 +109,43 @@ class Recogniser:
 	the encountered symbols.
 	"""
 
-	def __init__(self):
+	def __init__(self, profiles=None, cache_dir=CACHE_DIR, counts=False,
+						store=None):
 		"""
 		Constructor. Raises IPADataError if the IPA data cannot be loaded.
+
+		The optional arg is a list of profiles (paths to dirs or files) to be
+		used instead of the built-in IPA data; later profiles are layered on
+		top of earlier ones. The built-in data can be included in the list as
+		BUILTIN_PROFILE. Compiled profiles are cached in cache_dir, unless the
+		latter is None.
+
+		If the counts flag is set, only the number of occurrences and lines
+		are kept track of for each symbol, instead of all the line numbers.
+		Otherwise, if a SpillStore is given, the line numbers of the non-IPA
+		symbols are kept in SpillList instances of that store; these of the
+		IPA symbols are only counted, as only counts reports include them.
 		"""
 		self.log = logging.getLogger(__name__)
 
-		self.ipa = self._load_ipa_data(IPA_DATA_PATH)
-		self.common_err = self._load_common_err_data(COMMON_ERR_DATA_PATH)
+		if profiles:
+			self.ipa, self.common_err = self._load_profiles(profiles, cache_dir)
+		else:
+			self.ipa = self._load_ipa_data(IPA_DATA_PATH)
+			self.common_err = self._load_common_err_data(COMMON_ERR_DATA_PATH)
+
+		if counts:
+			accum = Tally
+		elif store is not None:
+			accum = store.new_list
+		else:
+			accum = list
+
+		self.ipa_symbols = defaultdict(  # Symbol: [] of line_num or Tally
+				Tally if store is not None else accum)
+		self.unk_symbols = defaultdict(accum)  # UnknownSymbol: [] of line_num
 
-		self.ipa_symbols = defaultdict(list)  # Symbol: [] of line_num
-		self.unk_symbols = defaultdict(list)  # UnknownSymbol: [] of line_num
+		self.ascii_table = self._get_ascii_table()
 
 
 	def _load_ipa_data(self, ipa_data_path):
@@ -104,12 +174,12 @@ class Recogniser:
 		return ipa
 
 
-	def _load_common_err_data(self, common_err_data_path):
+	def _load_common_err_data(self, common_err_data_path, validate=True):
 		"""
 		Loads and returns the {bad: good} dictionary stored in the common
 		errors data file. Note that the dict's keys are single characters while
-		the values do not have to be. The method also asserts that all the
-		values are valid IPA strings.
+		the values do not have to be. Unless the validate flag is unset, the
+		method also asserts that all the values are valid IPA strings.
 		"""
 		common_err = {}
 
@@ -122,7 +192,8 @@ class Recogniser:
 
 					try:
 						assert line[0] not in common_err
-						assert all([char in self.ipa for char in line[1]])
+						if validate:
+							assert all([char in self.ipa for char in line[1]])
 					except AssertionError:
 						raise IPADataError('Bad common IPA errors file')
 
@@ -135,6 +206,128 @@ class Recogniser:
 		return common_err
 
 
+	def _load_profiles(self, profiles, cache_dir=CACHE_DIR):
+		"""
+		Loads the given profiles and layers them in the order given. Returns
+		the resulting {symbol: name} and {bad: good} dicts. Raises IPADataError
+		if a profile cannot be loaded or if the suggested replacements of the
+		resulting profile are not all part of its inventory.
+		"""
+		ipa = {}
+		common_err = {}
+
+		for profile in profiles:
+			if profile == BUILTIN_PROFILE:
+				profile = DATA_DIR
+				compiled = self._compile_profile(profile)
+			else:
+				compiled = self._load_profile(profile, cache_dir)
+
+			ipa.update(compiled.ipa)
+			common_err.update(compiled.common_err)
+
+		for repl in common_err.values():
+			if not all([char in ipa for char in repl]):
+				raise IPADataError('Bad profile: {} is not in the inventory'.format(repl))
+
+		return ipa, common_err
+
+
+	def _get_profile_paths(self, profile):
+		"""
+		Returns the (ipa data path, common errors data path) tuple for the
+		given profile; either of these can be None. Raises IPADataError if the
+		profile does not exist.
+
+		Helper for the _load_profile and _compile_profile methods.
+		"""
+		if os.path.isdir(profile):
+			paths = [os.path.join(profile, name)
+					for name in [PROFILE_IPA_FILE, PROFILE_COMMON_ERR_FILE]]
+			paths = [path if os.path.exists(path) else None for path in paths]
+			if any(paths):
+				return tuple(paths)
+
+		elif os.path.exists(profile):
+			return profile, None
+
+		raise IPADataError('Could not find profile: {}'.format(profile))
+
+
+	def _compile_profile(self, profile):
+		"""
+		Loads the data files of the given profile and returns a Profile named
+		tuple. Raises IPADataError if there is a problem with the data files.
+		"""
+		ipa_path, common_err_path = self._get_profile_paths(profile)
+
+		return Profile(
+			self._load_ipa_data(ipa_path) if ipa_path else {},
+			self._load_common_err_data(common_err_path, validate=False)
+				if common_err_path else {})
+
+
+	def _load_profile(self, profile, cache_dir=CACHE_DIR):
+		"""
+		Returns the Profile named tuple for the given profile. If cache_dir is
+		set, the compiled profile is looked up there first and, if not found,
+		it is compiled and saved there. The cache key comprises the path, the
+		modification time and the size of each of the profile's data files, so
+		editing a profile invalidates its cache without the data having to be
+		read. The compiled profiles are stored as JSON, so a tampered cache
+		file can at worst yield wrong symbols, but not run code.
+		"""
+		if cache_dir is None:
+			return self._compile_profile(profile)
+
+		import hashlib
+		import json
+
+		key = [CACHE_VERSION]
+
+		for path in self._get_profile_paths(profile):
+			if path:
+				try:
+					stat = os.stat(path)
+				except OSError as err:
+					self.log.error(str(err))
+					raise IPADataError('Could not open profile: {}'.format(profile))
+
+				key.append([os.path.abspath(path), stat.st_mtime_ns, stat.st_size])
+			else:
+				key.append(None)
+
+		cache_path = os.path.join(cache_dir, hashlib.sha256(
+				json.dumps(key).encode()).hexdigest() + '.json')
+
+		try:
+			with open(cache_path, encoding='utf-8') as f:
+				cached = json.load(f)
+
+			if cached['key'] == key and all([isinstance(cached[field], dict)
+					for field in Profile._fields]):
+				return Profile(*[cached[field] for field in Profile._fields])
+		except (OSError, ValueError, TypeError, KeyError):
+			pass
+
+		compiled = self._compile_profile(profile)
+
+		temp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+
+		try:
+			os.makedirs(cache_dir, exist_ok=True)
+			with open(temp_path, 'w', encoding='utf-8') as f:
+				json.dump(dict(compiled._asdict(), key=key), f, ensure_ascii=False)
+			os.replace(temp_path, cache_path)
+		except OSError as err:
+			self.log.debug('Could not cache profile: {}'.format(err))
+		finally:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+
+		return compiled
+
+
 	def get_nfc_chars(self):
 		"""
 		Returns the set of IPA symbols that are precomposed (decomposable)
@@ -155,6 +348,32 @@ class Recogniser:
 		return set(ex)
 
 
+	def get_symbol(self, char):
+		"""
+		Returns the Symbol or UnknownSymbol named tuple of the given char.
+		"""
+		try:
+			name = unicodedata.name(char)
+		except ValueError:
+			name = 'UNNAMED CHARACTER {}'.format(ord(char))
+
+		if char in self.ipa:
+			return Symbol(char, name, self.ipa[char])
+
+		return UnknownSymbol(char, name)
+
+
+	def _get_ascii_table(self):
+		"""
+		Returns the 128-item tuple mapping each ASCII code point to the Symbol
+		or UnknownSymbol named tuple of the respective char; the space maps to
+		None. Used by the recognise method to skip the unicodedata lookups for
+		ASCII strings.
+		"""
+		return tuple([None if chr(code) == SPACE else self.get_symbol(chr(code))
+					for code in range(128)])
+
+
 	def recognise(self, string, line_num):
 		"""
 		Splits the string into chars and distributes these into the buckets of
@@ -164,39 +383,79 @@ class Recogniser:
 		symbols = []
 		unknown = []
 
+		if string.isascii():
+			for code in string.encode('ascii'):
+				symbol = self.ascii_table[code]
+
+				if symbol is None:
+					continue
+				elif symbol.__class__ is Symbol:
+					symbols.append(symbol)
+					self.ipa_symbols[symbol].append(line_num)
+				else:
+					unknown.append(symbol)
+					self.unk_symbols[symbol].append(line_num)
+
+			return tuple(symbols), tuple(unknown)
+
 		for char in string:
 			if char == SPACE:
 				continue
 
-			try:
-				name = unicodedata.name(char)
-			except ValueError:
-				name = 'UNNAMED CHARACTER {}'.format(ord(char))
+			symbol = self.get_symbol(char)
 
-			if char in self.ipa:
-				symbol = Symbol(char, name, self.ipa[char])
+			if symbol.__class__ is Symbol:
 				symbols.append(symbol)
 				self.ipa_symbols[symbol].append(line_num)
 			else:
-				symbol = UnknownSymbol(char, name)
 				unknown.append(symbol)
 				self.unk_symbols[symbol].append(line_num)
 
 		return tuple(symbols), tuple(unknown)
 
 
-	def report(self, reporter):
+	def clear(self):
+		"""
+		Forgets the symbols that have been encountered so far, keeping the
+		loaded IPA data.
+		"""
+		self.ipa_symbols = defaultdict(self.ipa_symbols.default_factory)
+		self.unk_symbols = defaultdict(self.unk_symbols.default_factory)
+
+
+	def count_errors(self):
+		"""
+		Returns the number of occurrences of non-IPA symbols found so far.
+		"""
+		return sum([len(lines) for lines in self.unk_symbols.values()])
+
+
+	def get_error_message(self, symbol):
+		"""
+		Returns the error message for the given UnknownSymbol named tuple,
+		including the suggested replacement if it is a common error.
+		"""
+		err = '{} ({}) is not part of IPA'.format(symbol.char, symbol.name)
+
+		if symbol.char in self.common_err:
+			repl = self.common_err[symbol.char]
+			err += ', suggested replacement is {}'.format(repl)
+			if len(repl) == 1:
+				err += ' ({})'.format(unicodedata.name(repl))
+
+		return err
+
+
+	def report(self, reporter, inventory=False):
 		"""
 		Adds the problems that have been found so far to the given Reporter
-		instance.
+		instance. If the flag is set, the IPA symbols encountered so far are
+		also added as the reporter's inventory.
 		"""
 		for symbol in sorted(self.unk_symbols.keys()):
-			err = '{} ({}) is not part of IPA'.format(symbol.char, symbol.name)
-
-			if symbol.char in self.common_err:
-				repl = self.common_err[symbol.char]
-				err += ', suggested replacement is {}'.format(repl)
-				if len(repl) == 1:
-					err += ' ({})'.format(unicodedata.name(repl))
+			reporter.add(self.unk_symbols[symbol], self.get_error_message(symbol))
 
-			reporter.add(self.unk_symbols[symbol], err)
+		if inventory:
+			for symbol in sorted(self.ipa_symbols.keys()):
+				desc = '{} ({}) {}'.format(symbol.char, symbol.name, symbol.ipa_name)
+				reporter.add_symbol(self.ipa_symbols[symbol], desc)
@@ -0,0 +1,597 @@
+import copy
+import json
+import logging
+import unicodedata
+
+from urllib.parse import unquote, urlparse
+
+from ipalint.core import lint_rows
+from ipalint.strnorm import NFD_ERROR, Normaliser, WS_ERROR
+
+
+
+"""
+The LSP diagnostic severities used for non-IPA symbols and for the rest of the
+errors, respectively.
+"""
+SEVERITY_ERROR = 1
+SEVERITY_WARNING = 2
+
+
+
+"""
+The value of the source field of the published diagnostics.
+"""
+DIAGNOSTIC_SOURCE = 'ipalint'
+
+
+
+"""
+The textDocumentSync kind announced to the client: 2 means that the client
+sends incremental changes (ranges of the document and their replacements).
+"""
+SYNC_INCREMENTAL = 2
+
+
+
+def to_utf16(line, index):
+	"""
+	Returns the UTF-16 offset (as used by LSP positions) of the given index
+	into the given line.
+	"""
+	if line.isascii():
+		return index
+
+	return len(line[:index].encode('utf-16-le')) // 2
+
+
+
+def from_utf16(line, offset):
+	"""
+	Returns the index into the given line of the given UTF-16 offset. Offsets
+	past the end of the line are clamped to its length.
+	"""
+	if line.isascii():
+		return min(offset, len(line))
+
+	units = 0
+
+	for index, char in enumerate(line):
+		if units >= offset:
+			return index
+		units += 2 if ord(char) > 0xFFFF else 1
+
+	return len(line)
+
+
+
+def get_field(line, dialect, col):
+	"""
+	Parses the given line using the given Dialect named tuple and returns the
+	(value, offsets) tuple of the field with the given index, the second being
+	the [] of indices into the line of the value's chars, plus the index where
+	the field ends. Returns None if the line has fewer fields. Unlike the csv
+	module, this does not handle fields spanning multiple lines.
+	"""
+	delim, quote, escape = dialect.delimiter, dialect.quotechar, dialect.escapechar
+
+	index = 0
+	pos = 0
+
+	while True:
+		value = []
+		offsets = []
+
+		quoted = pos < len(line) and line[pos] == quote
+		if quoted:
+			pos += 1
+
+		while pos < len(line):
+			char = line[pos]
+
+			if escape and char == escape and pos + 1 < len(line):
+				pos += 1
+			elif quoted and char == quote:
+				if dialect.doublequote and line[pos+1:pos+2] == quote:
+					pos += 1
+				else:
+					quoted = False
+					pos += 1
+					continue
+			elif not quoted and char == delim:
+				break
+
+			value.append(line[pos])
+			offsets.append(pos)
+			pos += 1
+
+		if index == col:
+			return ''.join(value), offsets + [pos]
+
+		if pos >= len(line):
+			return None
+
+		index += 1
+		pos += 1
+
+
+
+def get_field_names(line, dialect):
+	"""
+	Returns the [] of the fields of the given line, parsed with the given
+	Dialect named tuple.
+	"""
+	names = []
+
+	while True:
+		field = get_field(line, dialect, len(names))
+		if field is None:
+			return names
+		names.append(field[0])
+
+
+
+class LineLinter:
+	"""
+	Lints single IPA strings, returning the errors found together with their
+	positions within the string. Whether a string has an error is decided by
+	the same Normaliser, RuleEngine and Recogniser as in the lint method of
+	Core; this class only locates the errors within the string.
+	"""
+
+	def __init__(self, recog, engine, ignore_nfd=False, ignore_ws=False):
+		"""
+		Constructor. Expects a Recogniser and a RuleEngine instance; the
+		former is copied, so that the symbols it collects are not mixed with
+		these of the given instance.
+		"""
+		self.recog = copy.copy(recog)
+		self.recog.clear()
+
+		self.engine = engine
+
+		self.nfc_chars = recog.get_nfc_chars()
+		self.norm = Normaliser(self.nfc_chars)
+
+		self.ignore_nfd = ignore_nfd
+		self.ignore_ws = ignore_ws
+
+
+	def _get_offsets(self, string):
+		"""
+		Returns the (offsets, decomposed) tuple for the given stripped string.
+		The offsets map each char of the string's normalised form to the index
+		of the char of the given string it comes from; the second item is the
+		[] of the (start, end) spans of the chars that are decomposed.
+
+		Helper for the lint method.
+		"""
+		offsets = []
+		spans = []
+
+		for index, char in enumerate(string):
+			if char.isascii() or char in self.nfc_chars:
+				offsets.append(index)
+				continue
+
+			decomp = unicodedata.normalize('NFD', char)
+			if decomp != char:
+				spans.append((index, index + 1))
+
+			offsets.extend([index] * len(decomp))
+
+		return offsets, spans
+
+
+	def lint(self, string):
+		"""
+		Returns the [] of (start, end, message, is non-IPA) tuples of the
+		errors found in the given string, the first two being indices into the
+		string.
+		"""
+		errors = []
+
+		[(norm, unknown)] = lint_rows([(string, 0)], self.recog, self.norm)
+
+		has_ws, has_nfd = bool(self.norm.strip_errors), bool(self.norm.norm_errors)
+		self.norm.clear()
+		self.recog.clear()
+
+		stripped = string.strip()
+		lead = len(string) - len(string.lstrip())
+
+		if has_ws and not self.ignore_ws:
+			if not stripped:
+				errors.append((0, len(string), WS_ERROR, False))
+			else:
+				trail = lead + len(stripped)
+				if lead:
+					errors.append((0, lead, WS_ERROR, False))
+				if trail < len(string):
+					errors.append((trail, len(string), WS_ERROR, False))
+
+		offsets, spans = self._get_offsets(stripped)
+
+		if has_nfd and not self.ignore_nfd:
+			# canonical reordering of combining chars is not per char
+			for start, end in spans or [(0, len(stripped))]:
+				errors.append((lead + start, lead + end, NFD_ERROR, False))
+
+		for index, start, end in self.engine.find(norm):
+			errors.append((lead + offsets[start], lead + offsets[end-1] + 1,
+						self.engine.rules[index].message, False))
+
+		messages = {symbol.char: self.recog.get_error_message(symbol)
+					for symbol in unknown}
+
+		for index, char in enumerate(norm):
+			if char in messages:
+				errors.append((lead + offsets[index], lead + offsets[index] + 1,
+							messages[char], True))
+
+		return errors
+
+
+
+class Document:
+	"""
+	An open text document: its lines, the dialect and IPA column these are
+	read with, and the errors found on each line. Edits only invalidate the
+	errors of the lines they touch.
+	"""
+
+	def __init__(self, uri, text, linter, col=None, no_header=False):
+		"""
+		Constructor. The linter should be a LineLinter instance; the rest of
+		the args are as in Core's lint method.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		self.uri = uri
+		self.linter = linter
+
+		self.col = col
+		self.has_header = not no_header
+
+		self.set_text(text)
+
+
+	def set_text(self, text):
+		"""
+		Replaces the whole text of the document.
+		"""
+		self.lines = text.split('\n')
+		self.lines = [line[:-1] if line.endswith('\r') else line
+					for line in self.lines]
+
+		self._determine_layout()
+
+
+	def _determine_layout(self):
+		"""
+		Determines the dialect and the IPA column of the document and marks
+		all lines as yet to be linted. Sets self.error to the error message if
+		the IPA column cannot be determined.
+		"""
+		from ipalint.read import Reader
+
+		path = unquote(urlparse(self.uri).path) or 'document'
+		reader = Reader(path, has_header=self.has_header, ipa_col=self.col)
+
+		self.error = None
+		self.dialect = None
+		self.ipa_col = 0
+
+		lines = [line for line in self.lines if line]
+
+		try:
+			if lines:
+				self.dialect = reader.get_dialect(lines)
+
+			if self.dialect is not None:
+				header = None
+				if self.has_header:
+					header = get_field_names(self.lines[0], self.dialect)
+				self.ipa_col = reader.get_ipa_col(header)
+
+		except ValueError as err:
+			self.error = str(err)
+
+		self.line_errors = [None] * len(self.lines)  # None: yet to be linted
+
+
+	def apply_change(self, change):
+		"""
+		Applies a TextDocumentContentChangeEvent dict to the document. Changes
+		without a range replace the whole text.
+		"""
+		if 'range' not in change:
+			return self.set_text(change['text'])
+
+		start, end = change['range']['start'], change['range']['end']
+
+		first, last = start['line'], min(end['line'], len(self.lines) - 1)
+		first = min(first, last)
+
+		head = self.lines[first]
+		head = head[:from_utf16(head, start['character'])]
+
+		tail = self.lines[last]
+		tail = tail[from_utf16(tail, end['character']):]
+
+		new_lines = (head + change['text'] + tail).split('\n')
+		new_lines = [line[:-1] if line.endswith('\r') else line
+					for line in new_lines]
+
+		self.lines[first:last+1] = new_lines
+		self.line_errors[first:last+1] = [None] * len(new_lines)
+
+		if first == 0 and (self.has_header or self.dialect is None):
+			self._determine_layout()
+
+
+	def _lint_line(self, line_num):
+		"""
+		Returns the [] of (start, end, message, is non-IPA) tuples of the
+		errors found on the given line, the first two being UTF-16 offsets
+		into the line. These do not include the line number, so that these
+		remain valid when lines are inserted or deleted above.
+
+		Helper for the get_diagnostics method.
+		"""
+		line = self.lines[line_num]
+
+		if not line or (line_num == 0 and self.has_header):
+			return []
+
+		if self.dialect is None:
+			value, offsets = line, list(range(len(line) + 1))
+		else:
+			field = get_field(line, self.dialect, self.ipa_col)
+			if field is None:
+				return [(0, to_utf16(line, len(line)),
+						'Could not find IPA data on line', False)]
+			value, offsets = field
+
+		return [(to_utf16(line, offsets[start]),
+				to_utf16(line, offsets[end-1] + 1 if end > start else offsets[end]),
+				message, is_error)
+				for start, end, message, is_error in self.linter.lint(value)]
+
+
+	def _make_diagnostic(self, line_num, start, end, message, is_error):
+		"""
+		Returns an LSP diagnostic dict for the given line and span of UTF-16
+		offsets.
+
+		Helper for the get_diagnostics method.
+		"""
+		return {
+			'range': {
+				'start': {'line': line_num, 'character': start},
+				'end': {'line': line_num, 'character': end}},
+			'severity': SEVERITY_ERROR if is_error else SEVERITY_WARNING,
+			'source': DIAGNOSTIC_SOURCE,
+			'message': message
+		}
+
+
+	def get_diagnostics(self):
+		"""
+		Returns the [] of all the document's LSP diagnostic dicts, linting the
+		lines that have changed since the last call.
+		"""
+		if self.error:
+			return [self._make_diagnostic(0, 0, to_utf16(self.lines[0],
+									len(self.lines[0])), self.error, True)]
+
+		res = []
+
+		for line_num, errors in enumerate(self.line_errors):
+			if errors is None:
+				errors = self.line_errors[line_num] = self._lint_line(line_num)
+
+			res.extend([self._make_diagnostic(line_num, *error) for error in errors])
+
+		return res
+
+
+
+class LanguageServer:
+	"""
+	Speaks the Language Server Protocol (JSON-RPC messages with Content-Length
+	headers) over a pair of binary streams, publishing diagnostics for the
+	open documents whenever these change.
+	"""
+
+	def __init__(self, linter, col=None, no_header=False):
+		"""
+		Constructor. The linter should be a LineLinter instance; the rest of
+		the args are as in Core's lint method and apply to all documents.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		self.linter = linter
+		self.col = col
+		self.no_header = no_header
+
+		self.documents = {}  # uri: Document
+		self.is_shut_down = False
+
+		self.handlers = {
+			'initialize': self.on_initialize,
+			'shutdown': self.on_shutdown,
+			'textDocument/didOpen': self.on_did_open,
+			'textDocument/didChange': self.on_did_change,
+			'textDocument/didClose': self.on_did_close
+		}
+
+
+	def read_message(self, stream):
+		"""
+		Reads a message from the given binary stream and returns it as a dict.
+		Returns None at the end of the stream.
+		"""
+		length = None
+
+		while True:
+			line = stream.readline()
+			if not line:
+				return None
+
+			line = line.strip()
+			if not line:
+				if length is not None:
+					break
+				continue
+
+			name, sep, value = line.decode('ascii').partition(':')
+			if name.strip().lower() == 'content-length':
+				length = int(value)
+
+		return json.loads(stream.read(length).decode('utf-8'))
+
+
+	def write_message(self, stream, message):
+		"""
+		Writes the given message dict to the given binary stream.
+		"""
+		message = dict(message, jsonrpc='2.0')
+		body = json.dumps(message, ensure_ascii=False).encode('utf-8')
+
+		stream.write('Content-Length: {}\r\n\r\n'.format(len(body)).encode('ascii'))
+		stream.write(body)
+		stream.flush()
+
+
+	def on_initialize(self, params):
+		"""
+		Responds to the initialize request with the server's capabilities.
+		"""
+		return {
+			'capabilities': {
+				'textDocumentSync': {'openClose': True, 'change': SYNC_INCREMENTAL}},
+			'serverInfo': {'name': DIAGNOSTIC_SOURCE}
+		}
+
+
+	def on_shutdown(self, params):
+		"""
+		Responds to the shutdown request; the exit notification should follow.
+		"""
+		self.is_shut_down = True
+
+
+	def on_did_open(self, params):
+		"""
+		Lints the opened document.
+		"""
+		doc = params['textDocument']
+		self.documents[doc['uri']] = Document(doc['uri'], doc['text'],
+								self.linter, self.col, self.no_header)
+		return self._publish(doc['uri'])
+
+
+	def on_did_change(self, params):
+		"""
+		Applies the changes to the document and re-lints the changed lines.
+		"""
+		uri = params['textDocument']['uri']
+		if uri not in self.documents:
+			return
+
+		for change in params['contentChanges']:
+			self.documents[uri].apply_change(change)
+
+		return self._publish(uri)
+
+
+	def on_did_close(self, params):
+		"""
+		Forgets the document and clears its diagnostics.
+		"""
+		uri = params['textDocument']['uri']
+		self.documents.pop(uri, None)
+
+		return self._publish(uri, [])
+
+
+	def _publish(self, uri, diagnostics=None):
+		"""
+		Returns the publishDiagnostics notification for the given document.
+		"""
+		if diagnostics is None:
+			diagnostics = self.documents[uri].get_diagnostics()
+
+		return {'method': 'textDocument/publishDiagnostics',
+				'params': {'uri': uri, 'diagnostics': diagnostics}}
+
+
+	def handle(self, message):
+		"""
+		Handles the given message dict and returns the [] of messages to be
+		sent back: the response if the message is a request, and the
+		notifications the handler returned, if such.
+		"""
+		method = message.get('method')
+		is_request = 'id' in message
+
+		handler = self.handlers.get(method)
+		res = []
+
+		if handler is None:
+			if is_request:
+				res.append({'id': message['id'], 'error': {
+					'code': -32601, 'message': 'Method not found: {}'.format(method)}})
+			return res
+
+		try:
+			result = handler(message.get('params') or {})
+		except Exception as err:
+			self.log.error('{}: {}'.format(method, err))
+			if is_request:
+				res.append({'id': message['id'], 'error': {
+					'code': -32603, 'message': str(err)}})
+			return res
+
+		if is_request:
+			res.append({'id': message['id'], 'result': result})
+		elif result is not None:
+			res.append(result)
+
+		return res
+
+
+	def run(self, in_stream, out_stream):
+		"""
+		Handles the messages read from the input stream until the exit
+		notification or the end of the stream. Returns the exit code.
+		"""
+		while True:
+			message = self.read_message(in_stream)
+
+			if message is None:
+				return 1
+
+			if message.get('method') == 'exit':
+				return 0 if self.is_shut_down else 1
+
+			for reply in self.handle(message):
+				self.write_message(out_stream, reply)
+
+
+
+def serve(core, col=None, no_header=False, profile=None, rules=None,
+			ignore_nfd=False, ignore_ws=False):
+	"""
+	Runs a LanguageServer over stdin and stdout until the client exits. The
+	Core instance's warm linters for the given profile and rules are used.
+	Returns the exit code.
+	"""
+	import sys
+
+	recog, norm, engine = core.get_linters(profile, rules)
+	linter = LineLinter(recog, engine, ignore_nfd, ignore_ws)
+
+	server = LanguageServer(linter, col, no_header)
+	return server.run(sys.stdin.buffer, sys.stdout.buffer)
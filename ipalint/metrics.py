@@ -0,0 +1,239 @@
+from collections import OrderedDict
+
+import os
+import time
+
+
+
+"""
+The stages of a lint run the wall time of which is measured: loading the IPA
+data, reading the dataset, normalising the strings, checking the rules,
+recognising the symbols, writing the export file (if any), and writing the
+report (or the state).
+"""
+STAGES = ['load', 'read', 'normalise', 'rules', 'recognise', 'export', 'report']
+
+
+
+"""
+The prefix of the names of the metrics.
+"""
+METRIC_PREFIX = 'ipalint_'
+
+
+
+"""
+The values of the category label of the errors metric. The errors are counted
+per kind rather than per message, so that the number of series is fixed: the
+messages include the non-IPA symbols and the offsets of bad bytes, neither of
+which are bounded or stable between runs.
+"""
+WS_CATEGORY = 'whitespace'
+NFD_CATEGORY = 'nfd'
+BAD_BYTES_CATEGORY = 'bad_bytes'
+UNKNOWN_SYMBOL_CATEGORY = 'unknown_symbol'
+RULE_CATEGORY = 'rule:{}'
+
+
+
+def escape_label(value):
+	"""
+	Returns the given label value escaped as required by the Prometheus text
+	format: backslashes, double quotes and newlines.
+	"""
+	return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+
+def format_metric(name, labels, value):
+	"""
+	Returns the line of a sample of the given metric. The labels should be a
+	[] of (name, value) tuples.
+	"""
+	if labels:
+		name += '{{{}}}'.format(','.join(['{}="{}"'.format(key, escape_label(value))
+										for key, value in labels]))
+
+	return '{}{} {}'.format(METRIC_PREFIX, name, repr(value))
+
+
+
+class Metrics:
+	"""
+	Collects the metrics of a lint run: the rows and bytes read and the errors
+	found per source, and the wall time per stage, and writes these to a file
+	in the Prometheus text format (as read by node_exporter's textfile
+	collector).
+
+	In order to time the stages, the rows are linted in chunks, one stage at a
+	time, as in the lint loop of Core; see the lint_rows method.
+	"""
+
+	def __init__(self):
+		"""
+		Constructor. The run is considered to start when this is called.
+		"""
+		self.started = time.perf_counter()
+
+		self.stages = OrderedDict([(stage, 0.0) for stage in STAGES])
+		self.sources = OrderedDict()  # source: {rows, bytes, errors by category}
+
+		self.source = None
+
+
+	def start_source(self, heading):
+		"""
+		Starts collecting the metrics of the given source; the heading is its
+		file path or the stream it is read from.
+		"""
+		if not isinstance(heading, str):
+			heading = getattr(heading, 'name', '-')
+
+		self.source = self.sources.setdefault(heading, {
+			'rows': 0, 'bytes': None, 'errors': OrderedDict()})
+
+
+	def lint_rows(self, data, recog, norm, engine, write=None, update=None):
+		"""
+		Lints the given (IPA string, line number) tuples of the current source
+		with the given Recogniser, Normaliser and RuleEngine, as in the lint
+		loop of Core (see core.lint_rows), adding up the time each stage takes.
+		The write and update functions, if given, are Exporter.write and
+		Progress.update.
+		"""
+		from ipalint.core import gen_chunks, lint_rows
+
+		clock = time.perf_counter
+		stages = self.stages
+		source = self.source
+
+		start = clock()
+
+		for chunk in gen_chunks(data):
+			stages['read'] += clock() - start
+
+			source['rows'] += len(chunk)
+			results = lint_rows(chunk, recog, norm, engine, stages)
+
+			if write:
+				start = clock()
+				for (datum, line_num), (string, unknown) in zip(chunk, results):
+					write(line_num, string, unknown)
+				stages['export'] += clock() - start
+
+			if update:
+				for row in chunk:
+					update()
+
+			start = clock()
+
+		stages['read'] += clock() - start
+
+
+	def add_time(self, stage, start):
+		"""
+		Adds the time elapsed since the given time.perf_counter value to the
+		given stage.
+		"""
+		self.stages[stage] += time.perf_counter() - start
+
+
+	def set_bytes(self, position):
+		"""
+		Sets the number of bytes read from the current source, given its last
+		(bytes read, size) position as returned by Reader.get_position; the
+		latter is None if the number is not known.
+		"""
+		if position is not None:
+			self.source['bytes'] = position[0]
+
+
+	def add_errors(self, recog, norm, engine, ignore_nfd=False,
+					ignore_ws=False):
+		"""
+		Adds the number of occurrences of each category of the errors collected
+		by the given Recogniser, Normaliser and RuleEngine to the current
+		source. The keyword args are as in Normaliser's report method; the
+		categories these exclude are left out.
+		"""
+		counts = []
+
+		if not ignore_ws:
+			counts.append((WS_CATEGORY, len(norm.strip_errors)))
+		if not ignore_nfd:
+			counts.append((NFD_CATEGORY, len(norm.norm_errors)))
+
+		counts.append((BAD_BYTES_CATEGORY,
+			sum([len(lines) for lines in norm.byte_errors.values()])))
+		counts.append((UNKNOWN_SYMBOL_CATEGORY, recog.count_errors()))
+
+		counts.extend([(RULE_CATEGORY.format(rule.name), len(lines))
+					for rule, lines in zip(engine.rules, engine.errors)])
+
+		errors = self.source['errors']
+
+		for category, count in counts:
+			errors[category] = errors.get(category, 0) + count
+
+
+	def gen_lines(self):
+		"""
+		Yields the lines of the metrics file.
+		"""
+		def gen_metric(name, kind, desc, samples):
+			yield '# HELP {}{} {}'.format(METRIC_PREFIX, name, desc)
+			yield '# TYPE {}{} {}'.format(METRIC_PREFIX, name, kind)
+
+			for labels, value in samples:
+				yield format_metric(name, labels, value)
+
+		yield from gen_metric('rows', 'gauge', 'The number of rows linted.', [
+			([('source', source)], data['rows'])
+			for source, data in self.sources.items()])
+
+		yield from gen_metric('read_bytes', 'gauge', 'The number of bytes read.', [
+			([('source', source)], data['bytes'])
+			for source, data in self.sources.items() if data['bytes'] is not None])
+
+		yield from gen_metric('errors', 'gauge',
+			'The number of occurrences of each category of errors.', [
+			([('source', source), ('category', category)], count)
+			for source, data in self.sources.items()
+			for category, count in data['errors'].items()])
+
+		yield from gen_metric('error_occurrences', 'gauge',
+			'The number of occurrences of all the errors.', [
+			([('source', source)], sum(data['errors'].values()))
+			for source, data in self.sources.items()])
+
+		yield from gen_metric('stage_duration_seconds', 'gauge',
+			'The wall time spent in each stage of the run.', [
+			([('stage', stage)], round(seconds, 6))
+			for stage, seconds in self.stages.items()])
+
+		yield from gen_metric('duration_seconds', 'gauge',
+			'The wall time of the run.', [
+			([], round(time.perf_counter() - self.started, 6))])
+
+		yield from gen_metric('last_success_timestamp_seconds', 'gauge',
+			'The time the last successful run finished.', [
+			([], round(time.time(), 3))])
+
+
+	def write(self, file_path):
+		"""
+		Writes the metrics to the given file. The file is replaced atomically,
+		so that a collector never reads a half-written one.
+		"""
+		temp_path = '{}.{}.tmp'.format(file_path, os.getpid())
+
+		try:
+			with open(temp_path, 'w', encoding='utf-8') as f:
+				for line in self.gen_lines():
+					f.write(line + '\n')
+
+			os.replace(temp_path, file_path)
+
+		finally:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
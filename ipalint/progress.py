@@ -0,0 +1,158 @@
+from collections import namedtuple
+
+import time
+
+
+
+"""
+The min number of seconds between two consecutive progress updates.
+"""
+PROGRESS_INTERVAL = 0.5
+
+
+
+"""
+The clock is only checked once per this many rows, so that keeping track of
+the progress does not noticeably slow down the linting.
+"""
+PROGRESS_CHECK_ROWS = 256
+
+
+
+"""
+Represents the progress of linting a dataset (or one of its sources, if there
+are several; heading is then the source's heading, otherwise None). bytes_read
+and bytes_total are None if the size of the source is not known (e.g. for
+databases). errors is the number of error occurrences found so far in the
+source. elapsed is in seconds. done is True for the last update of a source.
+"""
+ProgressInfo = namedtuple('ProgressInfo', ['heading', 'rows', 'bytes_read',
+				'bytes_total', 'errors', 'elapsed', 'done'])
+
+
+
+def format_progress(info):
+	"""
+	Returns a one-line human-readable summary of the given ProgressInfo named
+	tuple: the rows and megabytes per second, the errors so far, and the ETA
+	(if the size of the source is known).
+	"""
+	elapsed = max(info.elapsed, 1e-6)
+
+	parts = ['{:,} rows'.format(info.rows),
+			'{:,.0f} rows/s'.format(info.rows / elapsed)]
+
+	if info.bytes_read is not None:
+		parts.append('{:.1f} MB/s'.format(info.bytes_read / elapsed / 2**20))
+
+	parts.append('{:,} errors'.format(info.errors))
+
+	if info.done:
+		parts.append('done in {:.1f}s'.format(info.elapsed))
+	elif info.bytes_read and info.bytes_total:
+		eta = elapsed * (info.bytes_total - info.bytes_read) / info.bytes_read
+		parts.append('{:.0f}% ETA {:.0f}s'.format(
+			100 * info.bytes_read / info.bytes_total, max(eta, 0)))
+
+	line = ', '.join(parts)
+
+	if info.heading is not None:
+		line = '{}: {}'.format(info.heading, line)
+
+	return line
+
+
+
+def write_progress(stream):
+	"""
+	Returns a progress callback that writes format_progress lines to the given
+	text stream. If the latter is a terminal, each update overwrites the
+	previous one.
+	"""
+	is_tty = hasattr(stream, 'isatty') and stream.isatty()
+
+	def callback(info):
+		if is_tty:
+			stream.write('\r\033[K' + format_progress(info))
+			if info.done:
+				stream.write('\n')
+		else:
+			stream.write(format_progress(info) + '\n')
+
+		stream.flush()
+
+	return callback
+
+
+
+class Progress:
+	"""
+	Keeps track of the rows linted from a Reader and, at most once per
+	PROGRESS_INTERVAL seconds, calls a callback with a ProgressInfo.
+	"""
+
+	def __init__(self, callback, count_errors, interval=PROGRESS_INTERVAL):
+		"""
+		Constructor. The first arg is the function to be called with the
+		ProgressInfo named tuples; the second is a function that returns the
+		number of errors found so far (which is only called when there is an
+		update to be made).
+		"""
+		self.callback = callback
+		self.count_errors = count_errors
+		self.interval = interval
+
+		self.heading = None
+		self.reader = None
+
+
+	def start(self, reader, heading=None):
+		"""
+		Starts keeping track of the progress of reading the given Reader.
+		"""
+		self.heading = heading
+		self.reader = reader
+
+		self.rows = 0
+		self.countdown = PROGRESS_CHECK_ROWS
+
+		self.start_time = time.monotonic()
+		self.last_time = self.start_time
+
+
+	def _notify(self, now, done=False):
+		"""
+		Calls the callback with the current progress.
+		"""
+		pos = self.reader.get_position()
+		bytes_read, bytes_total = pos if pos else (None, None)
+
+		self.callback(ProgressInfo(self.heading, self.rows,
+					bytes_read, bytes_total, self.count_errors(),
+					now - self.start_time, done))
+
+		self.last_time = now
+
+
+	def update(self):
+		"""
+		Counts a linted row, notifying the callback if it is time to.
+		"""
+		self.rows += 1
+		self.countdown -= 1
+
+		if self.countdown:
+			return
+
+		self.countdown = PROGRESS_CHECK_ROWS
+
+		now = time.monotonic()
+		if now - self.last_time >= self.interval:
+			self._notify(now)
+
+
+	def finish(self):
+		"""
+		Notifies the callback that the Reader has been read to the end.
+		"""
+		self._notify(time.monotonic(), done=True)
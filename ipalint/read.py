@@ -1,10 +1,10 @@
-from collections import namedtuple
+from collections import Counter, namedtuple, OrderedDict
 
 import csv
+import itertools
 import logging
 import os.path
-
-from tempfile import TemporaryDirectory
+import re
 
 
 
@@ -32,6 +32,30 @@ CSV_ESCAPECHARS = [None, '\\']
 
 
 
+"""
+The max number of lines that are looked at when trying to determine the csv
+dialect of a file.
+"""
+DIALECT_SAMPLE_SIZE = 1000
+
+
+
+"""
+The min share of sampled lines that must have the same number of columns in
+order for a candidate dialect to be accepted.
+"""
+DIALECT_MIN_SCORE = 0.9
+
+
+
+"""
+If the confidence with which the dialect is determined falls below this
+threshold, a warning is logged.
+"""
+DIALECT_WARN_CONFIDENCE = 0.5
+
+
+
 """
 List of file extension that are considered identifying tab-separated values; no
 no dialect guessing will take place for these files.
@@ -40,6 +64,76 @@ TSV_EXTENSIONS = ['tsv', 'tab']
 
 
 
+"""
+Lists of file extensions that are considered identifying Apache Parquet files
+and Apache Arrow IPC (including Feather v2) files. Reading these requires the
+pyarrow package.
+"""
+PARQUET_EXTENSIONS = ['parquet', 'pq']
+ARROW_EXTENSIONS = ['arrow', 'arrows', 'feather', 'ipc']
+
+
+
+"""
+The number of rows to be read at a time from Parquet files.
+"""
+ARROW_BATCH_SIZE = 65536
+
+
+
+"""
+List of file extensions that are considered identifying SQLite databases.
+"""
+SQLITE_EXTENSIONS = ['sqlite', 'sqlite3', 'db']
+
+
+
+"""
+The number of rows to be fetched at a time from database cursors.
+"""
+DB_BATCH_SIZE = 10000
+
+
+
+"""
+Lists of file extensions that are considered identifying Office Open XML
+(Excel) spreadsheets and OpenDocument spreadsheets. Reading these requires the
+openpyxl and the odfpy package, respectively; see the spreadsheet module.
+"""
+XLSX_EXTENSIONS = ['xlsx', 'xlsm']
+ODS_EXTENSIONS = ['ods']
+
+
+
+"""
+The number of rows read ahead at a time by gen_prefetched, and the max number
+of such chunks waiting to be linted; once that many are waiting, the reading
+thread blocks until the lint loop catches up.
+"""
+PREFETCH_CHUNK_SIZE = 1024
+PREFETCH_MAX_CHUNKS = 16
+
+
+
+"""
+Matches the runs of bytes that are not valid UTF-8 in a line decoded with the
+surrogateescape error handler, and the char these are replaced with when the
+line is passed on.
+"""
+BAD_BYTES_REGEX = re.compile('[\udc80-\udcff]+')
+BAD_BYTES_REPLACEMENT = '\ufffd'
+
+
+
+"""
+The error message of a sequence of bytes that are not valid UTF-8, found at
+the given byte offset of the lines it is reported for. The offsets are within
+the lines, so that the shards of a dataset yield the same errors as the whole.
+"""
+BAD_BYTES_ERROR = 'invalid UTF-8 bytes {} (at byte offset {} of the line)'
+
+
+
 """
 List of lower-cased prefixes of common names for the column that contains the
 IPA data.
@@ -57,36 +151,130 @@ Dialect = namedtuple('Dialect',
 
 
 
+def gen_prefetched(data, chunk_size=PREFETCH_CHUNK_SIZE,
+					max_chunks=PREFETCH_MAX_CHUNKS):
+	"""
+	Yields the items of the given iterable, which is consumed in a background
+	thread, so that reading and parsing the data overlaps with the processing
+	of the items already yielded. The items are passed on in chunks of the
+	given size via a queue of the given max size. Exceptions raised by the
+	iterable are re-raised here. If this generator is closed early, the thread
+	stops reading and closes the iterable (if it is a generator).
+
+	As parsing holds the GIL, only the waiting for reads overlaps with the
+	linting: on benchmarks/prefetch.py, this is no faster (0.92-1.00x) if the
+	reads are fast and 1.09-1.37x faster with a simulated 0.5-1 ms delay per
+	8 KB read.
+	"""
+	import queue
+	import threading
+
+	chunks = queue.Queue(max_chunks)
+	stop = threading.Event()
+
+	def put(item):
+		while not stop.is_set():
+			try:
+				chunks.put(item, timeout=0.1)
+				return True
+			except queue.Full:
+				pass
+		return False
+
+	def produce():
+		items = iter(data)
+
+		try:
+			while True:
+				chunk = list(itertools.islice(items, chunk_size))
+				if not put(chunk) or not chunk:
+					break
+		except Exception as err:
+			put(err)
+		finally:
+			if stop.is_set() and hasattr(items, 'close'):
+				items.close()
+
+	thread = threading.Thread(target=produce, name='ipalint-reader', daemon=True)
+	thread.start()
+
+	try:
+		while True:
+			chunk = chunks.get()
+
+			if isinstance(chunk, Exception):
+				raise chunk
+			if not chunk:
+				break
+
+			yield from chunk
+
+	finally:
+		stop.set()
+
+
+
+def _quote(name):
+	"""
+	Returns the given SQL identifier quoted.
+	"""
+	return '"{}"'.format(name.replace('"', '""'))
+
+
+
 class Reader:
 	"""
 	Comprises the code for reading the dataset file which is to be linted.
 	"""
 
 	def __init__(self, dataset, has_header=True, ipa_col=None,
-						delimiter=None, quotechar=None, escapechar=None):
+						delimiter=None, quotechar=None, escapechar=None,
+						table=None, key_col=None, group_col=None, bad_bytes=False):
 		"""
-		Constructor. Expects either the path to the file to be read or an input
-		stream to read from. Optional args:
+		Constructor. Expects either the path to the file to be read, an input
+		stream to read from, or a DB-API cursor that has executed a query.
+		Optional args:
 
 		has_header: whether the first line of the file will be ignored or not;
 		ipa_col: the column from which to extract the IPA data; this could be
 		either the column's index or name, or None (in which case the Reader
 		will try to guess the column);
 		delimiter and quotechar: will be used as csv.reader arguments if
-		provided; if None, the Reader will try to guess the dialect.
+		provided; if None, the Reader will try to guess the dialect;
+		table: the table to read from if the dataset is an SQLite database, or
+		the sheet if it is a spreadsheet (by default, the first one);
+		key_col: the column of the cursor's rows that identifies them in the
+		report; if None, the rows are numbered starting from 1;
+		group_col: if set, the column (index or name) the value of which is
+		yielded as a third element of each tuple by gen_ipa_data;
+		bad_bytes: if set, bytes that are not valid UTF-8 do not stop the
+		reading, but are replaced and kept track of; see get_bad_bytes.
 		"""
 		self.log = logging.getLogger(__name__)
 		self.temp_dir = None
+		self.cursor = None
+		self.f = None  # the file being read by gen_ipa_data
+
+		# (bytes, byte offset in line): [] of line numbers, see _gen_checked_lines
+		self.bad_bytes = OrderedDict() if bad_bytes else None
 
 		if isinstance(dataset, str):
 			self.file_path = dataset
+		elif hasattr(dataset, 'fetchmany'):
+			self.file_path = None
+			self.cursor = dataset
 		else:
 			self.file_path = self._save_stdin(dataset)
 
+		self.table = table
+		self.key_col = key_col
+
 		self.has_header = has_header
 		self.ipa_col = ipa_col
+		self.group_col = group_col
 
 		self.is_single_col = False
+		self.dialect_confidence = None
 
 		self.delimiter = delimiter
 		self.quotechar = quotechar
@@ -99,13 +287,20 @@ class Reader:
 		stream to a file within that dir. Returns the path to the file. The dir
 		is removed in the __del__ method.
 		"""
+		from tempfile import TemporaryDirectory
+
 		self.temp_dir = TemporaryDirectory()
 		file_path = os.path.join(self.temp_dir.name, 'dataset')
 
 		try:
-			with open(file_path, 'w') as f:
-				for line in stdin:
-					f.write(line)
+			if self.bad_bytes is not None and hasattr(stdin, 'buffer'):
+				import shutil
+				with open(file_path, 'wb') as f:  # do not decode the bytes
+					shutil.copyfileobj(stdin.buffer, f)
+			else:
+				with open(file_path, 'w') as f:
+					for line in stdin:
+						f.write(line)
 		except TypeError:
 			self.temp_dir.cleanup()
 			raise ValueError('Could not read stdin')
@@ -116,7 +311,9 @@ class Reader:
 	def _open(self, file_path=None):
 		"""
 		Opens the file specified by the given path. Raises ValueError if there
-		is a problem with opening or reading the file.
+		is a problem with opening or reading the file. If self.bad_bytes is
+		set, the bytes that are not valid UTF-8 are decoded into lone
+		surrogates rather than raising UnicodeDecodeError.
 		"""
 		if file_path is None:
 			file_path = self.file_path
@@ -125,7 +322,8 @@ class Reader:
 			raise ValueError('Could not find file: {}'.format(file_path))
 
 		try:
-			f = open(file_path, encoding='utf-8', newline='')
+			f = open(file_path, encoding='utf-8', newline='',
+					errors='strict' if self.bad_bytes is None else 'surrogateescape')
 		except OSError as err:
 			self.log.error(str(err))
 			raise ValueError('Could not open file: {}'.format(file_path))
@@ -133,11 +331,70 @@ class Reader:
 		return f
 
 
-	def get_dialect(self):
+	def _get_ext(self):
+		"""
+		Returns the lower-cased extension of the dataset file or None if the
+		file has no extension.
+		"""
+		if self.file_path is None:
+			return None
+
+		ext = os.path.basename(self.file_path).rsplit('.', maxsplit=1)
+		return ext[1].lower() if len(ext) > 1 else None
+
+
+	def is_text(self):
+		"""
+		Returns True if the dataset is a text (csv, tsv or txt) file, the rows
+		of which are numbered by their lines, and False if it is a database,
+		a cursor, a spreadsheet or a Parquet or Arrow file.
+		"""
+		if self.cursor is not None:
+			return False
+
+		return self._get_ext() not in PARQUET_EXTENSIONS + ARROW_EXTENSIONS \
+				+ SQLITE_EXTENSIONS + XLSX_EXTENSIONS + ODS_EXTENSIONS
+
+
+	def has_row_keys(self):
+		"""
+		Returns True if the rows of the dataset are identified by keys (the
+		primary keys or rowids of an SQLite table, or the key column of a
+		cursor) rather than numbered by gen_ipa_data.
+		"""
+		if self.cursor is not None:
+			return self.key_col is not None
+
+		return self._get_ext() in SQLITE_EXTENSIONS
+
+
+	def get_position(self):
+		"""
+		Returns the (bytes read, file size in bytes) tuple of the dataset file
+		being read by gen_ipa_data, or None if the latter has not started or
+		if the dataset is not a text file (e.g. a database or a spreadsheet).
+		The number of bytes read is approximate, as the file is decoded in
+		chunks.
+		"""
+		if self.f is None:
+			return None
+
+		size = os.path.getsize(self.file_path)
+
+		if self.f.closed:
+			return size, size
+
+		return self.f.buffer.tell(), size
+
+
+	def get_dialect(self, lines=None):
 		"""
 		Returns a Dialect named tuple or None if the dataset file comprises a
 		single column of data. If the dialect is not already known, then tries
 		to determine it. Raises ValueError if it fails in the latter case.
+
+		If the optional arg is set, it is used as the sample of lines to
+		determine the dialect from, instead of reading the file.
 		"""
 		if self.is_single_col:
 			return None
@@ -147,23 +404,30 @@ class Reader:
 						True if self.escapechar is None else False,
 						self.escapechar)
 
-		ext = os.path.basename(self.file_path).rsplit('.', maxsplit=1)
-		ext = ext[1].lower() if len(ext) > 1 else None
-
-		if ext in TSV_EXTENSIONS:
+		if self._get_ext() in TSV_EXTENSIONS:
 			self.delimiter = '\t'
 			self.quotechar = '"'
 
 		else:
-			f = self._open()
-			lines = f.read().splitlines()
-			f.close()
+			if lines is None:
+				f = self._open()
+				lines = [line.rstrip('\r\n')
+						for line in itertools.islice(f, DIALECT_SAMPLE_SIZE)]
+				f.close()
+			else:
+				lines = lines[:DIALECT_SAMPLE_SIZE]
 
 			if lines:
 				dialect = self._determine_dialect(lines)
 			else:
 				dialect = None
 
+			if dialect and self.dialect_confidence < DIALECT_WARN_CONFIDENCE:
+				self.log.warning((
+					'Assuming {!r} as delimiter, but the file might as well '
+					'be using another one (confidence {:.2f})').format(
+						dialect.delimiter, self.dialect_confidence))
+
 			if dialect is None:
 				self.is_single_col = True
 			else:
@@ -180,42 +444,79 @@ class Reader:
 		few lines of a csv file. Returns the most likely Dialect named tuple or
 		None if the data seems to form a single column.
 
-		Ensures that using the returned dialect, all the lines given will have
-		the same number of columns.
+		All candidate dialects are scored in a single pass over the lines; the
+		score of a dialect is the share of lines having its most common number
+		of columns. Only dialects whose delimiter is present on each line are
+		considered. Ties are resolved in favour of the dialect that comes first
+		in the CSV_* lists. Sets self.dialect_confidence to the difference
+		between the best score and the best score of a dialect with another
+		delimiter.
 
 		Helper for the get_dialect method.
 		"""
-		permuts = [(quotechar, escapechar)
+		candidates = [(delim, quotechar, escapechar)
+				for delim in CSV_DELIMITERS
 				for quotechar in CSV_QUOTECHARS
 				for escapechar in CSV_ESCAPECHARS]
 
-		for delim in CSV_DELIMITERS:
-			counts = [line.count(delim) for line in lines]
+		col_counts = {cand: Counter() for cand in candidates}
 
-			if min(counts) == 0:
-				continue
+		for line in lines:
+			for cand in list(col_counts.keys()):
+				delim, quotechar, escapechar = cand
 
-			for quotechar, escapechar in permuts:
-				doublequote = True if escapechar is None else False
+				num_delims = line.count(delim)
+				if num_delims == 0:
+					del col_counts[cand]
+					continue
 
-				reader = csv.reader(lines, delimiter=delim, quotechar=quotechar,
-								doublequote=doublequote, escapechar=escapechar)
+				if quotechar not in line and (
+						escapechar is None or escapechar not in line):
+					col_counts[cand][num_delims+1] += 1
+					continue
 
-				try:
-					assert len(set([len(line) for line in reader])) == 1
-				except AssertionError:
+				num_quotes = line.count(quotechar)
+				if escapechar is not None:
+					num_quotes -= line.count(escapechar + quotechar)
+
+				if num_quotes % 2:  # unbalanced quotes
+					col_counts[cand][None] += 1
 					continue
-				else:
-					break
-			else:
-				continue  # no suitable quoting found
 
-			break  # found it!
+				reader = csv.reader([line], delimiter=delim,
+								quotechar=quotechar, escapechar=escapechar,
+								doublequote=escapechar is None)
+				try:
+					col_counts[cand][len(next(reader))] += 1
+				except csv.Error:
+					col_counts[cand][None] += 1
+
+		scores = {}
 
-		else:
+		for cand, counter in col_counts.items():
+			num_cols, freq = max(counter.items(),
+							key=lambda item: (item[0] is not None, item[1]))
+			if num_cols is not None and num_cols > 1:
+				scores[cand] = freq / len(lines)
+
+		if not scores:
+			return None
+
+		best = max(scores.keys(),
+				key=lambda cand: (scores[cand], -candidates.index(cand)))
+
+		if scores[best] < DIALECT_MIN_SCORE:
 			return None
 
-		return Dialect(delim, quotechar, doublequote, escapechar)
+		runner_up = max([score for cand, score in scores.items()
+						if cand[0] != best[0]], default=0)
+
+		self.dialect_confidence = scores[best] - runner_up
+		self.log.debug('Determined dialect {} with confidence {:.2f}'.format(
+						best, self.dialect_confidence))
+
+		delim, quotechar, escapechar = best
+		return Dialect(delim, quotechar, escapechar is None, escapechar)
 
 
 	def _get_csv_reader(self, f, dialect):
@@ -224,7 +525,8 @@ class Reader:
 		tuple. If the file has a header, it already will be gone through.
 
 		Also, if self.ipa_col is not set, an attempt will be made to infer
-		which the IPA column is. ValueError would be raised otherwise.
+		which the IPA column is. ValueError would be raised otherwise. The
+		group column, if set, is resolved to an index as well.
 		"""
 		reader = csv.reader(f,
 					delimiter = dialect.delimiter,
@@ -232,24 +534,54 @@ class Reader:
 					doublequote = dialect.doublequote,
 					escapechar = dialect.escapechar)
 
-		if self.has_header:
-			header = next(reader)
-			if not isinstance(self.ipa_col, int):
-				self.ipa_col = self._infer_ipa_col(header)
-
-		else:
-			if not isinstance(self.ipa_col, int):
-				if not self.ipa_col:
-					raise ValueError('Cannot infer IPA column without header')
+		header = next(reader, []) if self.has_header else None
+		self.ipa_col = self.get_ipa_col(header)
 
-				try:
-					self.ipa_col = int(self.ipa_col)
-				except ValueError:
-					raise ValueError('Cannot find column: {}'.format(self.ipa_col))
+		if self.group_col is not None:
+			self.group_col = self.get_group_col(header)
 
 		return reader
 
 
+	def get_ipa_col(self, header=None):
+		"""
+		Returns the index of the IPA column, given the header row as a [] of
+		column names or None if the file has no header. Raises ValueError if
+		the column cannot be determined.
+		"""
+		if isinstance(self.ipa_col, int):
+			return self.ipa_col
+
+		if header is not None:
+			return self._infer_ipa_col(header)
+
+		if not self.ipa_col:
+			raise ValueError('Cannot infer IPA column without header')
+
+		try:
+			return int(self.ipa_col)
+		except ValueError:
+			raise ValueError('Cannot find column: {}'.format(self.ipa_col))
+
+
+	def get_group_col(self, header=None):
+		"""
+		Returns the index of the column to group the rows by, given the header
+		row as a [] of column names or None if the file has no header. Raises
+		ValueError if the column cannot be found.
+		"""
+		if isinstance(self.group_col, int):
+			return self.group_col
+
+		if header is not None and self.group_col in header:
+			return header.index(self.group_col)
+
+		try:
+			return int(self.group_col)
+		except ValueError:
+			raise ValueError('Could not find column: {}'.format(self.group_col))
+
+
 	def _infer_ipa_col(self, header):
 		"""
 		Returns the column (as index) containing the IPA data based on the
@@ -289,33 +621,90 @@ class Reader:
 	def gen_ipa_data(self):
 		"""
 		Generator for iterating over the IPA strings found in the dataset file.
-		Yields the IPA data string paired with the respective line number.
+		Yields the IPA data string paired with the respective line number (or
+		row index, in the case of Parquet and Arrow files, or row key, in the
+		case of databases, or row number, in the case of spreadsheets). If
+		self.group_col is set, the tuples have a third element, the value of
+		the group column.
 		"""
-		dialect = self.get_dialect()
-		f = self._open()
+		ext = self._get_ext()
+
+		if self.cursor is not None:
+			yield from self._gen_cursor_data(self.cursor)
+			return
+
+		if ext in PARQUET_EXTENSIONS or ext in ARROW_EXTENSIONS:
+			yield from self._gen_arrow_data(ext in PARQUET_EXTENSIONS)
+			return
+
+		if ext in SQLITE_EXTENSIONS:
+			yield from self._gen_sqlite_data()
+			return
+
+		if ext in XLSX_EXTENSIONS or ext in ODS_EXTENSIONS:
+			yield from self._gen_sheet_data(ext in ODS_EXTENSIONS)
+			return
+
+		try:
+			dialect = self.get_dialect()
+			f = self.f = self._open()
+		except UnicodeDecodeError:
+			raise ValueError('Invalid UTF-8 in file: {}'.format(self.file_path))
+
+		lines = f if self.bad_bytes is None else self._gen_checked_lines(f)
 
 		try:
 			if dialect:
-				for res in self._gen_csv_data(f, dialect):
+				for res in self._gen_csv_data(lines, dialect):
 					yield res
 			else:
-				for res in self._gen_txt_data(f):
+				for res in self._gen_txt_data(lines):
 					yield res
 
+		except UnicodeDecodeError:
+			raise ValueError('Invalid UTF-8 in file: {}'.format(self.file_path))
+
 		finally:
 			f.close()
 
 
+	def _gen_checked_lines(self, f):
+		"""
+		Yields the lines of the given file handler, opened with the
+		surrogateescape error handler, with the bytes that are not valid UTF-8
+		replaced with BAD_BYTES_REPLACEMENT. The line numbers of the replaced
+		bytes are added to self.bad_bytes, under the bytes and their byte
+		offset within the line.
+
+		Helper for the gen_ipa_data method.
+		"""
+		for line_num, line in enumerate(f, start=1):
+			if not BAD_BYTES_REGEX.search(line):
+				yield line
+				continue
+
+			for match in BAD_BYTES_REGEX.finditer(line):
+				raw = match.group().encode('utf-8', 'surrogateescape')
+				offset = len(line[:match.start()].encode('utf-8', 'surrogateescape'))
+				self.bad_bytes.setdefault((raw, offset), []).append(line_num)
+
+			yield BAD_BYTES_REGEX.sub(BAD_BYTES_REPLACEMENT, line)
+
+
 	def _gen_csv_data(self, f, dialect):
 		"""
 		Yields (column data, row number) tuples from the given csv file
-		handler, using the given Dialect named tuple instance. Depends on
-		self.ipa_col being correctly set.
+		handler (or iterable of lines), using the given Dialect named tuple
+		instance. Depends on self.ipa_col being correctly set.
 
 		Helper for the gen_ipa_data method.
 		"""
 		reader = self._get_csv_reader(f, dialect)
 
+		if self.group_col is not None:
+			yield from self._gen_csv_groups(reader)
+			return
+
 		for line in reader:
 			try:
 				datum = line[self.ipa_col]
@@ -326,13 +715,36 @@ class Reader:
 			yield datum, reader.line_num
 
 
+	def _gen_csv_groups(self, reader):
+		"""
+		Yields (column data, row number, group) tuples from the given
+		csv.reader, the header of which has been gone through. Depends on
+		self.ipa_col and self.group_col being correctly set.
+
+		Helper for the _gen_csv_data method.
+		"""
+		for line in reader:
+			try:
+				datum, group = line[self.ipa_col], line[self.group_col]
+			except IndexError:
+				mes = 'Could not find IPA data on line: {}'.format(line)
+				raise ValueError(mes)
+
+			yield datum, reader.line_num, group
+
+
 	def _gen_txt_data(self, f):
 		"""
-		Yields (line, line number) tuples from the given file handler. Skips
-		the first line if the self.has_header flag is set.
+		Yields (line, line number) tuples from the given file handler (or
+		iterable of lines). Skips the first line if the self.has_header flag
+		is set. Raises ValueError if self.group_col is set, as there are no
+		other columns to group by.
 
 		Helper for the gen_ipa_data method.
 		"""
+		if self.group_col is not None:
+			raise ValueError('Cannot group the rows of a single-column dataset')
+
 		reader = iter(f)
 
 		for line_num, line in enumerate(reader):
@@ -344,6 +756,281 @@ class Reader:
 			yield datum, line_num+1
 
 
+	def _gen_arrow_data(self, is_parquet=False):
+		"""
+		Yields (column data, row index) tuples from the Parquet or Arrow file,
+		reading only the IPA column, one record batch at a time. Row indices
+		start from 0 and null values are skipped. Raises ValueError if pyarrow
+		is not installed or if the file cannot be read.
+
+		Helper for the gen_ipa_data method.
+		"""
+		try:
+			import pyarrow
+			import pyarrow.ipc
+			import pyarrow.parquet
+		except ImportError:
+			raise ValueError('Reading Parquet/Arrow files requires pyarrow')
+
+		if not os.path.exists(self.file_path):
+			raise ValueError('Could not find file: {}'.format(self.file_path))
+
+		try:
+			if is_parquet:
+				f = pyarrow.parquet.ParquetFile(self.file_path)
+				names = f.schema_arrow.names
+			else:
+				source = pyarrow.memory_map(self.file_path)
+				try:
+					f = pyarrow.ipc.open_file(source)
+				except pyarrow.ArrowInvalid:
+					source.seek(0)
+					f = pyarrow.ipc.open_stream(source)
+				names = f.schema.names
+
+		except (OSError, pyarrow.ArrowException) as err:
+			self.log.error(str(err))
+			raise ValueError('Could not open file: {}'.format(self.file_path))
+
+		if isinstance(self.ipa_col, int):
+			col = self.ipa_col
+		else:
+			col = self._infer_ipa_col(names)
+
+		if col >= len(names):
+			raise ValueError('Could not find column: {}'.format(col))
+
+		group = None if self.group_col is None else self.get_group_col(names)
+		if group is not None and group >= len(names):
+			raise ValueError('Could not find column: {}'.format(group))
+
+		if is_parquet:
+			columns = [names[col]] if group is None else [names[col], names[group]]
+			batches = f.iter_batches(ARROW_BATCH_SIZE, columns=columns)
+			col, group = 0, None if group is None else 1
+		elif hasattr(f, 'num_record_batches'):
+			batches = (f.get_batch(i) for i in range(f.num_record_batches))
+		else:
+			batches = f
+
+		row_index = 0
+
+		for batch in batches:
+			if group is not None:
+				keys = batch.column(group).to_pylist()
+				for index, datum in enumerate(batch.column(col).to_pylist()):
+					if datum is not None:
+						yield str(datum), row_index + index, keys[index]
+				row_index += len(keys)
+				continue
+
+			for datum in batch.column(col).to_pylist():
+				if datum is not None:
+					yield str(datum), row_index
+				row_index += 1
+
+
+	def _gen_cursor_data(self, cursor):
+		"""
+		Yields (column data, row key) tuples from the given DB-API cursor,
+		fetching DB_BATCH_SIZE rows at a time. The IPA column is determined
+		from the cursor's description. If self.key_col is not set, the row key
+		is the row's number, starting from 1. Null values are skipped.
+
+		Helper for the gen_ipa_data method.
+		"""
+		if cursor.description is None:
+			raise ValueError('The cursor has not executed a query')
+
+		names = [desc[0] for desc in cursor.description]
+
+		col = self.ipa_col
+		if not isinstance(col, int):
+			col = self._infer_ipa_col(names)
+		if col >= len(names):
+			raise ValueError('Could not find column: {}'.format(col))
+
+		if self.key_col is None or isinstance(self.key_col, int):
+			key_col = self.key_col
+		elif self.key_col in names:
+			key_col = names.index(self.key_col)
+		else:
+			raise ValueError('Could not find column: {}'.format(self.key_col))
+
+		group = None if self.group_col is None else self.get_group_col(names)
+		if group is not None and group >= len(names):
+			raise ValueError('Could not find column: {}'.format(group))
+
+		row_num = 0
+
+		while True:
+			rows = cursor.fetchmany(DB_BATCH_SIZE)
+			if not rows:
+				break
+
+			for row in rows:
+				row_num += 1
+				if row[col] is None:
+					continue
+
+				key = row_num if key_col is None else row[key_col]
+
+				if group is None:
+					yield str(row[col]), key
+				else:
+					yield str(row[col]), key, row[group]
+
+
+	def _gen_sqlite_data(self):
+		"""
+		Yields (column data, row key) tuples from the SQLite database, reading
+		only the IPA column and the table's primary key (or rowid, if there is
+		no primary key). The key of a table with a composite primary key is the
+		values of its columns joined by slashes, e.g. fra/42. Raises ValueError
+		if the database or the table cannot be read.
+
+		Helper for the gen_ipa_data method.
+		"""
+		import sqlite3
+
+		if not os.path.exists(self.file_path):
+			raise ValueError('Could not find file: {}'.format(self.file_path))
+
+		try:
+			conn = sqlite3.connect('file:{}?mode=ro'.format(
+						os.path.abspath(self.file_path)), uri=True)
+		except sqlite3.Error as err:
+			self.log.error(str(err))
+			raise ValueError('Could not open database: {}'.format(self.file_path))
+
+		try:
+			cursor = conn.cursor()
+
+			table = self.table
+			if table is None:
+				cursor.execute((
+					'SELECT name FROM sqlite_master WHERE type = \'table\' '
+					'AND name NOT LIKE \'sqlite_%\''))
+				tables = [row[0] for row in cursor.fetchall()]
+				if len(tables) != 1:
+					raise ValueError('Please specify one of the tables: {}'.format(
+										', '.join(tables)))
+				table = tables[0]
+
+			cursor.execute('PRAGMA table_info({})'.format(_quote(table)))
+			columns = cursor.fetchall()  # (cid, name, type, notnull, default, pk)
+			if not columns:
+				raise ValueError('Could not find table: {}'.format(table))
+
+			col = self.ipa_col
+			if not isinstance(col, int):
+				col = self._infer_ipa_col([column[1] for column in columns])
+			if col >= len(columns):
+				raise ValueError('Could not find column: {}'.format(col))
+
+			pk = [column[1] for column in sorted(columns, key=lambda c: c[5]) if column[5]]
+			if not pk:
+				key = 'rowid'
+			elif len(pk) == 1:
+				key = _quote(pk[0])
+			else:
+				key = ' || \'/\' || '.join(['IFNULL({}, \'\')'.format(_quote(name))
+											for name in pk])
+
+			group = None
+			if self.group_col is not None:
+				group = self.get_group_col([column[1] for column in columns])
+				if group >= len(columns):
+					raise ValueError('Could not find column: {}'.format(group))
+
+			cursor.execute('SELECT {}, {}{} FROM {}'.format(
+						key, _quote(columns[col][1]),
+						'' if group is None else ', ' + _quote(columns[group][1]),
+						_quote(table)))
+
+			reader = Reader(cursor, ipa_col=1, key_col=0,
+							group_col=None if group is None else 2)
+			yield from reader.gen_ipa_data()
+
+		except sqlite3.Error as err:
+			self.log.error(str(err))
+			raise ValueError('Could not read database: {}'.format(self.file_path))
+
+		finally:
+			conn.close()
+
+
+	def _gen_sheet_data(self, is_ods=False):
+		"""
+		Yields (cell value, row number) tuples from the sheet of the XLSX or
+		ODS file specified by self.table (or its first sheet), only taking the
+		IPA column's cells; see spreadsheet.Workbook. The rows are given as
+		SheetRow positions, e.g. Swadesh!5, the numbers being these of the
+		spreadsheet, starting from 1; the header, if such, is the first
+		non-empty row. Empty cells are skipped. If self.group_col is set, the
+		tuples also include the group column's cell value (or the empty string).
+		Raises ValueError if the file or the sheet cannot be read.
+
+		Helper for the gen_ipa_data method.
+		"""
+		from ipalint.spreadsheet import SheetRow, Workbook
+
+		if not os.path.exists(self.file_path):
+			raise ValueError('Could not find file: {}'.format(self.file_path))
+
+		workbook = Workbook(self.file_path, is_ods)
+
+		try:
+			rows = workbook.gen_rows(self.table)
+
+			if self.has_header:
+				row_num, values = next(rows, (None, {}))
+				header = [values.get(index, '')
+						for index in range(max(values.keys(), default=-1) + 1)]
+			else:
+				header = None
+
+			col = self.get_ipa_col(header)
+
+			if self.group_col is not None:
+				group = self.get_group_col(header)
+				for row_num, values in rows:
+					if col in values:
+						yield values[col], SheetRow('{}!{}'.format(
+								workbook.sheet, row_num)), values.get(group, '')
+				return
+
+			for row_num, values in rows:
+				if col in values:
+					yield values[col], SheetRow('{}!{}'.format(workbook.sheet, row_num))
+
+		finally:
+			workbook.close()
+
+
+	def get_bad_bytes(self, line_offset=0, line_filter=None):
+		"""
+		Returns the [] of (error message, [] of line numbers) tuples of the
+		sequences of bytes that are not valid UTF-8 found so far by
+		gen_ipa_data, in order of first occurrence; the line offset is added to
+		the line numbers. If line_filter is set (e.g. to the diff.LineRanges of
+		the changed lines), only the (unshifted) line numbers within it are
+		included. The list is empty unless the bad_bytes flag has been set.
+		"""
+		res = []
+
+		for (raw, offset), lines in (self.bad_bytes or {}).items():
+			if line_filter is not None:
+				lines = [line_num for line_num in lines if line_num in line_filter]
+				if not lines:
+					continue
+
+			res.append((BAD_BYTES_ERROR.format(repr(raw)[2:-1], offset),
+						[line_num + line_offset for line_num in lines]))
+
+		return res
+
+
 	def __del__(self):
 		"""
 		Destructor. Removes the temporary directory, if such.
@@ -1,7 +1,13 @@
-from collections import defaultdict, namedtuple, OrderedDict
+from collections import namedtuple, OrderedDict
 
+import heapq
+import io
+import itertools
 import logging
 
+from ipalint.spill import SORT_LIMIT, SpillList, gen_sorted, gen_unique
+from ipalint.spill import split_limit
+
 
 
 """
@@ -11,83 +17,284 @@ Error = namedtuple('Error', ['string'])
 
 
 
+def format_counts(occurrences, rows):
+	"""
+	Returns the given number of occurrences and of lines as these appear in
+	the counts reports, e.g. 1 occurrence, 3 lines.
+	"""
+	return '{} occurrence{}, {} line{}'.format(
+			occurrences, '' if occurrences == 1 else 's',
+			rows, '' if rows == 1 else 's')
+
+
+
+def gen_ranges(sorted_lines):
+	"""
+	Yields (first, last) tuples for the runs of consecutive line numbers in
+	the given iterable of sorted, unique line numbers. Line numbers that are
+	not ints are never collapsed.
+	"""
+	first = last = None
+
+	for line_num in sorted_lines:
+		if (isinstance(line_num, int) and isinstance(last, int)
+				and line_num == last + 1):
+			last = line_num
+			continue
+
+		if first is not None:
+			yield first, last
+
+		first = last = line_num
+
+	if first is not None:
+		yield first, last
+
+
+
+class Tally:
+	"""
+	Can be used in place of a [] of line numbers when only the number of
+	occurrences and the number of distinct lines are needed; its size does not
+	depend on the number of line numbers added. Assumes that the line numbers
+	are appended in non-decreasing order, as these come from the Reader.
+	"""
+
+	def __init__(self):
+		"""
+		Constructor.
+		"""
+		self.occurrences = 0
+		self.rows = 0
+		self.last = None
+
+
+	def append(self, line_num):
+		"""
+		Counts an occurrence on the given line.
+		"""
+		self.occurrences += 1
+
+		if line_num != self.last:
+			self.rows += 1
+			self.last = line_num
+
+
+	def extend(self, lines):
+		"""
+		Counts the occurrences in the given Tally or iterable of line numbers.
+		"""
+		if isinstance(lines, Tally):
+			self.occurrences += lines.occurrences
+			self.rows += lines.rows
+			self.last = lines.last
+		else:
+			for line_num in lines:
+				self.append(line_num)
+
+
+	def __len__(self):
+		"""
+		Returns the number of occurrences.
+		"""
+		return self.occurrences
+
+
+
 class Reporter:
 	"""
 	An instance of this class is used to collect all the errors found by the
 	various linters, so that they can be output together at the end.
 	"""
 
-	def __init__(self):
+	def __init__(self, sort_limit=SORT_LIMIT):
 		"""
-		Constructor.
+		Constructor. The optional arg sets the max number of line numbers that
+		are sorted in memory at once; see spill.gen_sorted.
 		"""
 		self.log = logging.getLogger(__name__)
-		self.errors = OrderedDict()  # error: [] of line numbers
+		self.errors = OrderedDict()  # error: [] of line numbers or Tally
+		self.symbols = OrderedDict()  # symbol: [] of line numbers or Tally
+
+		self.sort_limit = sort_limit
 
 
 	def add(self, lines, message):
 		"""
 		Adds a lint issue to the report. The first arg should be [] of lines on
-		which the issue is present. The second arg should be the error message.
+		which the issue is present (or a Tally or SpillList thereof). The
+		second arg should be the error message.
 		"""
 		error = Error(message)
 
 		if error not in self.errors:
-			self.errors[error] = []
+			if isinstance(lines, SpillList):  # do not read it into memory
+				self.errors[error] = lines
+				return
+
+			self.errors[error] = Tally() if isinstance(lines, Tally) else []
 
 		self.errors[error].extend(lines)
 
 
+	def add_symbol(self, lines, description):
+		"""
+		Adds a valid symbol to the inventory part of the report. The args are
+		as these of the add method. The inventory is only included in the
+		counts report.
+		"""
+		if description not in self.symbols:
+			if isinstance(lines, SpillList):
+				self.symbols[description] = lines
+				return
+
+			self.symbols[description] = Tally() if isinstance(lines, Tally) else []
+
+		self.symbols[description].extend(lines)
+
+
 	def clear(self):
 		"""
 		Removes the errors that have been collected so far. Useful for unit
 		testing.
 		"""
 		self.errors = OrderedDict()
+		self.symbols = OrderedDict()
 
 
-	def _get_linewise_report(self):
+	def _write_linewise_report(self, stream):
 		"""
-		Returns a report each line of which comprises a pair of an input line
+		Writes a report each line of which comprises a pair of an input line
 		and an error. Unlike in the standard report, errors will appear as many
 		times as they occur.
 
-		Helper for the get_report method.
+		The line numbers of each error are sorted separately (spilling to disk
+		if needed) and the resulting streams are then heap-merged, so that the
+		report is written in line order without building it in memory. As all
+		the streams are open at once, these share the sort limit.
+
+		Helper for the write_report method.
 		"""
-		d = defaultdict(list)  # line: [] of errors
+		limits = split_limit([len(lines) for lines in self.errors.values()],
+							self.sort_limit)
 
-		for error, lines in self.errors.items():
-			for line_num in lines:
-				d[line_num].append(error)
+		streams = [
+			zip(gen_sorted(lines, limit), itertools.repeat(index))
+			for index, (lines, limit) in enumerate(zip(self.errors.values(), limits))]
 
-		return '\n'.join([
-			'{:>3} → {}'.format(line, error.string)
-			for line in sorted(d.keys())
-			for error in d[line]])
+		errors = list(self.errors.keys())
 
+		for line_num, index in heapq.merge(*streams):
+			stream.write('{:>3} → {}\n'.format(line_num, errors[index].string))
 
-	def _get_report(self, with_line_nums=True):
+
+	def _write_report(self, stream, with_line_nums=True, ranges=False,
+						max_lines=None):
 		"""
-		Returns a report which includes each distinct error only once, together
+		Writes a report which includes each distinct error only once, together
 		with a list of the input lines where the error occurs. The latter will
 		be omitted if flag is set to False.
 
-		Helper for the get_report method.
+		If the ranges flag is set, consecutive line numbers are collapsed into
+		ranges (e.g. 3-7). If max_lines is set, only the first so many line
+		numbers (or ranges) are written, followed by the total line count.
+
+		Helper for the write_report method.
 		"""
-		templ = '{} ← {}' if with_line_nums else '{}'
+		for error, lines in self.errors.items():
+			stream.write(error.string)
+
+			if with_line_nums:
+				stream.write(' ← ')
+
+				lines = gen_unique(gen_sorted(lines, self.sort_limit))
+				if ranges:
+					lines = gen_ranges(lines)
+				else:
+					lines = ((line_num, line_num) for line_num in lines)
 
-		return '\n'.join([
-			templ.format(error.string, ','.join(map(str, sorted(set(lines)))))
-			for error, lines in self.errors.items()])
+				num_entries = 0
+				num_lines = 0
 
+				for first, last in lines:
+					if max_lines is None or num_entries < max_lines:
+						if num_entries:
+							stream.write(',')
+						if first == last:
+							stream.write(str(first))
+						else:
+							stream.write('{}-{}'.format(first, last))
 
-	def get_report(self, linewise=False, no_lines=False):
+					num_entries += 1
+					num_lines += 1 if first == last else last - first + 1
+
+				if max_lines is not None and num_entries > max_lines:
+					stream.write('{}… ({} in total)'.format(
+							',' if max_lines > 0 else '', num_lines))
+
+			stream.write('\n')
+
+
+	def _count(self, lines):
 		"""
-		Returns a string describing all the errors collected so far (the
-		report). The first flag determines the type of report. The second flag
-		is ignored if the first is set to True.
+		Returns the (number of occurrences, number of distinct lines) tuple for
+		the given [] of line numbers or Tally.
+
+		Helper for the _write_counts_report method.
+		"""
+		if isinstance(lines, Tally):
+			return lines.occurrences, lines.rows
+
+		rows = sum(1 for _ in gen_unique(gen_sorted(lines, self.sort_limit)))
+		return len(lines), rows
+
+
+	def _write_counts_report(self, stream):
 		"""
-		if linewise:
-			return self._get_linewise_report()
+		Writes a report which includes each distinct error once, together with
+		the number of its occurrences and the number of lines it occurs on.
+		These are followed by the inventory of valid symbols, if such, in the
+		same format.
+
+		Helper for the write_report method.
+		"""
+		templ = '{} ← {}\n'
+
+		for error, lines in self.errors.items():
+			stream.write(templ.format(error.string,
+							format_counts(*self._count(lines))))
+
+		if self.errors and self.symbols:
+			stream.write('\n')
+
+		for description, lines in self.symbols.items():
+			stream.write(templ.format(description,
+							format_counts(*self._count(lines))))
+
+
+	def write_report(self, stream, linewise=False, no_lines=False,
+						ranges=False, max_lines=None, counts=False):
+		"""
+		Writes the report, i.e. the errors collected so far, to the given text
+		stream, one error per line. The linewise and counts flags determine the
+		type of report; the latter takes precedence. The rest of the args only
+		apply to the standard report; see _write_report for these.
+		"""
+		if counts:
+			self._write_counts_report(stream)
+		elif linewise:
+			self._write_linewise_report(stream)
 		else:
-			return self._get_report(not no_lines)
+			self._write_report(stream, not no_lines, ranges, max_lines)
+
+
+	def get_report(self, linewise=False, no_lines=False,
+						ranges=False, max_lines=None, counts=False):
+		"""
+		Returns a string describing all the errors collected so far (the
+		report). The args are the same as these of the write_report method.
+		"""
+		stream = io.StringIO()
+		self.write_report(stream, linewise, no_lines, ranges, max_lines, counts)
+
+		return stream.getvalue().rstrip('\n')
@@ -0,0 +1,239 @@
+from collections import namedtuple, OrderedDict
+
+import functools
+import logging
+import re
+import sys
+import unicodedata
+
+from ipalint.report import Tally
+
+
+
+"""
+The max number of combining diacritics that may follow a base symbol before
+the stacked-diacritics rule is triggered.
+"""
+MAX_STACKED_DIACRITICS = 2
+
+
+
+"""
+Represents a lint rule. The pattern is a function that returns the source of a
+regex matching the rule's violations; it is only called if the rule is
+enabled. The message is the error message in the report.
+"""
+Rule = namedtuple('Rule', ['name', 'message', 'pattern'])
+
+
+
+"""
+The registered rules, name: Rule; see register_rule.
+"""
+RULES = OrderedDict()
+
+
+
+def register_rule(name, message, pattern):
+	"""
+	Registers a rule that can then be enabled by name. The pattern arg can be
+	either a regex source string or a function returning such; the latter is
+	useful for char classes that are costly to build (see char_class). The
+	regex must not contain capturing groups.
+	"""
+	if isinstance(pattern, str):
+		source = pattern
+		pattern = lambda: source
+
+	RULES[name] = Rule(name, message, pattern)
+
+
+
+@functools.lru_cache(maxsize=None)
+def char_class(predicate):
+	"""
+	Returns the source of a regex char class matching all the chars for which
+	the given predicate function returns True, as ranges of code points. Scans
+	the whole Unicode range, so the result is cached.
+	"""
+	ranges = []
+
+	for code in range(sys.maxunicode + 1):
+		if predicate(chr(code)):
+			if ranges and ranges[-1][1] == code - 1:
+				ranges[-1][1] = code
+			else:
+				ranges.append([code, code])
+
+	parts = []
+	for first, last in ranges:
+		parts.append(re.escape(chr(first)) if first == last else
+				'{}-{}'.format(re.escape(chr(first)), re.escape(chr(last))))
+
+	return '[{}]'.format(''.join(parts))
+
+
+
+def is_combining(char):
+	"""
+	Returns True if the given char is a combining diacritic.
+	"""
+	return unicodedata.combining(char) > 0
+
+
+
+def is_other_whitespace(char):
+	"""
+	Returns True if the given char is whitespace other than the space.
+	"""
+	return char.isspace() and char != ' '
+
+
+
+register_rule('double-space', 'consecutive spaces', '  ')
+
+register_rule('other-whitespace', 'whitespace other than space (e.g. tab or NBSP)',
+	lambda: char_class(is_other_whitespace))
+
+register_rule('leading-diacritic', 'combining diacritic without a base symbol',
+	lambda: '(?:^| )' + char_class(is_combining))
+
+register_rule('stacked-diacritics',
+	'more than {} combining diacritics on a symbol'.format(MAX_STACKED_DIACRITICS),
+	lambda: '{}{{{},}}'.format(char_class(is_combining), MAX_STACKED_DIACRITICS + 1))
+
+
+
+def get_rule_names(names):
+	"""
+	Returns the [] of rule names for the given [] of names as given by the
+	user, expanding all to all the registered rules. Raises ValueError if a
+	name is not that of a registered rule.
+	"""
+	res = []
+
+	for name in names:
+		if name == 'all':
+			res.extend([key for key in RULES if key not in res])
+		elif name in RULES:
+			if name not in res:
+				res.append(name)
+		else:
+			raise ValueError('Unknown rule: {} (choose from: {})'.format(
+							name, ', '.join(list(RULES) + ['all'])))
+
+	return res
+
+
+
+class RuleEngine:
+	"""
+	Checks strings against the enabled rules and keeps track of the lines on
+	which each rule is violated. The rules' patterns are fused into a single
+	regex, so that each string is traversed once, regardless of the number of
+	rules.
+
+	Most strings do not violate any rule, so these are first checked against
+	the plain alternation of the rules' patterns. Otherwise, a second regex
+	matches (the empty string) at the positions where at least one rule is
+	violated and there tries each rule's pattern in a lookahead of its own, so
+	that overlapping violations of different rules are all caught.
+	"""
+
+	def __init__(self, rules=[], counts=False, store=None):
+		"""
+		Constructor. The first arg is the [] of names of the rules to enable.
+		The rest of the args are as in Normaliser's constructor. Raises
+		ValueError if a rule is not registered.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		self.rules = [RULES[name] for name in get_rule_names(rules)]
+		self.regexes = None  # compiled on first use
+
+		if counts:
+			self.accum = Tally
+		elif store is not None:
+			self.accum = store.new_list
+		else:
+			self.accum = list
+
+		self.errors = [self.accum() for rule in self.rules]
+
+
+	def _compile(self):
+		"""
+		Returns the (any violation, which violations) tuple of compiled regexes
+		fusing the patterns of the enabled rules.
+
+		Helper for the find method.
+		"""
+		patterns = [rule.pattern() for rule in self.rules]
+		any_pattern = '|'.join(['(?:{})'.format(pattern) for pattern in patterns])
+
+		return re.compile(any_pattern), re.compile(
+			'(?={})'.format(any_pattern) + ''.join([
+				'(?:(?=({})))?'.format(pattern) for pattern in patterns]))
+
+
+	def find(self, string):
+		"""
+		Yields a (rule index, start, end) tuple for each violation of the
+		enabled rules in the given string, the last two being the span of the
+		violation.
+		"""
+		if not self.rules:
+			return
+
+		if self.regexes is None:
+			self.regexes = self._compile()
+
+		match = self.regexes[0].search(string)
+		if match is None:
+			return
+
+		for match in self.regexes[1].finditer(string, match.start()):
+			for index, group in enumerate(match.groups()):
+				if group is not None:
+					yield (index,) + match.span(index + 1)
+
+
+	def check(self, string, line_num):
+		"""
+		Checks the given (normalised) string against the enabled rules and
+		returns the tuple of the names of the rules it violates. The second arg
+		is used as an ID of the string when reporting the violations.
+		"""
+		if not self.rules:
+			return ()
+
+		hits = set([index for index, start, end in self.find(string)])
+
+		for index in sorted(hits):
+			self.errors[index].append(line_num)
+
+		return tuple([self.rules[index].name for index in sorted(hits)])
+
+
+	def clear(self):
+		"""
+		Forgets the violations that have been found so far.
+		"""
+		self.errors = [self.accum() for rule in self.rules]
+
+
+	def count_errors(self):
+		"""
+		Returns the number of violations found so far.
+		"""
+		return sum([len(lines) for lines in self.errors])
+
+
+	def report(self, reporter):
+		"""
+		Adds the violations that have been found so far to the given Reporter
+		instance.
+		"""
+		for rule, lines in zip(self.rules, self.errors):
+			if lines:
+				reporter.add(lines, rule.message)
@@ -0,0 +1,339 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import json
+import logging
+import queue
+import threading
+import time
+
+
+
+"""
+The host the server binds to if only a port is given; by default the server is
+only reachable from the local machine.
+"""
+DEFAULT_HOST = '127.0.0.1'
+
+
+
+"""
+The max number of strings that are linted together in a single batch, and the
+max number of seconds a request may wait for other requests to join its batch.
+With no waiting, a batch comprises the requests that have queued up while the
+previous batch was being linted.
+"""
+BATCH_MAX_SIZE = 1000
+BATCH_MAX_WAIT = 0
+
+
+
+"""
+The max size of a request body, in bytes.
+"""
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+
+def parse_address(address):
+	"""
+	Returns the (host, port) tuple for the given [HOST:]PORT string. Raises
+	ValueError if the string is not such.
+	"""
+	host, sep, port = str(address).rpartition(':')
+
+	try:
+		port = int(port)
+		assert 0 <= port < 65536
+	except (ValueError, AssertionError):
+		raise ValueError('Bad address: {}'.format(address))
+
+	return host or DEFAULT_HOST, port
+
+
+
+class Job:
+	"""
+	A [] of strings waiting to be linted by a Batcher, together with the
+	results once these are ready.
+	"""
+
+	def __init__(self, strings):
+		"""
+		Constructor.
+		"""
+		self.strings = strings
+		self.results = None
+		self.error = None
+		self.done = threading.Event()
+
+
+
+class Batcher:
+	"""
+	Lints the strings submitted from multiple threads in a single worker
+	thread, coalescing the jobs that arrive close to each other into batches.
+	This way the linting function is never called concurrently and the per
+	call overhead is shared between the requests of a batch.
+	"""
+
+	def __init__(self, lint_func, max_size=BATCH_MAX_SIZE,
+						max_wait=BATCH_MAX_WAIT):
+		"""
+		Constructor. The first arg should be a function that takes a [] of
+		strings and returns a [] of results, one per string. Starts the worker
+		thread.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		self.lint_func = lint_func
+		self.max_size = max_size
+		self.max_wait = max_wait
+
+		self.queue = queue.Queue()
+
+		self.thread = threading.Thread(target=self._run, daemon=True)
+		self.thread.start()
+
+
+	def submit(self, strings):
+		"""
+		Lints the given [] of strings and returns the [] of results. Blocks
+		until the batch the strings end up in has been linted. Re-raises the
+		exception of the linting function, if such.
+		"""
+		job = Job(list(strings))
+		self.queue.put(job)
+		job.done.wait()
+
+		if job.error is not None:
+			raise job.error
+
+		return job.results
+
+
+	def _collect(self, job):
+		"""
+		Returns the [] of jobs to be linted together with the given one: those
+		that are queued within max_wait seconds of the latter, up to max_size
+		strings.
+
+		Helper for the _run method.
+		"""
+		jobs = [job]
+		size = len(job.strings)
+
+		deadline = time.monotonic() + self.max_wait
+
+		while size < self.max_size:
+			timeout = deadline - time.monotonic()
+
+			try:
+				job = self.queue.get(timeout=timeout) \
+						if timeout > 0 else self.queue.get_nowait()
+			except queue.Empty:
+				break
+
+			if job is None:
+				self.queue.put(None)
+				break
+
+			jobs.append(job)
+			size += len(job.strings)
+
+		return jobs
+
+
+	def _run(self):
+		"""
+		Lints the queued jobs batch by batch until stop is called.
+		"""
+		while True:
+			job = self.queue.get()
+			if job is None:
+				break
+
+			jobs = self._collect(job)
+			strings = [string for job in jobs for string in job.strings]
+
+			try:
+				results = self.lint_func(strings)
+			except Exception as err:
+				self.log.error(str(err))
+				for job in jobs:
+					job.error = err
+					job.done.set()
+				continue
+
+			self.log.debug('linted {} strings from {} requests'.format(
+							len(strings), len(jobs)))
+
+			start = 0
+			for job in jobs:
+				job.results = results[start:start+len(job.strings)]
+				start += len(job.strings)
+				job.done.set()
+
+
+	def stop(self):
+		"""
+		Stops the worker thread once the already submitted jobs are done.
+		"""
+		self.queue.put(None)
+		self.thread.join()
+
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+	"""
+	Handles POST requests to /lint, the body of which should be a JSON object
+	with either a string key or a strings key (a [] of strings). The response
+	is the result of the string, or an object with a results key holding the
+	results of the strings, in the same order; see Core.lint_strings.
+	"""
+
+	protocol_version = 'HTTP/1.1'
+	disable_nagle_algorithm = True  # headers and body are written separately
+
+
+	def _send_json(self, status, obj):
+		"""
+		Sends a response with the given status code and JSON body.
+		"""
+		body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json; charset=utf-8')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+
+		self.wfile.write(body)
+
+
+	def _read_strings(self):
+		"""
+		Reads the request body and returns the (strings, is batch) tuple.
+		Raises ValueError if the body is not valid.
+		"""
+		try:
+			length = int(self.headers.get('Content-Length', 0))
+		except ValueError:
+			raise ValueError('Bad Content-Length')
+
+		if length < 0:
+			raise ValueError('Bad Content-Length')
+
+		if length > MAX_BODY_SIZE:
+			raise ValueError('Request body too large')
+
+		try:
+			data = json.loads(self.rfile.read(length).decode('utf-8'))
+		except ValueError:
+			raise ValueError('Request body is not valid JSON')
+
+		if isinstance(data, dict) and isinstance(data.get('string'), str):
+			return [data['string']], False
+
+		if isinstance(data, dict) and isinstance(data.get('strings'), list) \
+				and all([isinstance(item, str) for item in data['strings']]):
+			return data['strings'], True
+
+		raise ValueError('Expected an object with a string or strings key')
+
+
+	def do_GET(self):
+		"""
+		Responds to health checks.
+		"""
+		if self.path != '/health':
+			return self._send_json(404, {'error': 'Not found'})
+
+		self._send_json(200, {'status': 'ok'})
+
+
+	def do_POST(self):
+		"""
+		Lints the string(s) in the request body.
+		"""
+		if self.path != '/lint':
+			return self._send_json(404, {'error': 'Not found'})
+
+		try:
+			strings, is_batch = self._read_strings()
+		except ValueError as err:
+			return self._send_json(400, {'error': str(err)})
+
+		try:
+			results = self.server.batcher.submit(strings)
+		except Exception as err:
+			return self._send_json(500, {'error': str(err)})
+
+		self._send_json(200, {'results': results} if is_batch else results[0])
+
+
+	def log_message(self, format, *args):
+		"""
+		Logs the requests at the DEBUG level instead of writing to stderr.
+		"""
+		logging.getLogger(__name__).debug(format % args)
+
+
+
+class Server(ThreadingHTTPServer):
+	"""
+	HTTP server that lints strings using a single warm Core instance. Each
+	request is handled in its own thread, but the linting itself is done by a
+	Batcher.
+	"""
+
+	daemon_threads = True
+	request_queue_size = 128
+
+
+	def __init__(self, core, address, max_size=BATCH_MAX_SIZE,
+				max_wait=BATCH_MAX_WAIT, **lint_kwargs):
+		"""
+		Constructor. The core arg should be a Core instance, the address arg a
+		(host, port) tuple. The keyword args are passed on to
+		Core.lint_strings. Raises ValueError if the address cannot be bound.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		core.lint_strings([], **lint_kwargs)  # warm up
+
+		lint_func = lambda strings: core.lint_strings(strings, **lint_kwargs)
+		self.batcher = Batcher(lint_func, max_size, max_wait)
+
+		try:
+			super().__init__(address, RequestHandler)
+		except OSError as err:
+			self.batcher.stop()
+			self.log.error(str(err))
+			raise ValueError('Could not bind to: {}:{}'.format(*address))
+
+
+	def server_close(self):
+		"""
+		Closes the socket and stops the batcher.
+		"""
+		super().server_close()
+		self.batcher.stop()
+
+
+
+def serve(core, address, **lint_kwargs):
+	"""
+	Runs a Server at the given [HOST:]PORT until interrupted. The keyword args
+	are passed on to Core.lint_strings.
+	"""
+	server = Server(core, parse_address(address), **lint_kwargs)
+	host, port = server.server_address[:2]
+
+	logging.getLogger(__name__).info(
+			'Listening on http://{}:{}/lint'.format(host, port))
+
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
@@ -0,0 +1,286 @@
+import heapq
+import itertools
+import weakref
+
+
+
+"""
+The default max number of items that are sorted in memory at once; longer
+sequences are sorted in runs of this size which are spilled to temporary files
+and then merged.
+"""
+SORT_LIMIT = 1000000
+
+
+
+"""
+Rough estimate of the number of bytes an item (e.g. a line number) takes when
+held in a list; used to convert memory limits into numbers of items.
+"""
+ITEM_SIZE = 40
+
+
+
+"""
+The number of items that are pickled together when writing a run to a
+temporary file; runs are read back one such block at a time.
+"""
+BLOCK_SIZE = 4096
+
+
+
+def write_run(items, block_size=BLOCK_SIZE):
+	"""
+	Writes the given iterable of (picklable) items to an anonymous temporary
+	file, in blocks of the given size, and returns the file, rewound and ready
+	to be read by gen_run.
+	"""
+	import pickle
+	import tempfile
+
+	f = tempfile.TemporaryFile()
+	items = iter(items)
+
+	while True:
+		block = list(itertools.islice(items, block_size))
+		if not block:
+			break
+		pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+
+	f.seek(0)
+	return f
+
+
+
+def gen_run(f):
+	"""
+	Yields the items stored in a temporary file created by write_run. Closes
+	(and thus removes) the file when exhausted.
+	"""
+	import pickle
+
+	try:
+		while True:
+			try:
+				block = pickle.load(f)
+			except EOFError:
+				break
+
+			yield from block
+
+	finally:
+		f.close()
+
+
+
+def gen_sorted(items, limit=SORT_LIMIT):
+	"""
+	Yields the items of the given iterable in sorted order, holding at most
+	about the given number of items in memory at once. If there are more than
+	that, these are sorted in runs which are spilled to temporary files and
+	then k-way merged. As each run being merged holds a block of items in
+	memory, only so many runs are merged at once as there are blocks in the
+	limit; if there are more runs, these are first merged in batches into
+	longer runs.
+	"""
+	items = iter(items)
+	block_size = max(min(BLOCK_SIZE, limit // 2), 1)
+
+	chunk = list(itertools.islice(items, limit))
+	chunk.sort()
+
+	runs = []
+
+	for item in items:
+		runs.append(write_run(chunk, block_size))
+
+		chunk = [item]
+		chunk.extend(itertools.islice(items, limit - 1))
+		chunk.sort()
+
+	if not runs:
+		yield from chunk
+		return
+
+	runs.append(write_run(chunk, block_size))
+	del chunk
+
+	fan_in = max(limit // block_size, 2)
+
+	while len(runs) > fan_in:
+		batch, runs = runs[:fan_in], runs[fan_in:]
+		runs.append(write_run(
+			heapq.merge(*[gen_run(f) for f in batch]), block_size))
+
+	yield from heapq.merge(*[gen_run(f) for f in runs])
+
+
+
+def split_limit(sizes, limit=SORT_LIMIT):
+	"""
+	Returns the [] of limits for sorting sequences of the given sizes at the
+	same time (e.g. in order to merge these), so that these take at most the
+	given limit together (each limit being at least 1, though). The sequences
+	that fit in an even share of the limit get as much as these need and the
+	rest of the limit is split evenly among the others.
+	"""
+	limits = [0] * len(sizes)
+	remaining = limit
+
+	for count, index in enumerate(sorted(range(len(sizes)), key=sizes.__getitem__)):
+		share = min(sizes[index], remaining // (len(sizes) - count))
+		limits[index] = max(share, 1)
+		remaining -= share
+
+	return limits
+
+
+
+def gen_unique(sorted_items):
+	"""
+	Yields the items of the given sorted iterable, skipping the repetitions.
+	"""
+	for key, group in itertools.groupby(sorted_items):
+		yield key
+
+
+
+class SpillStore:
+	"""
+	Keeps the buffers of several SpillList instances within a shared budget;
+	once the total number of buffered items exceeds the budget, all buffers are
+	flushed to a single anonymous temporary file.
+	"""
+
+	def __init__(self, limit=SORT_LIMIT):
+		"""
+		Constructor. The arg is the max number of items to be kept in memory
+		across all the lists of the store.
+		"""
+		self.limit = limit
+		self.size = 0
+
+		self.f = None
+		self.lists = weakref.WeakSet()
+
+
+	def new_list(self):
+		"""
+		Returns a new, empty SpillList that belongs to this store.
+		"""
+		li = SpillList(self)
+		self.lists.add(li)
+		return li
+
+
+	def write_block(self, block):
+		"""
+		Appends the given [] of items to the temporary file (creating the
+		latter if necessary) and returns the block's offset.
+		"""
+		import pickle
+		import tempfile
+
+		if self.f is None:
+			self.f = tempfile.TemporaryFile()
+
+		self.f.seek(0, 2)
+		offset = self.f.tell()
+		pickle.dump(block, self.f, pickle.HIGHEST_PROTOCOL)
+
+		return offset
+
+
+	def read_block(self, offset):
+		"""
+		Returns the [] of items written at the given offset.
+		"""
+		import pickle
+
+		self.f.seek(offset)
+		return pickle.load(self.f)
+
+
+	def flush(self):
+		"""
+		Writes the buffers of all the lists to the temporary file.
+		"""
+		for li in list(self.lists):
+			li.flush()
+
+		self.size = 0
+
+
+	def close(self):
+		"""
+		Closes (and thus removes) the temporary file, if such. The lists of the
+		store cannot be read afterwards.
+		"""
+		if self.f is not None:
+			self.f.close()
+			self.f = None
+
+
+
+class SpillList:
+	"""
+	A list-like container that only supports appending and iterating, the
+	items of which are kept in memory until their SpillStore's budget is
+	exceeded and on disk afterwards.
+	"""
+
+	def __init__(self, store):
+		"""
+		Constructor. Use SpillStore.new_list instead.
+		"""
+		self.store = store
+		self.buffer = []
+		self.offsets = []
+		self.length = 0
+
+
+	def append(self, item):
+		"""
+		Adds an item to the end of the list.
+		"""
+		self.buffer.append(item)
+		self.length += 1
+
+		self.store.size += 1
+		if self.store.size > self.store.limit:
+			self.store.flush()
+
+
+	def extend(self, items):
+		"""
+		Adds the items of the given iterable to the end of the list.
+		"""
+		for item in items:
+			self.append(item)
+
+
+	def flush(self):
+		"""
+		Writes the buffered items to the store's temporary file.
+		"""
+		if self.buffer:
+			self.offsets.append(self.store.write_block(self.buffer))
+			self.buffer = []
+
+
+	def __iter__(self):
+		"""
+		Yields the items in the order these were added, reading the flushed
+		ones back from disk one block at a time.
+		"""
+		for offset in list(self.offsets):
+			yield from self.store.read_block(offset)
+
+		yield from self.buffer
+
+
+	def __len__(self):
+		"""
+		Returns the number of items in the list.
+		"""
+		return self.length
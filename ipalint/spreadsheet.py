@@ -0,0 +1,272 @@
+import datetime
+import logging
+import re
+
+
+
+"""
+The text of the boolean cells of XLSX files. The values of the other cells
+that are not strings are turned into text too: dates and times into ISO 8601
+(see format_value) and numbers as these are; an ODS cell's text is what the
+spreadsheet shows in any case.
+"""
+XLSX_BOOLEANS = {False: 'FALSE', True: 'TRUE'}
+
+
+
+"""
+Matches the strings that are SheetRow positions, e.g. when these are read back
+from a state file.
+"""
+SHEET_ROW_REGEX = re.compile(r'.*![0-9]+\Z', re.DOTALL)
+
+
+
+def format_value(value):
+	"""
+	Returns the text of the given XLSX cell value, as read by openpyxl, or the
+	empty string if the cell is empty. Dates are given as ISO 8601 dates if
+	there is no time part and as date-times otherwise.
+	"""
+	if value is None:
+		return ''
+
+	if isinstance(value, bool):
+		return XLSX_BOOLEANS[value]
+
+	if isinstance(value, datetime.datetime):
+		if value.time() == datetime.time():
+			return value.date().isoformat()
+		return value.isoformat(sep=' ')
+
+	if isinstance(value, (datetime.date, datetime.time)):
+		return value.isoformat()
+
+	return str(value)
+
+
+
+class SheetRow(str):
+	"""
+	The position of a spreadsheet row as reported, <sheet>!<row> (e.g.
+	Swadesh!5), in the manner of the spreadsheets' own cell references. Rows
+	of the same sheet are ordered by their numbers rather than alphabetically.
+	"""
+
+	def get_key(self):
+		"""
+		Returns the (sheet name, row number) tuple the row is ordered by.
+		"""
+		sheet, _, row_num = self.rpartition('!')
+		return sheet, int(row_num)
+
+
+	def __lt__(self, other):
+		"""
+		Returns True if the row is less than the other, comparing as str
+		if the other is not a SheetRow.
+		"""
+		if isinstance(other, SheetRow):
+			return self.get_key() < other.get_key()
+		return str.__lt__(self, other)
+
+
+	def __le__(self, other):
+		"""
+		Returns True if the row is less than or equal to the other, comparing
+		as str if the other is not a SheetRow.
+		"""
+		if isinstance(other, SheetRow):
+			return self.get_key() <= other.get_key()
+		return str.__le__(self, other)
+
+
+	def __gt__(self, other):
+		"""
+		Returns True if the row is greater than the other, comparing as str
+		if the other is not a SheetRow.
+		"""
+		if isinstance(other, SheetRow):
+			return self.get_key() > other.get_key()
+		return str.__gt__(self, other)
+
+
+	def __ge__(self, other):
+		"""
+		Returns True if the row is greater than or equal to the other, comparing
+		as str if the other is not a SheetRow.
+		"""
+		if isinstance(other, SheetRow):
+			return self.get_key() >= other.get_key()
+		return str.__ge__(self, other)
+
+
+
+class Workbook:
+	"""
+	Reads the rows of a sheet of an XLSX file (using openpyxl) or of an ODS
+	file (using odfpy); these are the packages of the spreadsheet extra. XLSX
+	sheets are streamed, as openpyxl parses these incrementally in read-only
+	mode; odfpy, on the other hand, loads the whole ODS document.
+	"""
+
+	def __init__(self, file_path, is_ods=False):
+		"""
+		Constructor. Opens the file at the given path, which should be an ODS
+		file if the flag is set and an XLSX file otherwise. Raises ValueError
+		if the respective package is not installed or if the file cannot be
+		opened.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		self.file_path = file_path
+		self.is_ods = is_ods
+
+		self.sheet = None  # the name of the sheet being read by gen_rows
+
+		if is_ods:
+			try:
+				from odf.opendocument import load
+			except ImportError:
+				raise ValueError('Reading ODS files requires odfpy')
+		else:
+			try:
+				from openpyxl import load_workbook
+			except ImportError:
+				raise ValueError('Reading XLSX files requires openpyxl')
+
+		try:
+			if is_ods:
+				self.doc = load(file_path)
+			else:
+				self.doc = load_workbook(file_path, read_only=True, data_only=True)
+		except Exception as err:  # the packages raise a variety of errors
+			self.log.error(str(err))
+			raise ValueError('Could not open file: {}'.format(file_path))
+
+
+	def close(self):
+		"""
+		Closes the file, if it is still open.
+		"""
+		if not self.is_ods:
+			self.doc.close()
+
+
+	def gen_rows(self, sheet=None):
+		"""
+		Yields a (row number, {column index: cell value}) tuple for each row
+		of the sheet with the given name (or the first sheet, if None) that has
+		at least one non-empty cell. Rows are numbered from 1 and columns from
+		0, as in the spreadsheet's own grid. The name of the sheet is kept in
+		self.sheet. Raises ValueError if the sheet cannot be found or read.
+		"""
+		if self.is_ods:
+			yield from self._gen_ods_rows(sheet)
+		else:
+			yield from self._gen_xlsx_rows(sheet)
+
+
+	def _get_sheet(self, names, sheet=None):
+		"""
+		Returns the index of the sheet with the given name (or of the first
+		sheet, if None) within the given [] of sheet names. Raises ValueError
+		if there is no such sheet.
+
+		Helper for the _gen_xlsx_rows and _gen_ods_rows methods.
+		"""
+		if not names:
+			raise ValueError('Could not find any sheets: {}'.format(self.file_path))
+
+		if sheet is None:
+			self.log.debug('Reading the first sheet: {}'.format(names[0]))
+			return 0
+
+		if sheet not in names:
+			raise ValueError('Could not find sheet: {} (choose from: {})'.format(
+							sheet, ', '.join(names)))
+
+		return names.index(sheet)
+
+
+	def _gen_xlsx_rows(self, sheet=None):
+		"""
+		Yields the (row number, {column index: cell value}) tuples of the given
+		sheet of the XLSX file. The values of the cells that are not strings
+		are turned into text; see format_value. The cached values of formula
+		cells are taken, as these were last calculated.
+
+		Helper for the gen_rows method.
+		"""
+		index = self._get_sheet(self.doc.sheetnames, sheet)
+		self.sheet = self.doc.sheetnames[index]
+
+		worksheet = self.doc.worksheets[index]
+		worksheet.reset_dimensions()  # the dimensions in the file could be wrong
+
+		try:
+			for row in worksheet.iter_rows():
+				values = {}
+				row_num = None
+
+				for cell in row:
+					value = format_value(getattr(cell, 'value', None))
+					if value:
+						values[cell.column - 1] = value
+						row_num = cell.row
+
+				if values:
+					yield row_num, values
+
+		except Exception as err:  # e.g. a broken sheet
+			self.log.error(str(err))
+			raise ValueError('Could not read spreadsheet: {}'.format(self.file_path))
+
+
+	def _gen_ods_rows(self, sheet=None):
+		"""
+		Yields the (row number, {column index: cell value}) tuples of the given
+		sheet of the ODS file. Repeated rows and cells (as ODS compresses runs
+		of identical ones) are expanded, unless empty.
+
+		Helper for the gen_rows method.
+		"""
+		from odf import teletype
+		from odf.namespaces import TABLENS, TEXTNS
+		from odf.table import Table, TableRow
+
+		cell_names = [(TABLENS, 'table-cell'), (TABLENS, 'covered-table-cell')]
+
+		tables = self.doc.spreadsheet.getElementsByType(Table)
+		names = [table.getAttribute('name') for table in tables]
+
+		index = self._get_sheet(names, sheet)
+		self.sheet = names[index]
+
+		row_num = 0
+
+		for row in tables[index].getElementsByType(TableRow):
+			num_rows = int(row.getAttribute('numberrowsrepeated') or 1)
+
+			values = {}
+			col = 0
+
+			for cell in row.childNodes:
+				if getattr(cell, 'qname', None) not in cell_names:
+					continue
+
+				num_cols = int(cell.getAttribute('numbercolumnsrepeated') or 1)
+
+				value = '\n'.join([teletype.extractText(child)
+								for child in cell.childNodes
+								if getattr(child, 'qname', None) == (TEXTNS, 'p')])
+				if value:
+					for index in range(col, col + num_cols):
+						values[index] = value
+
+				col += num_cols
+
+			for index in range(num_rows if values else 0):
+				yield row_num + index + 1, values
+
+			row_num += num_rows
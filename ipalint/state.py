@@ -0,0 +1,200 @@
+import logging
+
+from ipalint.ipa import Symbol, UnknownSymbol
+from ipalint.report import Tally
+
+
+
+"""
+The values of the format and version keys of the state files; files with
+another format or a higher version are rejected.
+"""
+STATE_FORMAT = 'ipalint-state'
+STATE_VERSION = 1
+
+
+
+def _dump_lines(lines):
+	"""
+	Returns the JSON-serialisable form of the given [] of line numbers (or
+	SpillList or Tally thereof).
+
+	Helper for the get_source_state function.
+	"""
+	if isinstance(lines, Tally):
+		return {'occurrences': lines.occurrences,
+				'rows': lines.rows, 'last': lines.last}
+
+	return list(lines)
+
+
+
+def _dump_counts(lines):
+	"""
+	Returns the JSON-serialisable form of the given [] of line numbers (or
+	SpillList or Tally thereof) as a Tally, i.e. only the number of
+	occurrences and lines. Used for the IPA symbols, the line numbers of which
+	would take most of the state but are never reported.
+
+	Helper for the get_source_state function.
+	"""
+	if not isinstance(lines, Tally):
+		tally = Tally()
+		tally.extend(lines)
+		lines = tally
+
+	return _dump_lines(lines)
+
+
+
+def _load_lines(accum, data):
+	"""
+	Adds the line numbers dumped by _dump_lines to the given accumulator (a
+	[], SpillList or Tally). Tallies can only be added to Tally accumulators.
+	Spreadsheet positions are turned back into SheetRow instances, so that
+	these are sorted as by lint.
+
+	Helper for the load_source_state function.
+	"""
+	from ipalint.spreadsheet import SHEET_ROW_REGEX, SheetRow
+
+	if isinstance(data, dict):
+		tally = Tally()
+		tally.occurrences = data['occurrences']
+		tally.rows = data['rows']
+		tally.last = data['last']
+		data = tally
+	else:
+		data = [SheetRow(line_num) if isinstance(line_num, str)
+					and SHEET_ROW_REGEX.match(line_num) else line_num
+				for line_num in data]
+
+	accum.extend(data)
+
+
+
+def get_source_state(recog, norm, engine, heading=None, group=None,
+						file_heading=None):
+	"""
+	Returns a JSON-serialisable dict of the errors and symbols collected so far
+	by the given Recogniser, Normaliser and RuleEngine, which should have
+	linted a single source (e.g. a file) with the given heading. If the source
+	is a group of rows (see the lint method's group_by), the group (a string)
+	and the heading of the file the group is in (None for a single file) are
+	also kept, so that merge can order the sections as lint does.
+	"""
+	return {
+		'heading': heading,
+		'group': group,
+		'file': heading if group is None else file_heading,
+		'strip_errors': _dump_lines(norm.strip_errors),
+		'norm_errors': _dump_lines(norm.norm_errors),
+		'byte_errors': [[message, _dump_lines(lines)]
+			for message, lines in norm.byte_errors.items()],
+		'rule_errors': [[rule.name, _dump_lines(lines)]
+			for rule, lines in zip(engine.rules, engine.errors)],
+		'ipa_symbols': [list(symbol) + [_dump_counts(lines)]
+			for symbol, lines in recog.ipa_symbols.items()],
+		'unk_symbols': [list(symbol) + [_dump_lines(lines)]
+			for symbol, lines in recog.unk_symbols.items()]
+	}
+
+
+
+def load_source_state(recog, norm, engine, source):
+	"""
+	Adds the errors and symbols of the given source state dict (as returned by
+	get_source_state) to these collected by the given Recogniser, Normaliser
+	and RuleEngine; the latter should have all the rules of the state enabled.
+	The IPA symbols are only added if the Recogniser is in counts mode.
+	Raises ValueError if the state is malformed.
+	"""
+	names = [rule.name for rule in engine.rules]
+
+	try:
+		_load_lines(norm.strip_errors, source['strip_errors'])
+		_load_lines(norm.norm_errors, source['norm_errors'])
+
+		for message, lines in source.get('byte_errors', []):
+			norm.add_bad_bytes(message, [])
+			_load_lines(norm.byte_errors[message], lines)
+
+		for name, lines in source.get('rule_errors', []):
+			_load_lines(engine.errors[names.index(name)], lines)
+
+		# only counts reports include the IPA symbols, see _dump_counts
+		if recog.ipa_symbols.default_factory is Tally:
+			for char, name, ipa_name, lines in source['ipa_symbols']:
+				_load_lines(recog.ipa_symbols[Symbol(char, name, ipa_name)], lines)
+
+		for char, name, lines in source['unk_symbols']:
+			_load_lines(recog.unk_symbols[UnknownSymbol(char, name)], lines)
+
+	except (KeyError, TypeError, ValueError) as err:
+		raise ValueError('Bad state: {!r}'.format(err))
+
+
+
+def _open(file_path, mode):
+	"""
+	Opens the given file in text mode, via gzip if the name ends with .gz.
+
+	Helper for the write_state and read_state functions.
+	"""
+	if file_path.lower().endswith('.gz'):
+		import gzip
+		return gzip.open(file_path, mode + 't', encoding='utf-8')
+
+	return open(file_path, mode, encoding='utf-8')
+
+
+
+def write_state(file_path, sources, profile=None, rules=None, counts=False):
+	"""
+	Writes the given [] of source state dicts to the given file as JSON. If
+	the file name ends with .gz, the file is gzipped. The profile, rules and
+	counts args should be these the sources were linted with. Raises
+	ValueError if the file cannot be written.
+	"""
+	import json
+
+	state = {
+		'format': STATE_FORMAT,
+		'version': STATE_VERSION,
+		'profile': profile,
+		'rules': rules or [],
+		'counts': counts,
+		'sources': sources
+	}
+
+	try:
+		with _open(file_path, 'w') as f:
+			json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+	except OSError as err:
+		logging.getLogger(__name__).error(str(err))
+		raise ValueError('Could not write file: {}'.format(file_path))
+
+
+
+def read_state(file_path):
+	"""
+	Reads a state file written by write_state and returns its contents as a
+	dict. Raises ValueError if the file cannot be read or is not a state file.
+	"""
+	import json
+
+	try:
+		with _open(file_path, 'r') as f:
+			state = json.load(f)
+	except (OSError, ValueError) as err:
+		logging.getLogger(__name__).error(str(err))
+		raise ValueError('Could not read state file: {}'.format(file_path))
+
+	if not isinstance(state, dict) or state.get('format') != STATE_FORMAT:
+		raise ValueError('Not a state file: {}'.format(file_path))
+
+	if state.get('version', 0) > STATE_VERSION:
+		raise ValueError('Unsupported state version: {}'.format(file_path))
+
+	return state
+
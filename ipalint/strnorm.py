@@ -1,19 +1,35 @@
+from collections import OrderedDict
+
 import functools
 import logging
 import unicodedata
 
+from ipalint.report import Tally
+
+
+
+"""
+The error messages of strings with leading or trailing whitespace and of
+strings that are not in NFD.
+"""
+WS_ERROR = 'leading or trailing whitespace'
+NFD_ERROR = 'not in Unicode NFD'
+
 
 
 class Normaliser:
 	"""
 	Normalises strings and keeps track of those that (1) do not comply to
-	Unicode's normal form; (2) have whitespace issues.
+	Unicode's normal form; (2) have whitespace issues. Also keeps the bytes
+	that could not be decoded, as found by the Reader; see add_bad_bytes.
 	"""
 
-	def __init__(self, nfc_chars=[]):
+	def __init__(self, nfc_chars=[], counts=False, store=None):
 		"""
 		Constructor. The optional arg specifies the set of chars that should
-		not be decomposed.
+		not be decomposed. If the counts flag is set, only the number of errors
+		is kept track of, instead of the line numbers; otherwise, if a
+		SpillStore is given, the line numbers are kept in its SpillLists.
 		"""
 		self.log = logging.getLogger(__name__)
 
@@ -21,8 +37,16 @@ class Normaliser:
 
 		self.nfc_chars = set(nfc_chars)
 
-		self.strip_errors = []
-		self.norm_errors = []
+		if counts:
+			self.accum = Tally
+		elif store is not None:
+			self.accum = store.new_list
+		else:
+			self.accum = list
+
+		self.strip_errors = self.accum()
+		self.norm_errors = self.accum()
+		self.byte_errors = OrderedDict()  # error message: line numbers
 
 
 	def normalise(self, string, line_num):
@@ -35,6 +59,9 @@ class Normaliser:
 		if stripped != string:
 			self.strip_errors.append(line_num)
 
+		if string.isascii():  # nothing to decompose
+			return stripped
+
 		nfc_pos = [index
 					for index, char in enumerate(stripped)
 					if char in self.nfc_chars]
@@ -60,14 +87,51 @@ class Normaliser:
 		return norm
 
 
+	def clear(self):
+		"""
+		Forgets the errors that have been found so far.
+		"""
+		self.strip_errors = self.accum()
+		self.norm_errors = self.accum()
+		self.byte_errors = OrderedDict()
+
+
+	def add_bad_bytes(self, message, lines):
+		"""
+		Adds the given [] of line numbers (or Tally) on which bytes that are
+		not valid UTF-8 were found, under the given error message; see
+		Reader.get_bad_bytes.
+		"""
+		if message not in self.byte_errors:
+			self.byte_errors[message] = self.accum()
+
+		self.byte_errors[message].extend(lines)
+
+
+	def count_errors(self, ignore_nfd=False, ignore_ws=False):
+		"""
+		Returns the number of errors found so far; the keyword args are as in
+		the report method.
+		"""
+		count = sum([len(lines) for lines in list(self.byte_errors.values())])
+
+		if not ignore_ws:
+			count += len(self.strip_errors)
+
+		return count if ignore_nfd else count + len(self.norm_errors)
+
+
 	def report(self, reporter, ignore_nfd=False, ignore_ws=False):
 		"""
 		Adds the problems that have been found so far to the given Reporter
 		instance. The two keyword args can be used to restrict the error types
-		to be reported.
+		to be reported; these do not apply to the bad bytes.
 		"""
+		for message, lines in self.byte_errors.items():
+			reporter.add(lines, message)
+
 		if self.strip_errors and not ignore_ws:
-			reporter.add(self.strip_errors, 'leading or trailing whitespace')
+			reporter.add(self.strip_errors, WS_ERROR)
 
 		if self.norm_errors and not ignore_nfd:
-			reporter.add(self.norm_errors, 'not in Unicode NFD')
+			reporter.add(self.norm_errors, NFD_ERROR)
@@ -0,0 +1,94 @@
+import json
+import os.path
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ipalint.cldf import is_metadata, read_metadata
+from ipalint.core import Core
+
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+METADATA_PATH = os.path.join(FIXTURES_DIR, 'cldf', 'Wordlist-metadata.json')
+
+
+
+class CldfTestCase(TestCase):
+
+	def test_is_metadata(self):
+		self.assertTrue(is_metadata(METADATA_PATH))
+		self.assertFalse(is_metadata(os.path.join(FIXTURES_DIR, 'hawaiian.csv')))
+		self.assertFalse(is_metadata(os.path.join(FIXTURES_DIR, 'lexicon.json')))
+		self.assertFalse(is_metadata(None))
+
+
+	def test_read_metadata(self):
+		tables = read_metadata(METADATA_PATH)
+		self.assertEqual(len(tables), 2)
+
+		self.assertEqual(os.path.basename(tables[0].file_path), 'forms.csv')
+		self.assertEqual(tables[0].dialect.delimiter, ',')
+		self.assertEqual(tables[0].dialect.doublequote, True)
+		self.assertEqual(tables[0].has_header, True)
+		self.assertEqual(tables[0].ipa_col, 'Segments')
+
+		self.assertEqual(os.path.basename(tables[1].file_path), 'loans.tsv')
+		self.assertEqual(tables[1].dialect.delimiter, '\t')
+		self.assertEqual(tables[1].has_header, False)
+		self.assertEqual(tables[1].ipa_col, 1)
+
+
+	def test_read_metadata_schema_url(self):
+		with TemporaryDirectory() as temp_dir:
+			with open(os.path.join(temp_dir, 'forms.json'), 'w') as f:
+				json.dump({'columns': [{'name': 'ID'}, {'name': 'Segments',
+					'propertyUrl': 'http://cldf.clld.org/v1.0/terms.rdf#segments'}]}, f)
+
+			file_path = os.path.join(temp_dir, 'Wordlist-metadata.json')
+			with open(file_path, 'w') as f:
+				json.dump({'tables': [
+					{'url': 'forms.csv', 'tableSchema': 'forms.json', 'dc:conformsTo':
+						'http://cldf.clld.org/v1.0/terms.rdf#FormTable'},
+					{'url': 'other.csv', 'tableSchema': 'nope.json', 'dc:conformsTo':
+						'http://cldf.clld.org/v1.0/terms.rdf#FormTable'}]}, f)
+
+			with self.assertLogs('ipalint.cldf', level='WARNING'):
+				tables = read_metadata(file_path)
+
+			self.assertEqual([os.path.basename(table.file_path) for table in tables],
+							['forms.csv'])
+			self.assertEqual(tables[0].ipa_col, 'Segments')
+
+
+	def test_read_metadata_error(self):
+		with self.assertRaises(ValueError):
+			read_metadata(os.path.join(FIXTURES_DIR, 'nope-metadata.json'))
+
+		with self.assertRaises(ValueError):
+			read_metadata(os.path.join(FIXTURES_DIR, 'hawaiian.csv'))
+
+		with TemporaryDirectory() as temp_dir:
+			file_path = os.path.join(temp_dir, 'Generic-metadata.json')
+			with open(file_path, 'w') as f:
+				json.dump({'tables': [{'url': 'languages.csv', 'dc:conformsTo':
+					'http://cldf.clld.org/v1.0/terms.rdf#LanguageTable'}]}, f)
+
+			with self.assertRaises(ValueError):
+				read_metadata(file_path)
+
+
+	def test_lint(self):
+		report = Core().lint(METADATA_PATH).split('\n\n')
+		self.assertEqual(len(report), 2)
+
+		forms = report[0].splitlines()
+		self.assertTrue(forms[0].startswith('==> ') and forms[0].endswith('forms.csv <=='))
+		self.assertEqual(forms[1], 'leading or trailing whitespace ← 4')
+		self.assertTrue(forms[2].startswith('ʦ (LATIN SMALL LETTER TS DIGRAPH)'))
+		self.assertTrue(forms[2].endswith('← 3'))
+
+		loans = report[1].splitlines()
+		self.assertTrue(loans[1].startswith('ʧ (LATIN SMALL LETTER TESH DIGRAPH)'))
+		self.assertTrue(loans[1].endswith('← 1'))
@@ -1,12 +1,16 @@
+import io
+import os
+import subprocess
 import sys
 
+from tempfile import TemporaryDirectory
 from unittest.mock import patch
 from unittest import TestCase
 
 from hypothesis.strategies import fixed_dictionaries, sampled_from, text
 from hypothesis import given
 
-from ipalint.cli import Cli
+from ipalint.cli import Cli, COMMANDS
 from ipalint.core import Core
 
 
@@ -16,7 +20,7 @@ class CliTestCase(TestCase):
 	def setUp(self):
 		self.cli = Cli()
 
-	@given(text().filter(lambda t: not t.startswith('-')),
+	@given(text().filter(lambda t: not t.startswith('-') and t not in COMMANDS),
 			text().filter(lambda t: not t.startswith('-')),
 			fixed_dictionaries({
 				'no_header': sampled_from(['--no-header', '']),
@@ -40,7 +44,184 @@ class CliTestCase(TestCase):
 					dataset = dataset,
 					col = col if col else None,
 					no_header = True if flags['no_header'] else False,
+					table = None,
+					profile = None,
+					diff = None,
+					line_offset = 0,
+					memory_limit = None,
+					prefetch = False,
+					bad_bytes = False,
+					group_by = None,
 					ignore_nfd = True if flags['ignore_nfd'] else False,
 					ignore_ws = True if flags['ignore_ws'] else False,
+					rules = None,
 					linewise = True if flags['linewise'] else False,
-					no_lines = True if flags['no_lines'] else False)
+					no_lines = True if flags['no_lines'] else False,
+					ranges = False,
+					max_lines_per_error = None,
+					counts = False,
+					export = None,
+					dump_state = None,
+					metrics = None,
+					progress = False,
+					output = sys.stdout)
+
+
+	def test_run_max_lines(self):
+		with patch.object(Core, 'lint') as mock_lint:
+			with patch.object(sys, 'stderr', io.StringIO()):
+				for value in ['0', '-1', 'x']:
+					with self.assertRaises(SystemExit) as cm:
+						self.cli.run(['data', '--max-lines-per-error', value])
+					self.assertEqual(cm.exception.code, 2)
+
+				try:
+					self.cli.run(['data', '--max-lines-per-error', '1'])
+				except SystemExit:
+					pass
+
+		mock_lint.assert_called_once()
+		self.assertEqual(mock_lint.call_args[1]['max_lines_per_error'], 1)
+
+
+	def test_run_memory_limit(self):
+		with patch.object(Core, 'lint') as mock_lint:
+			with patch.object(sys, 'stderr', io.StringIO()):
+				for value in ['0', '-1', 'x']:
+					with self.assertRaises(SystemExit) as cm:
+						self.cli.run(['data', '--memory-limit', value])
+					self.assertEqual(cm.exception.code, 2)
+
+				try:
+					self.cli.run(['data', '--memory-limit', '64'])
+				except SystemExit:
+					pass
+
+		mock_lint.assert_called_once()
+		self.assertEqual(mock_lint.call_args[1]['memory_limit'], 64)
+
+
+	def test_run_serve(self):
+		with patch('ipalint.server.serve') as mock_serve:
+			with patch.object(Core, 'lint') as mock_lint:
+				try:
+					self.cli.run(['--serve', '8080', '--ignore-ws'])
+				except SystemExit:
+					pass
+
+		mock_lint.assert_not_called()
+		self.assertEqual(mock_serve.call_args[0][1], '8080')
+		self.assertEqual(mock_serve.call_args[1], {
+			'profile': None, 'ignore_nfd': False, 'ignore_ws': True,
+			'rules': None})
+
+
+	def test_run_lsp(self):
+		with patch('ipalint.lsp.serve', return_value=0) as mock_serve:
+			with patch.object(Core, 'lint') as mock_lint:
+				with self.assertRaises(SystemExit) as cm:
+					self.cli.run(['--lsp', '--col', 'ipa', '--rule', 'all'])
+
+		self.assertEqual(cm.exception.code, 0)
+
+		mock_lint.assert_not_called()
+		self.assertEqual(mock_serve.call_args[1], {
+			'col': 'ipa', 'no_header': False, 'profile': None,
+			'rules': ['all'], 'ignore_nfd': False, 'ignore_ws': False})
+
+
+	def test_run_watch(self):
+		with patch.object(Core, 'watch', return_value=iter(['a', '', 'b'])) as mock_watch:
+			with patch.object(sys, 'stdout', io.StringIO()) as stdout:
+				try:
+					self.cli.run(['data', '--watch', '--counts'])
+				except SystemExit:
+					pass
+
+		self.assertEqual(mock_watch.call_args[0], ('data',))
+		self.assertTrue(mock_watch.call_args[1]['counts'])
+		self.assertEqual(stdout.getvalue(), 'a\n\n\nb\n')
+
+
+	def test_run_merge(self):
+		with patch.object(Core, 'merge') as mock_merge:
+			with patch.object(Core, 'lint') as mock_lint:
+				with patch.object(Cli, '_get_parser') as mock_parser:
+					try:
+						self.cli.run(['merge', 'a.json', 'b.json.gz', '--counts'])
+					except SystemExit:
+						pass
+
+		mock_lint.assert_not_called()
+		mock_parser.assert_not_called()
+		mock_merge.assert_called_once_with(
+			states = ['a.json', 'b.json.gz'],
+			ignore_nfd = False,
+			ignore_ws = False,
+			linewise = False,
+			no_lines = False,
+			ranges = False,
+			max_lines_per_error = None,
+			counts = True,
+			output = sys.stdout)
+
+
+	def test_run_command_file(self):
+		with TemporaryDirectory() as temp_dir:
+			cwd = os.getcwd()
+			os.chdir(temp_dir)
+
+			try:
+				for command in COMMANDS:
+					open(command, 'w').close()
+
+					with patch.object(Core, 'lint') as mock_lint:
+						try:
+							self.cli.run([command, '--counts'])
+						except SystemExit:
+							pass
+
+					self.assertEqual(mock_lint.call_args[1]['dataset'], command)
+					self.assertTrue(mock_lint.call_args[1]['counts'])
+			finally:
+				os.chdir(cwd)
+
+
+	def test_run_index(self):
+		with patch.object(Core, 'index', return_value=(2, 1)) as mock_index:
+			with patch.object(sys, 'stdout', io.StringIO()) as stdout:
+				try:
+					self.cli.run(['index', 'i.db', 'a', 'b', '--rule', 'all'])
+				except SystemExit:
+					pass
+
+		mock_index.assert_called_once_with(index_path='i.db',
+			dataset=['a', 'b'], col=None, no_header=False, profile=None,
+			rules=['all'])
+		self.assertEqual(stdout.getvalue(), '2 file(s) linted, 1 removed\n')
+
+		with patch.object(Core, 'query') as mock_query:
+			try:
+				self.cli.run(['query', 'i.db', '--symbol', 'ʦ', '--counts'])
+			except SystemExit:
+				pass
+
+		mock_query.assert_called_once_with(index_path='i.db', symbol='ʦ',
+			error=None, file=None, no_lines=False, counts=True,
+			output=sys.stdout)
+
+
+	def test_import_time(self):
+		proc = subprocess.run([sys.executable, '-X', 'importtime',
+					'-c', 'import ipalint.cli'], stderr=subprocess.PIPE,
+					universal_newlines=True, check=True)
+
+		times = {}
+		for line in proc.stderr.splitlines():
+			parts = line.split('|')
+			if len(parts) == 3 and parts[1].strip().isdigit():
+				times[parts[2].strip()] = int(parts[1])
+
+		for module in ['ipalint.core', 'ipalint.ipa', 'ipalint.read',
+						'logging.config', 'csv', 'tempfile']:
+			self.assertNotIn(module, times)
@@ -0,0 +1,162 @@
+import os
+import os.path
+import shutil
+import sqlite3
+import subprocess
+
+from tempfile import TemporaryDirectory
+from unittest import skipUnless, TestCase
+
+from hypothesis.strategies import integers, lists, tuples
+from hypothesis import given
+
+from ipalint.core import Core
+from ipalint.diff import get_changed_lines, LineRanges, parse_diff
+
+
+
+DIFF = '''diff --git a/test.tsv b/test.tsv
+--- a/test.tsv
++++ b/test.tsv
+@@ -2 +2 @@ ipa
+-pa
++pʰa
+@@ -5,0 +6,2 @@ ta
++ka
++ʦa
+@@ -9,2 +10,0 @@ na
+-ma
+-la
+'''
+
+
+
+class DiffTestCase(TestCase):
+
+	def test_parse_diff(self):
+		ranges = parse_diff(DIFF)
+		self.assertEqual(len(ranges), 2)
+		self.assertEqual([i for i in range(12) if i in ranges], [2, 6, 7])
+
+
+	@given(lists(tuples(integers(min_value=1, max_value=42), integers(min_value=0, max_value=5))))
+	def test_line_ranges_filter(self, li):
+		ranges, end = [], 0
+		for gap, length in li:
+			ranges.append((end + gap, end + gap + length))
+			end = end + gap + length
+
+		data = [('', line_num) for line_num in range(1, end + 10)]
+		res = [line_num for _, line_num in LineRanges(ranges).filter(data)]
+
+		self.assertEqual(res, [line_num for first, last in ranges
+								for line_num in range(first, last + 1)])
+
+
+	def test_line_ranges_filter_spans(self):
+		data = [('', 2), ('', 5), ('', 6), ('', 9)]
+		filter = lambda ranges: [line_num for _, line_num
+								in LineRanges(ranges).filter(data)]
+
+		self.assertEqual(filter([(3, 3)]), [5])
+		self.assertEqual(filter([(4, 6)]), [5, 6])
+		self.assertEqual(filter([(1, 1), (7, 7)]), [2, 9])
+
+
+	def test_non_text(self):
+		with TemporaryDirectory() as temp_dir:
+			file_path = os.path.join(temp_dir, 'test.sqlite')
+
+			conn = sqlite3.connect(file_path)
+			conn.execute('CREATE TABLE forms (ipa TEXT)')
+			conn.execute('INSERT INTO forms VALUES (?)', ['pa'])
+			conn.commit()
+
+			with self.assertRaises(ValueError):
+				Core().lint(file_path, diff='HEAD')
+
+			cursor = conn.execute('SELECT ipa FROM forms')
+			with self.assertRaises(ValueError):
+				Core().lint(cursor, diff='HEAD')
+
+			conn.close()
+
+
+
+@skipUnless(shutil.which('git'), 'git is not available')
+class GitDiffTestCase(TestCase):
+
+	def setUp(self):
+		self.temp_dir = TemporaryDirectory()
+		self.file_path = os.path.join(self.temp_dir.name, 'test.tsv')
+
+		self.git('init', '-q')
+
+		with open(self.file_path, 'w') as f:
+			f.write('ipa\npa\nta\n')
+
+		self.git('add', 'test.tsv')
+		self.git('commit', '-q', '-m', 'init')
+
+
+	def tearDown(self):
+		self.temp_dir.cleanup()
+
+
+	def git(self, *args):
+		subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@test',
+				'-c', 'commit.gpgsign=false'] + list(args),
+				cwd=self.temp_dir.name, check=True)
+
+
+	def test_get_changed_lines(self):
+		with open(self.file_path, 'w') as f:
+			f.write('ipa\npa\nʦa\nka \n')
+
+		ranges = get_changed_lines(self.file_path, 'HEAD')
+		self.assertEqual([i for i in range(6) if i in ranges], [3, 4])
+
+		report = Core().lint(self.file_path, diff='HEAD')
+		self.assertEqual(report.splitlines()[0], 'leading or trailing whitespace ← 4')
+		self.assertTrue(report.splitlines()[1].endswith('← 3'))
+
+
+	def test_multi_line_record(self):
+		with open(self.file_path, 'w') as f:
+			f.write('id\tipa\n1\t"pa\nta"\n2\tka\n')
+
+		self.git('commit', '-q', '-a', '-m', 'multi-line')
+
+		with open(self.file_path, 'w') as f:
+			f.write('id\tipa\n1\t"ʦa\nta"\n2\tka\n')
+
+		report = Core().lint(self.file_path, diff='HEAD')
+		self.assertTrue(report.splitlines()[-1].startswith('ʦ'))
+		self.assertTrue(report.splitlines()[-1].endswith('← 3'))
+
+
+	def test_bad_bytes(self):
+		with open(self.file_path, 'wb') as f:
+			f.write(b'ipa\npa\xe9\nta\n')
+
+		self.git('commit', '-q', '-a', '-m', 'bad bytes')
+
+		with open(self.file_path, 'wb') as f:
+			f.write(b'ipa\npa\xe9\nta\xe9\n')
+
+		report = Core().lint(self.file_path, diff='HEAD', bad_bytes=True)
+		self.assertIn('invalid UTF-8 bytes \\xe9 (at byte offset 2 of the line) ← 3',
+					report.splitlines())
+
+
+	def test_get_changed_lines_untracked(self):
+		file_path = os.path.join(self.temp_dir.name, 'new.tsv')
+		with open(file_path, 'w') as f:
+			f.write('ipa\npa\n')
+
+		self.assertEqual(get_changed_lines(file_path, 'HEAD'), None)
+
+
+	def test_get_changed_lines_error(self):
+		with self.assertRaises(ValueError):
+			get_changed_lines(self.file_path, 'no-such-ref')
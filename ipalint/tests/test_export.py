@@ -0,0 +1,61 @@
+import csv
+import os.path
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from hypothesis.strategies import text
+from hypothesis import given
+
+from ipalint.core import Core
+from ipalint.export import EXPORT_HEADER, Exporter
+from ipalint.ipa import UnknownSymbol
+
+
+
+class ExporterTestCase(TestCase):
+
+	def setUp(self):
+		self.temp_dir = TemporaryDirectory()
+		self.file_path = os.path.join(self.temp_dir.name, 'export.tsv')
+		self.exporter = Exporter(self.file_path)
+
+
+	def tearDown(self):
+		self.exporter.close()
+		self.temp_dir.cleanup()
+
+
+	def test_segment(self):
+		seg = self.exporter.segment
+		self.assertEqual(seg('pʰaː'), ['pʰ', 'aː'])
+		self.assertEqual(seg('t͡sa˥˩'), ['t͡s', 'a', '˥˩'])
+		self.assertEqual(seg('ˈãn̥ ka'), ['ˈ', 'ã', 'n̥', '_', 'k', 'a'])
+		self.assertEqual(seg('ʦʰa', {'ʦ'}), ['<ʦ>ʰ', 'a'])
+
+
+	@given(text())
+	def test_segment_does_not_lose_chars(self, t):
+		self.assertEqual(''.join(self.exporter.segment(t)), t.replace(' ', '_'))
+
+
+	def test_write(self):
+		self.exporter.write(2, 'ʦa', (UnknownSymbol('ʦ', 'LATIN SMALL LETTER TS DIGRAPH'),))
+		self.exporter.close()
+
+		with open(self.file_path, newline='') as f:
+			rows = list(csv.reader(f, dialect='excel-tab'))
+
+		self.assertEqual(rows, [EXPORT_HEADER, ['2', 'ʦa', '<ʦ> a']])
+
+
+	def test_lint_export(self):
+		dataset = os.path.join(os.path.dirname(__file__), 'fixtures', 'hawaiian.tsv')
+		Core().lint(dataset, col='item', export=self.file_path)
+
+		with open(self.file_path, newline='') as f:
+			rows = list(csv.reader(f, dialect='excel-tab'))
+
+		self.assertEqual(len(rows), 247)
+		self.assertEqual(rows[1], ['2', 'lima', 'l i m a'])
+		self.assertEqual(rows[3], ['4', '\'a\u0304kau', '<\'> a\u0304 k a u'])
@@ -0,0 +1,112 @@
+import os
+import os.path
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ipalint.core import Core
+from ipalint.index import format_lines
+
+
+
+class IndexTestCase(TestCase):
+
+	def setUp(self):
+		self.core = Core()
+
+		self.temp_dir = TemporaryDirectory()
+		self.dir = os.path.join(self.temp_dir.name, 'data')
+		self.index_path = os.path.join(self.temp_dir.name, 'index.db')
+
+		self.cwd = os.getcwd()
+		os.chdir(self.temp_dir.name)
+
+	def tearDown(self):
+		os.chdir(self.cwd)
+		self.temp_dir.cleanup()
+
+
+	def _write(self, name, text):
+		"""
+		Writes the given text to the given file in the data dir.
+		"""
+		file_path = os.path.join(self.dir, name)
+		os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+		with open(file_path, 'w', encoding='utf-8') as f:
+			f.write(text)
+
+
+	def test_format_lines(self):
+		self.assertEqual(format_lines([7, 3, 4, 5, 3, 9]), (6, 5, '3-5,7,9'))
+		self.assertEqual(format_lines([]), (0, 0, ''))
+
+
+	def test_index(self):
+		self._write('a.csv', 'id,ipa\n1,ʦa\n2,pa\n3,ʦu\n4,ʦi\n')
+		self._write('sub/b.tsv', 'id\tipa\n1\tpa \n2\tʦa\n')
+		self._write('c.csv', 'id,form\n1,pa\n')
+
+		self.assertEqual(self.core.index(self.index_path, self.dir), (3, 0))
+		self.assertEqual(self.core.index(self.index_path, self.dir), (1, 0))  # c.csv
+
+		self.assertEqual(self.core.query(self.index_path, symbol='ʦ'), (
+			'data/a.csv ← 2,4-5\n'
+			'data/sub/b.tsv ← 3'))
+
+		self.assertEqual(self.core.query(self.index_path, symbol='pʦ', counts=True), (
+			'==> p (LATIN SMALL LETTER P) vl bilabial plosive <==\n'
+			'data/a.csv ← 1 occurrence, 1 line\n'
+			'data/sub/b.tsv ← 1 occurrence, 1 line\n\n'
+			'==> ʦ (LATIN SMALL LETTER TS DIGRAPH) is not part of IPA <==\n'
+			'data/a.csv ← 3 occurrences, 3 lines\n'
+			'data/sub/b.tsv ← 1 occurrence, 1 line'))
+
+		self.assertEqual(self.core.query(self.index_path, error='WHITESPACE'),
+						'data/sub/b.tsv ← 2')
+
+		self.assertEqual(self.core.query(self.index_path,
+						file='data/sub/b.tsv', no_lines=True), '\n'.join([
+			'leading or trailing whitespace',
+			'ʦ (LATIN SMALL LETTER TS DIGRAPH) is not part of IPA, '
+			'suggested replacement is t͡s',
+			'',
+			'a (LATIN SMALL LETTER A) open front unrounded vowel',
+			'p (LATIN SMALL LETTER P) vl bilabial plosive']))
+
+		with self.assertRaises(ValueError):
+			self.core.query(self.index_path, file='data/c.csv')
+
+
+	def test_index_update(self):
+		self._write('a.csv', 'id,ipa\n1,ʦa\n')
+		self._write('b.csv', 'id,ipa\n1,ʦa\n')
+
+		self.assertEqual(self.core.index(self.index_path, self.dir), (2, 0))
+
+		self._write('a.csv', 'id,ipa\n1,pa\n')
+		os.remove(os.path.join(self.dir, 'b.csv'))
+		self._write('c.csv', 'id,ipa\n1,ʦa\n')
+
+		self.assertEqual(self.core.index(self.index_path, self.dir), (2, 1))
+		self.assertEqual(self.core.query(self.index_path, symbol='ʦ', no_lines=True),
+						'data/c.csv')
+
+		self.assertEqual(self.core.index(self.index_path,
+						os.path.join(self.dir, 'a.csv')), (0, 0))
+		self.assertEqual(self.core.query(self.index_path, symbol='ʦ', no_lines=True),
+						'data/c.csv')
+
+
+	def test_index_settings(self):
+		self._write('a.csv', 'id,ipa\n1,pa  ta\n')
+
+		self.core.index(self.index_path, self.dir, rules=['all'])
+		self.assertEqual(self.core.query(self.index_path, error='spaces'),
+						'data/a.csv ← 2')
+
+		with self.assertRaises(ValueError):
+			self.core.index(self.index_path, self.dir)
+
+		with self.assertRaises(ValueError):
+			self.core.query(os.path.join(self.temp_dir.name, 'nope.db'), symbol='a')
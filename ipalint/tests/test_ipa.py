@@ -1,14 +1,17 @@
+import os
 import os.path
 import string
 
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
-from hypothesis.strategies import integers, text
+from hypothesis.strategies import characters, integers, text
 from hypothesis import assume, given
 
-from ipalint.ipa import IPA_DATA_PATH, COMMON_ERR_DATA_PATH
+from ipalint.ipa import IPA_DATA_PATH, COMMON_ERR_DATA_PATH, BUILTIN_PROFILE
 from ipalint.ipa import Symbol, UnknownSymbol
 from ipalint.ipa import IPADataError, Recogniser
+from ipalint.spill import SpillStore
 
 
 
@@ -76,8 +79,124 @@ class RecogniserTestCase(TestCase):
 		self.assertEqual(sym[7], Symbol('ɪ', 'LATIN LETTER SMALL CAPITAL I', 'lowered-close front unrounded vowel'))
 
 
+	def test_recognise_counts(self):
+		recog = Recogniser(counts=True)
+		for line_num, string in enumerate(['pʰa', 'ʦaʦ', 'pa']):
+			recog.recognise(string, line_num)
+
+		tally = recog.ipa_symbols[Symbol('p', 'LATIN SMALL LETTER P', 'vl bilabial plosive')]
+		self.assertEqual((tally.occurrences, tally.rows), (2, 2))
+
+		tally = recog.unk_symbols[UnknownSymbol('ʦ', 'LATIN SMALL LETTER TS DIGRAPH')]
+		self.assertEqual((tally.occurrences, tally.rows), (2, 1))
+
+
+	def test_recognise_spill_store(self):
+		store = SpillStore(2)
+		recog = Recogniser(store=store)
+		for line_num, string in enumerate(['pʰa', 'ʦaʦ', 'pa']):
+			recog.recognise(string, line_num)
+
+		tally = recog.ipa_symbols[Symbol('p', 'LATIN SMALL LETTER P', 'vl bilabial plosive')]
+		self.assertEqual((tally.occurrences, tally.rows), (2, 2))
+
+		lines = recog.unk_symbols[UnknownSymbol('ʦ', 'LATIN SMALL LETTER TS DIGRAPH')]
+		self.assertEqual(list(lines), [1, 1])
+
+		store.close()
+
+
+	@given(text(alphabet=characters(max_codepoint=127)))
+	def test_recognise_ascii(self, t):
+		sym, unk = self.recog.recognise(t, 0)
+		self.assertEqual(len(sym) + len(unk), len(t.replace(' ', '')))
+
+		# appending a non-ASCII char makes recognise take the general path
+		gen_sym, gen_unk = self.recog.recognise(t + 'ɐ', 1)
+		self.assertEqual(sym, gen_sym[:-1])
+		self.assertEqual(unk, gen_unk)
+
+
 	@given(text(), integers(min_value=0))
 	def test_recognise_does_not_break(self, t, i):
 		sym, unk = self.recog.recognise(t, i)
 		self.assertTrue(all([isinstance(i, Symbol) for i in sym]))
 		self.assertTrue(all([isinstance(i, UnknownSymbol) for i in unk]))
+
+
+
+class ProfileTestCase(TestCase):
+
+	def setUp(self):
+		self.temp_dir = TemporaryDirectory()
+		self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+
+		self.profile_path = os.path.join(self.temp_dir.name, 'profile.tsv')
+		with open(self.profile_path, 'w') as f:
+			f.write('a\tlow central vowel\nʦ\tvl alveolar affricate\n')
+
+		self.profile_dir = os.path.join(self.temp_dir.name, 'profile')
+		os.mkdir(self.profile_dir)
+		with open(os.path.join(self.profile_dir, 'common_errors.tsv'), 'w') as f:
+			f.write('ɑ\ta\n')
+
+
+	def tearDown(self):
+		self.temp_dir.cleanup()
+
+
+	def test_restricted_profile(self):
+		recog = Recogniser([self.profile_path], cache_dir=self.cache_dir)
+		self.assertEqual(recog.ipa, {'a': 'low central vowel', 'ʦ': 'vl alveolar affricate'})
+		self.assertEqual(recog.common_err, {})
+
+		sym, unk = recog.recognise('ʦap', 0)
+		self.assertEqual([s.char for s in sym], ['ʦ', 'a'])
+		self.assertEqual([s.char for s in unk], ['p'])
+
+
+	def test_layered_profiles(self):
+		recog = Recogniser([BUILTIN_PROFILE, self.profile_path, self.profile_dir],
+						cache_dir=self.cache_dir)
+		self.assertEqual(len(recog.ipa), 171)
+		self.assertEqual(recog.ipa['a'], 'low central vowel')
+		self.assertEqual(recog.common_err['ɑ'], 'a')
+		self.assertEqual(recog.common_err['ʦ'], 't͡s')
+
+
+	def test_profile_errors(self):
+		with self.assertRaises(IPADataError):
+			Recogniser([os.path.join(self.temp_dir.name, 'nope')])
+
+		with self.assertRaises(IPADataError):
+			Recogniser([self.profile_dir], cache_dir=self.cache_dir)
+
+
+	def test_profile_cache(self):
+		recog = Recogniser([self.profile_path], cache_dir=self.cache_dir)
+		self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+		cached = Recogniser([self.profile_path], cache_dir=self.cache_dir)
+		self.assertEqual(cached.ipa, recog.ipa)
+		self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+		with open(self.profile_path, 'a') as f:
+			f.write('p\tvl bilabial plosive\n')
+
+		recog = Recogniser([self.profile_path], cache_dir=self.cache_dir)
+		self.assertEqual(len(recog.ipa), 3)
+		self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+
+	def test_profile_cache_invalid(self):
+		recog = Recogniser([self.profile_path], cache_dir=self.cache_dir)
+		cache_path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+		self.assertTrue(cache_path.endswith('.json'))
+
+		for content in ['', '{"key": [], "ipa": {}, "common_err": {}}', '[]']:
+			with open(cache_path, 'w') as f:
+				f.write(content)
+
+			cached = Recogniser([self.profile_path], cache_dir=self.cache_dir)
+			self.assertEqual(cached.ipa, recog.ipa)
+			self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(cache_path)])
@@ -0,0 +1,165 @@
+import io
+import json
+
+from unittest import TestCase
+
+from hypothesis.strategies import text
+from hypothesis import given
+
+from ipalint.core import Core
+from ipalint.lsp import Document, from_utf16, get_field, LanguageServer
+from ipalint.lsp import LineLinter, to_utf16
+from ipalint.read import Dialect
+
+
+
+CSV = Dialect(',', '"', True, None)
+
+URI = 'file:///tmp/words.tsv'
+
+
+
+class LspTestCase(TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		recog, norm, engine = Core().get_linters(rules=['all'])
+		cls.linter = LineLinter(recog, engine)
+
+
+	@given(text())
+	def test_utf16(self, t):
+		for index in range(len(t) + 1):
+			self.assertEqual(from_utf16(t, to_utf16(t, index)), index)
+
+		self.assertEqual(to_utf16('𝐚b', 1), 2)
+
+
+	def test_get_field(self):
+		self.assertEqual(get_field('a,bc,d', CSV, 1), ('bc', [2, 3, 4]))
+		self.assertEqual(get_field('a,"b,""c",d', CSV, 1),
+						('b,"c', [3, 4, 6, 7, 9]))
+		self.assertEqual(get_field('a,', CSV, 1), ('', [2]))
+		self.assertIsNone(get_field('a,b', CSV, 2))
+
+
+	def test_lint(self):
+		lint = lambda string: [error[:2] + error[3:] for error in self.linter.lint(string)]
+
+		self.assertEqual(lint('pata'), [])
+		self.assertEqual(lint(' pata'), [(0, 1, False)])
+		self.assertEqual(lint('pʰa  ʦa'), [(3, 5, False), (5, 6, True)])
+		self.assertEqual(lint('ǹa'), [(0, 1, False)])
+		self.assertEqual(lint(' çá'), [(0, 1, False), (2, 3, False)])
+
+		self.assertEqual(self.linter.lint('ʦ')[0][2],
+			'ʦ (LATIN SMALL LETTER TS DIGRAPH) is not part of IPA, '
+			'suggested replacement is t͡s')
+
+
+	def test_document(self):
+		doc = Document(URI, 'id\tipa\n1\tpata\n2\tʦa\n', self.linter)
+
+		self.assertEqual(doc.ipa_col, 1)
+		self.assertEqual([(diag['range']['start'], diag['severity'])
+						for diag in doc.get_diagnostics()],
+						[({'line': 2, 'character': 2}, 1)])
+
+		doc.apply_change({'range': {
+			'start': {'line': 1, 'character': 4}, 'end': {'line': 1, 'character': 5}},
+			'text': 'ʦ'})
+
+		self.assertEqual(doc.lines, ['id\tipa', '1\tpaʦa', '2\tʦa', ''])
+		self.assertEqual(doc.line_errors[2][0][:2], (2, 3))
+		self.assertIsNone(doc.line_errors[1])
+
+		self.assertEqual([diag['range']['start']['line']
+						for diag in doc.get_diagnostics()], [1, 2])
+
+		doc.apply_change({'range': {
+			'start': {'line': 1, 'character': 0}, 'end': {'line': 2, 'character': 0}},
+			'text': ''})
+
+		self.assertEqual(doc.lines, ['id\tipa', '2\tʦa', ''])
+		self.assertEqual(len(doc.get_diagnostics()), 1)
+
+
+	def test_document_insert_line(self):
+		doc = Document(URI, 'id\tipa\n1\tpata\n2\tʦa\n3\t!a\n', self.linter)
+
+		get_lines = lambda: [diag['range']['start']['line']
+							for diag in doc.get_diagnostics()]
+		self.assertEqual(get_lines(), [2, 3])
+
+		doc.apply_change({'range': {
+			'start': {'line': 1, 'character': 0}, 'end': {'line': 1, 'character': 0}},
+			'text': '0\tpapa\n'})
+
+		self.assertEqual(doc.lines[1:3], ['0\tpapa', '1\tpata'])
+		self.assertEqual(get_lines(), [3, 4])
+
+		doc.apply_change({'range': {
+			'start': {'line': 1, 'character': 0}, 'end': {'line': 3, 'character': 0}},
+			'text': ''})
+
+		self.assertEqual(get_lines(), [1, 2])
+
+
+	def test_document_header_change(self):
+		doc = Document('file:///tmp/words.csv', 'id,form\n1,pata\n', self.linter)
+		self.assertIsNotNone(doc.error)
+
+		doc.apply_change({'range': {
+			'start': {'line': 0, 'character': 3}, 'end': {'line': 0, 'character': 7}},
+			'text': 'ipa'})
+
+		self.assertIsNone(doc.error)
+		self.assertEqual(doc.get_diagnostics(), [])
+
+
+	def test_server(self):
+		messages = [
+			{'id': 1, 'method': 'initialize', 'params': {}},
+			{'method': 'initialized', 'params': {}},
+			{'method': 'textDocument/didOpen', 'params': {'textDocument': {
+				'uri': URI, 'languageId': 'tsv', 'version': 1,
+				'text': 'ipa\n𝐚ʦa\n'}}},
+			{'method': 'textDocument/didChange', 'params': {
+				'textDocument': {'uri': URI, 'version': 2},
+				'contentChanges': [{'range': {
+					'start': {'line': 1, 'character': 2},
+					'end': {'line': 1, 'character': 3}}, 'text': 't͡s'}]}},
+			{'id': 2, 'method': 'shutdown'},
+			{'method': 'exit'}]
+
+		in_stream = io.BytesIO()
+		for message in messages:
+			body = json.dumps(message).encode('utf-8')
+			in_stream.write('Content-Length: {}\r\n\r\n'.format(len(body)).encode('ascii'))
+			in_stream.write(body)
+		in_stream.seek(0)
+
+		out_stream = io.BytesIO()
+		server = LanguageServer(self.linter)
+
+		self.assertEqual(server.run(in_stream, out_stream), 0)
+
+		out_stream.seek(0)
+		replies = []
+		while True:
+			reply = server.read_message(out_stream)
+			if reply is None:
+				break
+			replies.append(reply)
+
+		self.assertEqual([reply.get('id') for reply in replies], [1, None, None, 2])
+		self.assertEqual(replies[0]['result']['capabilities']['textDocumentSync']['change'], 2)
+
+		diagnostics = replies[1]['params']['diagnostics']
+		self.assertEqual([diag['range'] for diag in diagnostics], [
+			{'start': {'line': 1, 'character': 0}, 'end': {'line': 1, 'character': 2}},
+			{'start': {'line': 1, 'character': 2}, 'end': {'line': 1, 'character': 3}}])
+
+		diagnostics = replies[2]['params']['diagnostics']
+		self.assertEqual(len(diagnostics), 1)
+		self.assertIn('MATHEMATICAL BOLD SMALL A', diagnostics[0]['message'])
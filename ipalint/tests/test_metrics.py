@@ -0,0 +1,116 @@
+import os.path
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ipalint.core import Core, lint_rows
+from ipalint.metrics import format_metric, STAGES
+
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+
+class MetricsTestCase(TestCase):
+
+	def setUp(self):
+		self.core = Core()
+		self.temp_dir = TemporaryDirectory()
+
+		self.file_path = os.path.join(FIXTURES_DIR, 'hawaiian.txt')
+		self.metrics_path = os.path.join(self.temp_dir.name, 'ipalint.prom')
+
+	def tearDown(self):
+		self.temp_dir.cleanup()
+
+
+	def _read_metrics(self):
+		"""
+		Returns the {metric line without the value: value} dict of the
+		metrics file.
+		"""
+		with open(self.metrics_path, encoding='utf-8') as f:
+			lines = [line.rstrip('\n') for line in f if not line.startswith('#')]
+
+		return dict([line.rsplit(' ', maxsplit=1) for line in lines])
+
+
+	def test_format_metric(self):
+		self.assertEqual(format_metric('rows', [], 42), 'ipalint_rows 42')
+		self.assertEqual(format_metric('errors',
+						[('source', 'a.csv'), ('error', 'a "b" \\ c\n')], 1.5),
+						'ipalint_errors{source="a.csv",error="a \\"b\\" \\\\ c\\n"} 1.5')
+
+
+	def test_lint_rows(self):
+		recog, norm, engine = self.core.get_linters(rules=['all'])
+		stages = {'normalise': 0.0, 'rules': 0.0, 'recognise': 0.0}
+
+		try:
+			results = lint_rows([(' pa', 1), ('ʦa', 2)], recog, norm, engine, stages)
+			self.assertEqual([string for string, unknown in results], ['pa', 'ʦa'])
+			self.assertEqual([len(unknown) for string, unknown in results], [0, 1])
+			self.assertEqual(list(norm.strip_errors), [1])
+			self.assertTrue(all([value > 0 for value in stages.values()]))
+		finally:
+			recog.clear()
+			norm.clear()
+			engine.clear()
+
+
+	def test_lint(self):
+		source = 'source="{}"'.format(self.file_path)
+
+		for kwargs in [{}, {'counts': True}, {'rules': ['all'], 'ignore_nfd': True}]:
+			report = self.core.lint(self.file_path, metrics=self.metrics_path, **kwargs)
+			self.assertEqual(report, self.core.lint(self.file_path, **kwargs))
+
+			metrics = self._read_metrics()
+
+			self.assertEqual(metrics['ipalint_rows{{{}}}'.format(source)], '246')
+			self.assertEqual(metrics['ipalint_read_bytes{{{}}}'.format(source)],
+							str(os.path.getsize(self.file_path)))
+
+			errors = {key[len('ipalint_errors{{{},category="'.format(source)):-2]: value
+						for key, value in metrics.items()
+						if key.startswith('ipalint_errors{')}
+			self.assertEqual(sum(map(int, errors.values())), int(metrics[
+							'ipalint_error_occurrences{{{}}}'.format(source)]))
+
+			if not kwargs.get('rules'):
+				self.assertEqual(errors, {'whitespace': '0', 'nfd': '51',
+										'bad_bytes': '0', 'unknown_symbol': '94'})
+
+			for stage in STAGES:
+				self.assertIn('ipalint_stage_duration_seconds{{stage="{}"}}'.format(stage),
+							metrics)
+
+		self.assertNotIn('nfd', errors)
+		self.assertIn('rule:double-space', errors)
+
+
+	def test_lint_export(self):
+		export_paths = [os.path.join(self.temp_dir.name, name)
+						for name in ['a.tsv', 'b.tsv']]
+
+		self.core.lint(self.file_path, export=export_paths[0])
+		self.core.lint(self.file_path, export=export_paths[1],
+						metrics=self.metrics_path)
+
+		with open(export_paths[0], encoding='utf-8') as f:
+			with open(export_paths[1], encoding='utf-8') as g:
+				self.assertEqual(f.read(), g.read())
+
+		self.assertNotEqual(self._read_metrics()[
+				'ipalint_stage_duration_seconds{stage="export"}'], '0.0')
+
+
+	def test_lint_state(self):
+		state_path = os.path.join(self.temp_dir.name, 'state.json')
+		self.core.lint(self.file_path, dump_state=state_path,
+						metrics=self.metrics_path)
+
+		metrics = self._read_metrics()
+		self.assertEqual(metrics['ipalint_errors{{source="{}",'
+				'category="nfd"}}'.format(self.file_path)], '51')
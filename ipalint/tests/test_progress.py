@@ -0,0 +1,81 @@
+import io
+import os.path
+
+from unittest import TestCase
+
+from hypothesis.strategies import booleans, integers, none, one_of
+from hypothesis import given
+
+from ipalint.core import Core
+from ipalint.progress import format_progress, Progress, ProgressInfo, write_progress
+
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+
+class ProgressTestCase(TestCase):
+
+	def test_format_progress(self):
+		info = ProgressInfo(None, 1000, 2**20, 4 * 2**20, 5, 2.0, False)
+		self.assertEqual(format_progress(info),
+			'1,000 rows, 500 rows/s, 0.5 MB/s, 5 errors, 25% ETA 6s')
+
+		info = info._replace(heading='forms.csv', done=True)
+		self.assertEqual(format_progress(info),
+			'forms.csv: 1,000 rows, 500 rows/s, 0.5 MB/s, 5 errors, done in 2.0s')
+
+		info = info._replace(bytes_read=None, bytes_total=None, done=False)
+		self.assertEqual(format_progress(info),
+			'forms.csv: 1,000 rows, 500 rows/s, 5 errors')
+
+
+	@given(integers(min_value=0), one_of(none(), integers(min_value=0)),
+			integers(min_value=0), booleans())
+	def test_format_progress_does_not_fail(self, rows, num_bytes, errors, done):
+		info = ProgressInfo(None, rows, num_bytes, num_bytes, errors, 0, done)
+		self.assertIn('{:,} rows'.format(rows), format_progress(info))
+
+
+	def test_write_progress(self):
+		stream = io.StringIO()
+		callback = write_progress(stream)
+
+		callback(ProgressInfo(None, 1, None, None, 0, 1.0, False))
+		callback(ProgressInfo(None, 2, None, None, 0, 1.0, True))
+
+		self.assertEqual(stream.getvalue().splitlines(), [
+			'1 rows, 1 rows/s, 0 errors', '2 rows, 2 rows/s, 0 errors, done in 1.0s'])
+
+
+	def test_lint(self):
+		infos = []
+		file_path = os.path.join(FIXTURES_DIR, 'hawaiian.txt')
+
+		res = Core().lint(file_path, progress=infos.append)
+
+		self.assertEqual(res, Core().lint(file_path))
+		self.assertTrue(infos[-1].done)
+		self.assertEqual(infos[-1].rows, 246)
+		self.assertEqual(infos[-1].bytes_read, os.path.getsize(file_path))
+		self.assertEqual(infos[-1].errors, 145)
+
+
+	def test_rate_limit(self):
+		infos = []
+
+		class FakeReader:
+			def get_position(self):
+				return None
+
+		progress = Progress(infos.append, lambda: 0, interval=3600)
+		progress.start(FakeReader())
+
+		for _ in range(10000):
+			progress.update()
+
+		progress.finish()
+
+		self.assertEqual(len(infos), 1)
+		self.assertEqual(infos[0].rows, 10000)
@@ -1,15 +1,18 @@
 import csv
 import os.path
+import sqlite3
 import string
+import threading
+import time
 
 from tempfile import TemporaryDirectory
-from unittest import TestCase
+from unittest import skipUnless, TestCase
 
 from hypothesis.strategies import composite, fixed_dictionaries, integers
 from hypothesis.strategies import lists, sampled_from, sets, text
 from hypothesis import assume, given
 
-from ipalint.read import IPA_COL_NAMES, Reader
+from ipalint.read import gen_prefetched, IPA_COL_NAMES, Reader
 
 
 
@@ -21,6 +24,13 @@ HAWAIIAN_TXT_PATH = os.path.join(FIXTURES_DIR, 'hawaiian.txt')
 
 
 
+try:
+	import pyarrow
+except ImportError:
+	pyarrow = None
+
+
+
 CHARS_EXCL_NEWLINES = string.printable.rstrip('\r\n\x0b\x0c')
 
 
@@ -116,6 +126,23 @@ class ReaderTestCase(TestCase):
 		self.assertEqual(dialect.escapechar, None)
 
 
+	def test_determine_dialect_score(self):
+		reader = Reader('')
+
+		lines = ['a;b;c'] * 19 + ['a;b']
+		dialect = reader._determine_dialect(lines)
+		self.assertEqual(dialect.delimiter, ';')
+		self.assertEqual(reader.dialect_confidence, 0.95)
+
+		lines = ['a;b,c'] * 10
+		dialect = reader._determine_dialect(lines)
+		self.assertEqual(dialect.delimiter, ',')
+		self.assertEqual(reader.dialect_confidence, 0)
+
+		lines = ['a;b;c'] * 5 + ['a;b'] * 5
+		self.assertEqual(reader._determine_dialect(lines), None)
+
+
 	@given(integers(min_value=2, max_value=20).flatmap(lambda cols:
 				lists(lists(text(alphabet=CHARS_EXCL_NEWLINES),
 						min_size=cols, max_size=cols), min_size=1)))
@@ -189,7 +216,8 @@ class ReaderTestCase(TestCase):
 
 	@given(sampled_from(IPA_COL_NAMES), lists(text()))
 	def test_infer_ipa_col_guess(self, col_name, li):
-		assume(all([i not in IPA_COL_NAMES for i in li]))
+		assume(all([not i.lower().startswith(name)
+				for i in li for name in IPA_COL_NAMES]))
 		reader = Reader('')
 
 		for pos in range(len(li)+1):
@@ -263,3 +291,195 @@ class ReaderTestCase(TestCase):
 
 		with self.assertRaises(ValueError):
 			[res for res in reader.gen_ipa_data()]
+
+
+	def test_gen_ipa_data_groups(self):
+		reader = Reader(HAWAIIAN_CSV_PATH, ipa_col=3)
+		data = [res for res in reader.gen_ipa_data()]
+
+		reader = Reader(HAWAIIAN_CSV_PATH, ipa_col=3, group_col='loan')
+		data_grouped = [res for res in reader.gen_ipa_data()]
+		self.assertEqual([res[:2] for res in data_grouped], data)
+		self.assertEqual(data_grouped[0], ('lima', 2, ''))
+		self.assertIn('L', [res[2] for res in data_grouped])
+
+		reader = Reader(HAWAIIAN_CSV_PATH, ipa_col=3, group_col='2')
+		self.assertEqual([res for res in reader.gen_ipa_data()][0], ('lima', 2, 'hand'))
+
+		for reader in [
+				Reader(HAWAIIAN_CSV_PATH, ipa_col=3, group_col='nope'),
+				Reader(HAWAIIAN_CSV_PATH, ipa_col=3, group_col=42),
+				Reader(HAWAIIAN_TXT_PATH, group_col=0)]:
+			with self.assertRaises(ValueError):
+				[res for res in reader.gen_ipa_data()]
+
+
+	def test_gen_ipa_data_bad_bytes(self):
+		file_path = os.path.join(self.temp_dir.name, 'test.csv')
+
+		with open(file_path, 'wb') as f:
+			f.write('id,ipa\n1,pʰa\xe9\n2,ta\n3,k\xff\xfea\n4,\xe9\n'.encode('utf-8')
+				.replace(b'\xc3\xa9', b'\xe9').replace(b'\xc3\xbf\xc3\xbe', b'\xff\xfe'))
+
+		reader = Reader(file_path)
+		with self.assertRaises(ValueError):
+			[res for res in reader.gen_ipa_data()]
+
+		reader = Reader(file_path, bad_bytes=True)
+		data = [res for res in reader.gen_ipa_data()]
+		self.assertEqual(data, [('pʰa\ufffd', 2), ('ta', 3), ('k\ufffda', 4), ('\ufffd', 5)])
+
+		self.assertEqual(reader.get_bad_bytes(), [
+			('invalid UTF-8 bytes \\xe9 (at byte offset 6 of the line)', [2]),
+			('invalid UTF-8 bytes \\xff\\xfe (at byte offset 3 of the line)', [4]),
+			('invalid UTF-8 bytes \\xe9 (at byte offset 2 of the line)', [5])])
+		self.assertEqual(reader.get_bad_bytes(10)[0][1], [12])
+		self.assertEqual(reader.get_bad_bytes(line_filter=[4, 5]), [
+			('invalid UTF-8 bytes \\xff\\xfe (at byte offset 3 of the line)', [4]),
+			('invalid UTF-8 bytes \\xe9 (at byte offset 2 of the line)', [5])])
+
+		reader = Reader(HAWAIIAN_CSV_PATH, ipa_col=3, bad_bytes=True)
+		data = [res for res in reader.gen_ipa_data()]
+		self.assertEqual(len(data), 246)
+		self.assertEqual(reader.get_bad_bytes(), [])
+
+
+	def test_gen_prefetched(self):
+		reader = Reader(HAWAIIAN_CSV_PATH, ipa_col=3)
+		data = [res for res in reader.gen_ipa_data()]
+
+		for chunk_size, max_chunks in [(1, 1), (7, 2), (1024, 16)]:
+			reader = Reader(HAWAIIAN_CSV_PATH, ipa_col=3)
+			self.assertEqual(list(gen_prefetched(reader.gen_ipa_data(),
+								chunk_size, max_chunks)), data)
+
+		self.assertEqual(list(gen_prefetched([])), [])
+
+		reader = Reader(HAWAIIAN_CSV_PATH, ipa_col=42)
+		with self.assertRaises(ValueError):
+			list(gen_prefetched(reader.gen_ipa_data()))
+
+		running = set(threading.enumerate())
+
+		data = gen_prefetched(iter(range(100000)), chunk_size=10, max_chunks=2)
+		self.assertEqual(next(data), 0)
+
+		threads = [thread for thread in threading.enumerate()
+					if thread.name == 'ipalint-reader' and thread not in running]
+		self.assertEqual(len(threads), 1)
+
+		data.close()
+		threads[0].join(5)
+		self.assertFalse(threads[0].is_alive())
+
+
+	def test_gen_prefetched_close(self):
+		closed = []
+
+		def gen():
+			try:
+				yield from range(100000)
+			finally:
+				closed.append(True)
+
+		data = gen_prefetched(gen(), chunk_size=10, max_chunks=2)
+		self.assertEqual([next(data) for i in range(15)], list(range(15)))
+		data.close()
+
+		for i in range(50):
+			if closed:
+				break
+			time.sleep(0.1)
+
+		self.assertEqual(closed, [True])
+
+
+	@skipUnless(pyarrow, 'pyarrow is not installed')
+	def test_gen_ipa_data_arrow(self):
+		import pyarrow.feather
+		import pyarrow.parquet
+
+		table = pyarrow.table({
+			'id': [1, 2, 3, 4],
+			'ipa': ['lima', None, 'hema', 'ʦa'],
+			'gloss': ['hand', 'eye', 'left', 'x']})
+
+		for name, write in [
+				('test.parquet', lambda path: pyarrow.parquet.write_table(
+										table, path, row_group_size=2)),
+				('test.feather', lambda path: pyarrow.feather.write_feather(
+										table, path, chunksize=3))]:
+			file_path = os.path.join(self.temp_dir.name, name)
+			write(file_path)
+
+			reader = Reader(file_path)
+			data = [res for res in reader.gen_ipa_data()]
+			self.assertEqual(data, [('lima', 0), ('hema', 2), ('ʦa', 3)])
+
+			reader = Reader(file_path, ipa_col='gloss')
+			data = [res for res in reader.gen_ipa_data()]
+			self.assertEqual(data[1], ('eye', 1))
+
+			reader = Reader(file_path, ipa_col='nope')
+			with self.assertRaises(ValueError):
+				[res for res in reader.gen_ipa_data()]
+
+			reader = Reader(file_path, group_col='gloss')
+			data = [res for res in reader.gen_ipa_data()]
+			self.assertEqual(data, [('lima', 0, 'hand'), ('hema', 2, 'left'), ('ʦa', 3, 'x')])
+
+
+	def test_gen_ipa_data_sqlite(self):
+		file_path = os.path.join(self.temp_dir.name, 'test.sqlite')
+
+		conn = sqlite3.connect(file_path)
+		conn.execute('CREATE TABLE forms (id TEXT PRIMARY KEY, gloss TEXT, ipa TEXT)')
+		conn.executemany('INSERT INTO forms VALUES (?, ?, ?)', [
+			('a1', 'hand', 'lima'), ('a2', 'eye', None), ('a3', 'left', 'hema')])
+		conn.execute('CREATE TABLE notes (text TEXT)')
+		conn.execute('INSERT INTO notes VALUES (\'ʦa\')')
+		conn.commit()
+
+		reader = Reader(file_path, table='forms')
+		data = [res for res in reader.gen_ipa_data()]
+		self.assertEqual(data, [('lima', 'a1'), ('hema', 'a3')])
+
+		reader = Reader(file_path, table='notes', ipa_col='text')
+		data = [res for res in reader.gen_ipa_data()]
+		self.assertEqual(data, [('ʦa', 1)])
+
+		reader = Reader(file_path, table='forms', group_col='gloss')
+		data = [res for res in reader.gen_ipa_data()]
+		self.assertEqual(data, [('lima', 'a1', 'hand'), ('hema', 'a3', 'left')])
+
+		for reader in [Reader(file_path), Reader(file_path, table='nope')]:
+			with self.assertRaises(ValueError):
+				[res for res in reader.gen_ipa_data()]
+
+		cursor = conn.execute('SELECT gloss, ipa FROM forms ORDER BY id DESC')
+		reader = Reader(cursor, key_col='gloss')
+		data = [res for res in reader.gen_ipa_data()]
+		self.assertEqual(data, [('hema', 'left'), ('lima', 'hand')])
+
+		conn.close()
+
+
+	def test_gen_ipa_data_sqlite_composite_key(self):
+		file_path = os.path.join(self.temp_dir.name, 'test.sqlite')
+
+		conn = sqlite3.connect(file_path)
+		conn.execute('CREATE TABLE forms (num INTEGER, lang TEXT, ipa TEXT, '
+					'PRIMARY KEY (lang, num)) WITHOUT ROWID')
+		conn.executemany('INSERT INTO forms VALUES (?, ?, ?)', [
+			(1, 'haw', 'lima'), (2, 'haw', 'maka'), (1, 'fij', 'liga')])
+		conn.commit()
+		conn.close()
+
+		reader = Reader(file_path, table='forms')
+		self.assertTrue(reader.has_row_keys())
+
+		data = [res for res in reader.gen_ipa_data()]
+		self.assertEqual(data, [
+			('liga', 'fij/1'), ('lima', 'haw/1'), ('maka', 'haw/2')])
+
+		self.assertFalse(Reader(HAWAIIAN_TSV_PATH).has_row_keys())
@@ -1,3 +1,4 @@
+import io
 import string
 
 from unittest import TestCase
@@ -6,7 +7,8 @@ from hypothesis.strategies import dictionaries, integers
 from hypothesis.strategies import lists, text, tuples
 from hypothesis import given
 
-from ipalint.report import Reporter
+from ipalint.report import Error, Reporter, Tally, format_counts
+from ipalint.spill import SpillStore
 
 
 
@@ -40,3 +42,100 @@ class ReporterTestCase(TestCase):
 		self.assertEqual(len(rep.splitlines()), len(li))
 
 		self.rep.clear()
+
+
+	@given(lists(tuples(integers(min_value=0, max_value=42),
+			text(alphabet=string.ascii_letters, min_size=1)),
+			min_size=1))
+	def test_write_report_spilled(self, li):
+		for line, error in li:
+			self.rep.add([line], error)
+
+		spilling = Reporter(sort_limit=2)
+		spilling.errors = self.rep.errors
+
+		for linewise in [True, False]:
+			stream = io.StringIO()
+			spilling.write_report(stream, linewise=linewise)
+			self.assertEqual(stream.getvalue(),
+					self.rep.get_report(linewise=linewise) + '\n')
+
+		self.rep.clear()
+
+
+	def test_get_linewise_report_order(self):
+		self.rep.add([3, 1, 3], 'b')
+		self.rep.add([2, 3], 'a')
+
+		self.assertEqual(self.rep.get_report(linewise=True), '\n'.join([
+			'  1 → b', '  2 → a', '  3 → b', '  3 → b', '  3 → a']))
+		self.assertEqual(self.rep.get_report(), 'b ← 1,3\na ← 2,3')
+
+
+	def test_get_report_ranges(self):
+		self.rep.add([7, 3, 4, 5, 4, 9, 10], 'a')
+		self.rep.add([1], 'b')
+
+		self.assertEqual(self.rep.get_report(ranges=True), 'a ← 3-5,7,9-10\nb ← 1')
+		self.assertEqual(self.rep.get_report(ranges=True, max_lines=2),
+					'a ← 3-5,7,… (6 in total)\nb ← 1')
+		self.assertEqual(self.rep.get_report(max_lines=2),
+					'a ← 3,4,… (6 in total)\nb ← 1')
+		self.assertEqual(self.rep.get_report(max_lines=4, ranges=True),
+					'a ← 3-5,7,9-10\nb ← 1')
+		self.assertEqual(self.rep.get_report(max_lines=0),
+					'a ← … (6 in total)\nb ← … (1 in total)')
+
+
+	@given(lists(integers(min_value=0, max_value=42)))
+	def test_tally(self, li):
+		li.sort()
+
+		tally = Tally()
+		for line_num in li:
+			tally.append(line_num)
+
+		self.assertEqual(len(tally), len(li))
+		self.assertEqual(tally.rows, len(set(li)))
+
+		merged = Tally()
+		merged.extend(tally)
+		merged.extend([43, 43])
+		self.assertEqual(merged.occurrences, len(li) + 2)
+		self.assertEqual(merged.rows, len(set(li)) + 1)
+
+
+	def test_get_counts_report(self):
+		tally = Tally()
+		tally.extend([1, 1, 2])
+
+		self.rep.add(tally, 'a')
+		self.rep.add([3, 3, 4], 'b')
+		self.rep.add_symbol([5], 'p')
+
+		self.assertEqual(self.rep.get_report(counts=True), '\n'.join([
+			'a ← 3 occurrences, 2 lines',
+			'b ← 3 occurrences, 2 lines',
+			'',
+			'p ← 1 occurrence, 1 line']))
+
+
+	def test_format_counts(self):
+		self.assertEqual(format_counts(1, 1), '1 occurrence, 1 line')
+		self.assertEqual(format_counts(2, 1), '2 occurrences, 1 line')
+		self.assertEqual(format_counts(0, 0), '0 occurrences, 0 lines')
+
+
+	def test_get_report_spill_store(self):
+		store = SpillStore(2)
+
+		lines = store.new_list()
+		lines.extend([5, 3, 4, 3])
+		self.rep.add(lines, 'a')
+		self.assertIs(self.rep.errors[Error('a')], lines)
+
+		self.assertEqual(self.rep.get_report(), 'a ← 3,4,5')
+		self.assertEqual(self.rep.get_report(linewise=True), '\n'.join([
+			'  3 → a', '  3 → a', '  4 → a', '  5 → a']))
+
+		store.close()
@@ -0,0 +1,67 @@
+import re
+
+from unittest import TestCase
+
+from hypothesis.strategies import sampled_from, text
+from hypothesis import given
+
+from ipalint.report import Reporter
+from ipalint.rules import get_rule_names, RuleEngine, RULES
+
+
+
+class RuleEngineTestCase(TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.engine = RuleEngine(['all'])
+
+	def setUp(self):
+		self.engine.clear()
+
+
+	def test_get_rule_names(self):
+		self.assertEqual(get_rule_names([]), [])
+		self.assertEqual(get_rule_names(['all']), list(RULES))
+		self.assertEqual(get_rule_names(['double-space', 'all'])[0], 'double-space')
+
+		with self.assertRaises(ValueError):
+			get_rule_names(['nope'])
+
+
+	def test_check(self):
+		check = self.engine.check
+		self.assertEqual(check('pata', 0), ())
+		self.assertEqual(check('pa  ta', 1), ('double-space',))
+		self.assertEqual(check('pa\tta', 2), ('other-whitespace',))
+		self.assertEqual(check('pa ta', 3), ('other-whitespace',))
+		self.assertEqual(check('́a', 4), ('leading-diacritic',))
+		self.assertEqual(check('pa ́a', 5), ('leading-diacritic',))
+		self.assertEqual(check('á̀', 6), ())
+		self.assertEqual(check('á̀̃', 7), ('stacked-diacritics',))
+
+		self.assertEqual(check('́̀̃ a', 8),
+					('leading-diacritic', 'stacked-diacritics'))
+
+		self.assertEqual(self.engine.count_errors(), 8)
+
+
+	@given(text(alphabet=sampled_from('pa \t ́̀̃')))
+	def test_check_fused(self, t):
+		res = self.engine.check(t, 0)
+
+		for rule in self.engine.rules:
+			self.assertEqual(rule.name in res,
+						re.search(rule.pattern(), t) is not None)
+
+
+	def test_report(self):
+		engine = RuleEngine(['double-space'], counts=True)
+		for line_num, string in enumerate(['pa  ta', 'pata', 'pa  ta  ka']):
+			engine.check(string, line_num)
+
+		rep = Reporter()
+		engine.report(rep)
+
+		self.assertEqual(rep.get_report(counts=True),
+					'consecutive spaces ← 2 occurrences, 2 lines')
@@ -0,0 +1,117 @@
+import http.client
+import json
+import threading
+
+from unittest import TestCase
+
+from hypothesis.strategies import lists, text
+from hypothesis import given
+
+from ipalint.core import Core
+from ipalint.server import Batcher, parse_address, Server
+
+
+
+class BatcherTestCase(TestCase):
+
+	def setUp(self):
+		self.calls = []
+		self.batcher = Batcher(self._lint, max_wait=0.05)
+
+	def tearDown(self):
+		self.batcher.stop()
+
+	def _lint(self, strings):
+		self.calls.append(strings)
+		return [string.upper() for string in strings]
+
+
+	@given(lists(text()))
+	def test_submit(self, strings):
+		self.assertEqual(self.batcher.submit(strings),
+						[string.upper() for string in strings])
+
+
+	def test_coalesce(self):
+		results = {}
+
+		def submit(index):
+			results[index] = self.batcher.submit(['a{}'.format(index)])
+
+		threads = [threading.Thread(target=submit, args=(index,))
+						for index in range(10)]
+		for thread in threads: thread.start()
+		for thread in threads: thread.join()
+
+		self.assertEqual(results, {
+			index: ['A{}'.format(index)] for index in range(10)})
+		self.assertLess(len(self.calls), 10)
+
+
+	def test_error(self):
+		batcher = Batcher(lambda strings: 1/0)
+		with self.assertRaises(ZeroDivisionError):
+			batcher.submit(['a'])
+		batcher.stop()
+
+
+
+class ServerTestCase(TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.server = Server(Core(), ('127.0.0.1', 0))
+		cls.thread = threading.Thread(target=cls.server.serve_forever)
+		cls.thread.start()
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+		cls.server.server_close()
+		cls.thread.join()
+
+	def _post(self, body, headers={}):
+		conn = http.client.HTTPConnection(*self.server.server_address[:2])
+		conn.request('POST', '/lint', body=body.encode('utf-8'), headers=headers)
+		res = conn.getresponse()
+		data = json.loads(res.read().decode('utf-8'))
+		conn.close()
+		return res.status, data
+
+
+	def test_parse_address(self):
+		self.assertEqual(parse_address('8080'), ('127.0.0.1', 8080))
+		self.assertEqual(parse_address('0.0.0.0:80'), ('0.0.0.0', 80))
+		self.assertEqual(parse_address('[::1]:80'), ('[::1]', 80))
+
+		for address in ['', 'localhost', ':x', '70000']:
+			with self.assertRaises(ValueError):
+				parse_address(address)
+
+
+	def test_single(self):
+		status, data = self._post(json.dumps({'string': 'ʦa'}))
+		self.assertEqual(status, 200)
+		self.assertEqual(data['normalised'], 'ʦa')
+		self.assertEqual(len(data['errors']), 1)
+		self.assertTrue(data['errors'][0].startswith('ʦ '))
+
+
+	def test_batch(self):
+		status, data = self._post(json.dumps({'strings': [' pa', 'pa', 'ʦaʦ']}))
+		self.assertEqual(status, 200)
+		self.assertEqual([len(res['errors']) for res in data['results']], [1, 0, 1])
+		self.assertEqual(data['results'][0]['errors'],
+						['leading or trailing whitespace'])
+
+
+	def test_bad_request(self):
+		for body in ['{', '[]', '{"strings": [1]}', '{"string": null}']:
+			status, data = self._post(body)
+			self.assertEqual(status, 400)
+			self.assertIn('error', data)
+
+		for length in ['-1', 'x']:
+			status, data = self._post('{}', headers={'Content-Length': length})
+			self.assertEqual(status, 400)
+			self.assertEqual(data['error'], 'Bad Content-Length')
@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from hypothesis.strategies import integers, lists
+from hypothesis import given
+
+from ipalint.spill import gen_run, gen_sorted, gen_unique, write_run
+from ipalint.spill import split_limit, SpillStore
+
+
+
+class SpillTestCase(TestCase):
+
+	@given(lists(integers()))
+	def test_write_run(self, li):
+		f = write_run(li)
+		self.assertEqual(list(gen_run(f)), li)
+		self.assertTrue(f.closed)
+
+
+	@given(lists(integers()), integers(min_value=1, max_value=10))
+	def test_gen_sorted(self, li, limit):
+		self.assertEqual(list(gen_sorted(li, limit)), sorted(li))
+
+
+	@given(lists(integers(min_value=0, max_value=100)), integers(min_value=1, max_value=100))
+	def test_split_limit(self, sizes, limit):
+		limits = split_limit(sizes, limit)
+
+		self.assertEqual(len(limits), len(sizes))
+		self.assertTrue(all([item >= 1 for item in limits]))
+
+		if len(sizes) <= limit:
+			self.assertLessEqual(sum([min(item, size)
+								for item, size in zip(limits, sizes)]), limit)
+
+		if sum(sizes) <= limit:
+			self.assertEqual(limits, [max(size, 1) for size in sizes])
+
+		self.assertEqual(split_limit([0, 0, 3], 3), [1, 1, 3])
+
+
+	@given(lists(integers()))
+	def test_gen_unique(self, li):
+		self.assertEqual(list(gen_unique(sorted(li))), sorted(set(li)))
+
+
+	@given(lists(lists(integers())), integers(min_value=1, max_value=10))
+	def test_spill_store(self, lili, limit):
+		store = SpillStore(limit)
+		spill_lists = [store.new_list() for li in lili]
+
+		for li, spill_list in zip(lili, spill_lists):
+			spill_list.extend(li)
+			self.assertLessEqual(store.size, limit)
+
+		for li, spill_list in zip(lili, spill_lists):
+			self.assertEqual(list(spill_list), li)
+			self.assertEqual(len(spill_list), len(li))
+
+		store.close()
@@ -0,0 +1,231 @@
+import csv
+import datetime
+import os.path
+
+from tempfile import TemporaryDirectory
+from unittest import skipUnless, TestCase
+
+from ipalint.core import Core
+from ipalint.read import Reader
+from ipalint.spreadsheet import format_value, SheetRow, Workbook
+
+try:
+	import openpyxl
+except ImportError:
+	openpyxl = None
+
+try:
+	import odf
+except ImportError:
+	odf = None
+
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+HAWAIIAN_CSV_PATH = os.path.join(FIXTURES_DIR, 'hawaiian.csv')
+
+
+
+def write_xlsx(file_path, sheets):
+	"""
+	Writes an XLSX file with the given [] of (sheet name, [] of rows) tuples,
+	the rows being [] of strings; empty strings are left out. Booleans,
+	numbers, dates and datetimes are written as typed cells.
+	"""
+	workbook = openpyxl.Workbook()
+	workbook.remove(workbook.active)
+
+	for name, rows in sheets:
+		worksheet = workbook.create_sheet(name)
+
+		for row_index, row in enumerate(rows):
+			for col, value in enumerate(row):
+				if value != '':
+					worksheet.cell(row=row_index + 1, column=col + 1, value=value)
+
+	workbook.save(file_path)
+
+
+
+def write_ods(file_path, sheets):
+	"""
+	Writes an ODS file with the given [] of (sheet name, [] of rows) tuples,
+	the rows being [] of strings. Runs of identical rows and cells are
+	compressed, as in files saved by LibreOffice.
+	"""
+	from odf import teletype
+	from odf.opendocument import OpenDocumentSpreadsheet
+	from odf.table import Table, TableCell, TableRow
+	from odf.text import P
+
+	doc = OpenDocumentSpreadsheet()
+
+	for name, rows in sheets:
+		table = Table(name=name)
+
+		for row, group in _group(rows):
+			elem = TableRow(numberrowsrepeated=len(group))
+
+			for value, cell_group in _group(row):
+				cell = TableCell(numbercolumnsrepeated=len(cell_group))
+				if value:
+					para = P()
+					teletype.addTextToElement(para, value)
+					cell.addElement(para)
+				elem.addElement(cell)
+
+			table.addElement(elem)
+
+		elem = TableRow(numberrowsrepeated=1048000)
+		elem.addElement(TableCell(numbercolumnsrepeated=1024))
+		table.addElement(elem)
+
+		doc.spreadsheet.addElement(table)
+
+	doc.save(file_path)
+
+
+
+def _group(items):
+	"""
+	Returns the [] of (item, [] of consecutive equal items) tuples.
+	"""
+	groups = []
+
+	for item in items:
+		if groups and groups[-1][0] == item:
+			groups[-1][1].append(item)
+		else:
+			groups.append((item, [item]))
+
+	return groups
+
+
+
+class SpreadsheetTestCase(TestCase):
+
+	def setUp(self):
+		self.temp_dir = TemporaryDirectory()
+
+		with open(HAWAIIAN_CSV_PATH, encoding='utf-8', newline='') as f:
+			self.rows = list(csv.reader(f))
+
+		self.sheets = [
+			('notes', [['note'], ['see the other sheet']]),
+			('forms', self.rows)]
+
+	def tearDown(self):
+		self.temp_dir.cleanup()
+
+
+	def test_format_value(self):
+		self.assertEqual(format_value(None), '')
+		self.assertEqual(format_value(True), 'TRUE')
+		self.assertEqual(format_value(3), '3')
+		self.assertEqual(format_value(2.5), '2.5')
+		self.assertEqual(format_value(datetime.datetime(2024, 2, 29)), '2024-02-29')
+		self.assertEqual(format_value(datetime.datetime(2024, 2, 29, 13, 30)),
+						'2024-02-29 13:30:00')
+		self.assertEqual(format_value(datetime.time(6)), '06:00:00')
+		self.assertEqual(format_value('#N/A'), '#N/A')
+
+
+	@skipUnless(openpyxl and odf, 'openpyxl or odfpy is not installed')
+	def test_gen_rows(self):
+		rows = [['id', 'ipa'], ['1', 'pa  ta'], ['1', 'pa  ta'], ['', ''],
+				['3', ''], ['4', 'ʦa\tka']]
+
+		for ext, write, is_ods in [('xlsx', write_xlsx, False), ('ods', write_ods, True)]:
+			file_path = os.path.join(self.temp_dir.name, 'test.' + ext)
+			write(file_path, [('a', [['x']]), ('b', rows)])
+
+			workbook = Workbook(file_path, is_ods)
+			self.assertEqual(list(workbook.gen_rows('b')), [
+				(1, {0: 'id', 1: 'ipa'}), (2, {0: '1', 1: 'pa  ta'}),
+				(3, {0: '1', 1: 'pa  ta'}), (5, {0: '3'}), (6, {0: '4', 1: 'ʦa\tka'})])
+			self.assertEqual(list(workbook.gen_rows()), [(1, {0: 'x'})])
+
+			with self.assertRaises(ValueError):
+				list(workbook.gen_rows('c'))
+
+			workbook.close()
+
+
+	@skipUnless(openpyxl, 'openpyxl is not installed')
+	def test_gen_rows_types(self):
+		file_path = os.path.join(self.temp_dir.name, 'test.xlsx')
+		write_xlsx(file_path, [('a', [
+			['id', 'ipa', 'checked', 'count', 'date', 'time'],
+			['1', 'pa', True, 3, datetime.date(2024, 2, 29),
+				datetime.datetime(2024, 2, 29, 13, 30)],
+			['2', 'ta', False, 2.5]])])
+
+		workbook = Workbook(file_path)
+		self.assertEqual(list(workbook.gen_rows())[1:], [
+			(2, {0: '1', 1: 'pa', 2: 'TRUE', 3: '3', 4: '2024-02-29',
+				5: '2024-02-29 13:30:00'}),
+			(3, {0: '2', 1: 'ta', 2: 'FALSE', 3: '2.5'})])
+		workbook.close()
+
+		reader = Reader(file_path, ipa_col='checked', group_col='date')
+		self.assertEqual(list(reader.gen_ipa_data()), [
+			('TRUE', 'a!2', '2024-02-29'), ('FALSE', 'a!3', '')])
+
+
+	def test_sheet_row(self):
+		rows = [SheetRow('a!10'), SheetRow('b!2'), SheetRow('a!9'), SheetRow('a!b!1')]
+		self.assertEqual(sorted(rows), ['a!9', 'a!10', 'a!b!1', 'b!2'])
+		self.assertTrue(SheetRow('a!9') < SheetRow('a!10') <= SheetRow('a!10'))
+		self.assertTrue(SheetRow('a!10') > SheetRow('a!9') >= SheetRow('a!9'))
+		self.assertEqual(SheetRow('a!b!1').get_key(), ('a!b', 1))
+
+
+	@skipUnless(openpyxl and odf, 'openpyxl or odfpy is not installed')
+	def test_gen_ipa_data(self):
+		data = [(datum, SheetRow('forms!{}'.format(line_num)))
+				for datum, line_num in Reader(HAWAIIAN_CSV_PATH, ipa_col=3).gen_ipa_data()]
+
+		for ext, write in [('xlsx', write_xlsx), ('ods', write_ods)]:
+			file_path = os.path.join(self.temp_dir.name, 'hawaiian.' + ext)
+			write(file_path, self.sheets)
+
+			reader = Reader(file_path, ipa_col=3, table='forms')
+			self.assertEqual([res for res in reader.gen_ipa_data()], data)
+
+			reader = Reader(file_path, ipa_col='3', has_header=False, table='forms')
+			self.assertEqual([res for res in reader.gen_ipa_data()][1:], data)
+
+			reader = Reader(file_path, table='notes')
+			with self.assertRaises(ValueError):
+				[res for res in reader.gen_ipa_data()]
+
+			for reader in [Reader(file_path, table='nope'),
+							Reader(os.path.join(self.temp_dir.name, 'nope.' + ext))]:
+				with self.assertRaises(ValueError):
+					[res for res in reader.gen_ipa_data()]
+
+		file_path = os.path.join(self.temp_dir.name, 'broken.xlsx')
+		with open(file_path, 'w') as f:
+			f.write('id,ipa\n')
+
+		with self.assertRaises(ValueError):
+			[res for res in Reader(file_path).gen_ipa_data()]
+
+
+	@skipUnless(openpyxl and odf, 'openpyxl or odfpy is not installed')
+	def test_lint(self):
+		core = Core()
+
+		for ext, write in [('xlsx', write_xlsx), ('ods', write_ods)]:
+			file_path = os.path.join(self.temp_dir.name, 'hawaiian.' + ext)
+			write(file_path, self.sheets[::-1])
+
+			self.assertEqual(core.lint(file_path, col=3, no_lines=True),
+							core.lint(HAWAIIAN_CSV_PATH, col=3, no_lines=True))
+			self.assertIn('not in Unicode NFD ← forms!4,forms!5,forms!17,',
+							core.lint(file_path, col=3))
+
+			state_path = os.path.join(self.temp_dir.name, 'state.json')
+			core.lint(file_path, col=3, dump_state=state_path)
+			self.assertEqual(core.merge([state_path]), core.lint(file_path, col=3))
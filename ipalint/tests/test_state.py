@@ -0,0 +1,225 @@
+import json
+import os.path
+import sqlite3
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ipalint.core import Core
+from ipalint.state import read_state, STATE_FORMAT, write_state
+
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+
+class StateTestCase(TestCase):
+
+	def setUp(self):
+		self.core = Core()
+		self.temp_dir = TemporaryDirectory()
+
+		self.file_path = os.path.join(FIXTURES_DIR, 'hawaiian.txt')
+
+		with open(self.file_path, encoding='utf-8') as f:
+			self.lines = f.readlines()
+
+	def tearDown(self):
+		self.temp_dir.cleanup()
+
+
+	def _dump_shards(self, num_shards, counts=False, ext='.json', **kwargs):
+		"""
+		Splits the fixture into shards, lints each of these with the right line
+		offset, and returns the paths to the dumped states, in reverse order.
+		"""
+		size = len(self.lines) // num_shards + 1
+		states = []
+
+		for index in range(num_shards):
+			shard_path = os.path.join(self.temp_dir.name, 'shard{}.txt'.format(index))
+			with open(shard_path, 'w', encoding='utf-8') as f:
+				f.writelines(self.lines[index*size:(index+1)*size])
+
+			state_path = os.path.join(self.temp_dir.name, 'shard{}{}'.format(index, ext))
+			self.core.lint(shard_path, no_header=index > 0, line_offset=index*size,
+						counts=counts, dump_state=state_path, **kwargs)
+
+			states.append(state_path)
+
+		return states[::-1]
+
+
+	def test_merge(self):
+		states = self._dump_shards(3)
+
+		for kwargs in [{}, {'linewise': True}, {'ranges': True},
+						{'ignore_ws': True, 'max_lines_per_error': 3}]:
+			self.assertEqual(self.core.merge(states, **kwargs),
+							self.core.lint(self.file_path, **kwargs))
+
+		for char, name, ipa_name, lines in read_state(states[0])['sources'][0]['ipa_symbols']:
+			self.assertEqual(sorted(lines), ['last', 'occurrences', 'rows'])
+
+
+	def test_merge_rules(self):
+		self.lines[5] = 'pa  ta\n'
+		self.lines[200] = 'pa\tta  ka\n'
+
+		file_path = os.path.join(self.temp_dir.name, 'whole.txt')
+		with open(file_path, 'w', encoding='utf-8') as f:
+			f.writelines(self.lines)
+
+		res = self.core.merge(self._dump_shards(3, rules=['all']))
+		self.assertEqual(res, self.core.lint(file_path, rules=['all']))
+		self.assertIn('consecutive spaces ← 6,201', res)
+
+
+	def test_merge_counts(self):
+		expected = self.core.lint(self.file_path, counts=True)
+
+		self.assertEqual(self.core.merge(self._dump_shards(4), counts=True), expected)
+		self.assertEqual(self.core.merge(self._dump_shards(2, counts=True, ext='.json.gz'),
+						counts=True), expected)
+
+		with self.assertRaises(ValueError):
+			self.core.merge(self._dump_shards(2, counts=True))
+
+
+	def test_merge_bad_bytes(self):
+		file_path = os.path.join(self.temp_dir.name, 'bad.txt')
+		with open(file_path, 'wb') as f:
+			f.write(b'ipa\npa\xe9\nta\n\xff\n')
+
+		state_path = os.path.join(self.temp_dir.name, 'bad.json')
+		self.core.lint(file_path, bad_bytes=True, dump_state=state_path)
+
+		res = self.core.merge([state_path])
+		self.assertEqual(res, self.core.lint(file_path, bad_bytes=True))
+		self.assertIn('invalid UTF-8 bytes \\xe9 (at byte offset 2 of the line) ← 2', res)
+
+		state_paths = []
+		for index, shard in enumerate([b'ipa\npa\xe9\n', b'ta\nka\xe9\n\xff\n']):
+			shard_path = os.path.join(self.temp_dir.name, 'shard{}.txt'.format(index))
+			with open(shard_path, 'wb') as f:
+				f.write(shard)
+
+			state_paths.append(os.path.join(self.temp_dir.name, 'shard{}.json'.format(index)))
+			self.core.lint(shard_path, no_header=index > 0, line_offset=index*2,
+						bad_bytes=True, dump_state=state_paths[-1])
+
+		with open(file_path, 'wb') as f:
+			f.write(b'ipa\npa\xe9\nta\nka\xe9\n\xff\n')
+
+		res = self.core.merge(state_paths)
+		self.assertEqual(res, self.core.lint(file_path, bad_bytes=True))
+		self.assertIn('invalid UTF-8 bytes \\xe9 (at byte offset 2 of the line) ← 2,4', res)
+
+
+	def test_merge_groups(self):
+		file_path = os.path.join(self.temp_dir.name, 'groups.csv')
+		with open(file_path, 'w', encoding='utf-8') as f:
+			f.write('lang,ipa\nb,pa\na,ʦa \nb,ʦa\na,pa\nb,pʰa\n')
+
+		res = self.core.lint(file_path, group_by='lang')
+		self.assertEqual(res, '\n'.join([
+			'==> a <==',
+			'leading or trailing whitespace ← 3',
+			'ʦ (LATIN SMALL LETTER TS DIGRAPH) is not part of IPA, '
+			'suggested replacement is t͡s ← 3',
+			'',
+			'==> b <==',
+			'ʦ (LATIN SMALL LETTER TS DIGRAPH) is not part of IPA, '
+			'suggested replacement is t͡s ← 4']))
+
+		state_path = os.path.join(self.temp_dir.name, 'groups.json')
+		for kwargs in [{}, {'counts': True}]:
+			self.core.lint(file_path, group_by='lang', dump_state=state_path, **kwargs)
+			self.assertEqual(self.core.merge([state_path], **kwargs),
+							self.core.lint(file_path, group_by='lang', **kwargs))
+
+		res = self.core.lint(file_path, group_by=0, counts=True, line_offset=10)
+		self.assertIn('p (LATIN SMALL LETTER P) vl bilabial plosive ← '
+					'2 occurrences, 2 lines', res.split('==> b <==')[1])
+
+
+	def test_merge_empty_group(self):
+		file_path = os.path.join(self.temp_dir.name, 'groups.csv')
+		with open(file_path, 'w', encoding='utf-8') as f:
+			f.write('lang,ipa\nb,ʦa\n,ʦa\n')
+
+		res = self.core.lint(file_path, group_by='lang')
+		self.assertTrue(res.startswith('==> (empty) <==\n'))
+		self.assertIn('\n\n==> b <==\n', res)
+
+		state_path = os.path.join(self.temp_dir.name, 'groups.json')
+		self.core.lint(file_path, group_by='lang', dump_state=state_path)
+		self.assertEqual(self.core.merge([state_path]), res)
+
+		with open(state_path, encoding='utf-8') as f:
+			state = json.load(f)
+		for source in state['sources']:  # as written before the relabelling
+			source['heading'] = source['group']
+		with open(state_path, 'w', encoding='utf-8') as f:
+			json.dump(state, f)
+
+		self.assertEqual(self.core.merge([state_path]), res)
+
+
+	def test_merge_group_shards(self):
+		rows = ['b,pa', 'b,ʦa', 'c,pa', 'a,ʦa ', 'c,pata', 'b,pʰa ']
+		full_path = os.path.join(self.temp_dir.name, 'full.csv')
+		with open(full_path, 'w', encoding='utf-8') as f:
+			f.write('lang,ipa\n' + '\n'.join(rows) + '\n')
+
+		res = self.core.lint(full_path, group_by='lang')
+		self.assertEqual([line for line in res.splitlines() if line.startswith('==>')],
+						['==> a <==', '==> b <=='])
+
+		for kwargs in [{}, {'counts': True}]:
+			states = []
+
+			for index, (start, end) in enumerate([(0, 2), (2, 6)]):
+				shard_path = os.path.join(self.temp_dir.name, 's{}.csv'.format(index))
+				with open(shard_path, 'w', encoding='utf-8') as f:
+					f.write('lang,ipa\n' + '\n'.join(rows[start:end]) + '\n')
+
+				states.append(os.path.join(self.temp_dir.name, 's{}.json'.format(index)))
+				self.core.lint(shard_path, group_by='lang', line_offset=start,
+							dump_state=states[-1], **kwargs)
+
+			self.assertEqual(self.core.merge(states, **kwargs),
+							self.core.lint(full_path, group_by='lang', **kwargs))
+
+
+	def test_line_offset(self):
+		res = self.core.lint(self.file_path, linewise=True, line_offset=100)
+		self.assertEqual(res.splitlines()[0], '104 → not in Unicode NFD')
+
+		file_path = os.path.join(self.temp_dir.name, 'test.sqlite')
+		conn = sqlite3.connect(file_path)
+		conn.execute('CREATE TABLE forms (ipa TEXT)')
+		conn.execute('INSERT INTO forms VALUES (?)', ('\u00e9',))
+		conn.commit()
+		conn.close()
+
+		res = self.core.lint(file_path, table='forms', linewise=True,
+							line_offset=100)
+		self.assertEqual(res.splitlines()[0].strip(), '1 → not in Unicode NFD')
+
+
+	def test_read_state(self):
+		file_path = os.path.join(self.temp_dir.name, 'state.json')
+		write_state(file_path, [], ['ipa'])
+
+		with open(file_path, encoding='utf-8') as f:
+			self.assertEqual(json.load(f)['format'], STATE_FORMAT)
+
+		self.assertEqual(read_state(file_path)['profile'], ['ipa'])
+
+		with self.assertRaises(ValueError):
+			read_state(self.file_path)
+
+		with self.assertRaises(ValueError):
+			self.core.merge([file_path, os.path.join(self.temp_dir.name, 'nope')])
@@ -0,0 +1,146 @@
+import json
+import os
+import os.path
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from ipalint.core import Core
+from ipalint.watch import Inotify, Watcher
+
+
+
+TS_ERROR = ('ʦ (LATIN SMALL LETTER TS DIGRAPH) is not part of IPA, '
+			'suggested replacement is t͡s')
+
+
+
+class WatchTestCase(TestCase):
+
+	def setUp(self):
+		self.temp_dir = TemporaryDirectory()
+		self.dir = self.temp_dir.name
+
+	def tearDown(self):
+		self.temp_dir.cleanup()
+
+
+	def _write(self, name, text):
+		"""
+		Writes the given text to the given file in the temp dir and returns
+		the file's path.
+		"""
+		file_path = os.path.join(self.dir, name)
+		os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+		with open(file_path, 'w', encoding='utf-8') as f:
+			f.write(text)
+
+		return file_path
+
+
+	def test_scan(self):
+		a = self._write('a.csv', 'id,ipa\n1,pa\n')
+		b = self._write('sub/b.tsv', 'id\tipa\n1\tpa\n')
+		self._write('c.json', '{}')
+		self._write('.hidden/d.csv', 'ipa\npa\n')
+
+		watcher = Watcher([self.dir], use_inotify=False)
+		self.assertEqual(watcher.scan(), ([a, b], []))
+		self.assertEqual(watcher.scan(), ([], []))
+
+		os.utime(a, ns=(0, 0))
+		self.assertEqual(watcher.scan(), ([], []))
+
+		self._write('a.csv', 'id,ipa\n1,ʦa\n')
+		os.remove(b)
+		self.assertEqual(watcher.scan(), ([a], [b]))
+
+		watcher = Watcher([a, os.path.join(self.dir, 'e.txt')], use_inotify=False)
+		self.assertEqual(watcher.scan(), ([a], []))
+		self.assertEqual(watcher.find_files()[1], [self.dir])
+
+
+	def test_inotify(self):
+		try:
+			inotify = Inotify()
+		except OSError:
+			self.skipTest('inotify is not available')
+
+		try:
+			inotify.set_dirs([self.dir])
+			self.assertFalse(inotify.wait(0))
+
+			self._write('a.csv', 'ipa\npa\n')
+			self.assertTrue(inotify.wait(1))
+			self.assertFalse(inotify.wait(0))
+		finally:
+			inotify.close()
+
+
+	def test_watch(self):
+		a = self._write('a.csv', 'id,ipa\n1,pa\n')
+		b = self._write('b.csv', 'id,ipa\n1,ʦa\n2,ʦa\n')
+
+		reports = Core().watch(self.dir, interval=0.01)
+
+		self.assertEqual(next(reports), (
+			'==> {} <==\n'
+			'{} ← 2,3'.format(b, TS_ERROR)))
+
+		self._write('a.csv', 'id,ipa\n1,pa \n')
+		self.assertEqual(next(reports), (
+			'==> {} <==\n'
+			'leading or trailing whitespace ← 2\n\n'
+			'==> {} <==\n'
+			'{} ← 2,3'.format(a, b, TS_ERROR)))
+
+		os.remove(b)
+		self.assertEqual(next(reports), 'leading or trailing whitespace ← 2')
+
+		self._write('b.csv', 'id,form\n1,pa\n')
+		self.assertIn('Could not lint the file', next(reports))
+
+		reports.close()
+
+
+	def test_scan_deps(self):
+		a = self._write('a-metadata.json', '{}')
+		b = self._write('tables/b.csv', 'ipa\npa\n')
+
+		watcher = Watcher([a], use_inotify=False)
+		self.assertEqual(watcher.scan(), ([a], []))
+
+		watcher.set_deps(a, [b])
+		self.assertEqual(watcher.scan(), ([], []))
+		self.assertEqual(watcher.find_files()[1], [self.dir, os.path.dirname(b)])
+
+		os.utime(b, ns=(0, 0))
+		self.assertEqual(watcher.scan(), ([], []))
+
+		self._write('tables/b.csv', 'ipa\nʦa\n')
+		self.assertEqual(watcher.scan(), ([a], []))
+
+		os.remove(b)
+		self.assertEqual(watcher.scan(), ([a], []))
+		self.assertEqual(watcher.scan(), ([], []))
+
+
+	def test_watch_cldf(self):
+		metadata_path = self._write('Wordlist-metadata.json', json.dumps({
+			'tables': [{'url': 'forms.csv', 'dc:conformsTo':
+				'http://cldf.clld.org/v1.0/terms.rdf#FormTable'}]}))
+		self._write('forms.csv', 'ID,Segments\n1,pa\n')
+
+		reports = Core().watch(metadata_path, col='Segments', interval=0.01)
+		self.assertEqual(next(reports), '')
+
+		self._write('forms.csv', 'ID,Segments\n1,ʦa\n2,ʦa\n')
+		self.assertEqual(next(reports), '{} ← 2,3'.format(TS_ERROR))
+
+		reports.close()
+
+
+	def test_watch_stdin(self):
+		with self.assertRaises(ValueError):
+			next(Core().watch(None))
@@ -0,0 +1,360 @@
+from collections import namedtuple
+
+import hashlib
+import logging
+import os
+import select
+import time
+
+from ipalint.read import ARROW_EXTENSIONS, ODS_EXTENSIONS, PARQUET_EXTENSIONS
+from ipalint.read import TSV_EXTENSIONS, XLSX_EXTENSIONS
+
+
+
+"""
+The extensions of the files that are linted when a dir is watched; files given
+explicitly are linted regardless of their extension.
+"""
+WATCH_EXTENSIONS = ['csv', 'txt'] + TSV_EXTENSIONS \
+					+ PARQUET_EXTENSIONS + ARROW_EXTENSIONS \
+					+ XLSX_EXTENSIONS + ODS_EXTENSIONS
+
+
+
+"""
+The number of seconds between two scans of the watched files if inotify is not
+available. If it is, the files are scanned as soon as an event arrives, and
+anyway every RESCAN_INTERVAL seconds, in case some events are missed (e.g. on
+network file systems).
+"""
+POLL_INTERVAL = 0.5
+RESCAN_INTERVAL = 5
+
+
+
+"""
+The number of seconds to wait for more inotify events after the first one
+before scanning the files, so that the burst of events of a single save (e.g.
+an editor writing a temp file and renaming it) results in a single re-lint.
+"""
+INOTIFY_SETTLE = 0.02
+
+
+
+"""
+The inotify flags (see inotify(7)) of the events of interest: files being
+written, created, deleted and renamed.
+"""
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+
+INOTIFY_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO \
+				| IN_CREATE | IN_DELETE
+
+
+
+"""
+Represents the state of a watched file: its mtime (in ns), size and content
+hash. The hash is only computed if the mtime or the size changes, so that
+touching a file (or saving it unchanged) does not trigger a re-lint.
+"""
+FileSignature = namedtuple('FileSignature', ['mtime', 'size', 'digest'])
+
+
+
+def get_digest(file_path):
+	"""
+	Returns the hex digest of the contents of the given file.
+	"""
+	digest = hashlib.blake2b()
+
+	with open(file_path, 'rb') as f:
+		for chunk in iter(lambda: f.read(2**20), b''):
+			digest.update(chunk)
+
+	return digest.hexdigest()
+
+
+
+class Inotify:
+	"""
+	Thin wrapper around the Linux inotify API, called via ctypes. Only tells
+	whether something has happened in the watched dirs; what exactly is found
+	out by scanning these.
+	"""
+
+	def __init__(self):
+		"""
+		Constructor. Raises OSError if inotify is not available.
+		"""
+		import ctypes
+		import ctypes.util
+
+		self.log = logging.getLogger(__name__)
+
+		try:
+			self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+			self.libc.inotify_init1
+		except (OSError, AttributeError):
+			raise OSError('inotify is not available')
+
+		self.get_errno = ctypes.get_errno
+
+		self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(self.get_errno(), 'Could not init inotify')
+
+		self.dirs = set()
+
+
+	def set_dirs(self, dirs):
+		"""
+		Makes sure that the given dirs are watched. Watches are removed by the
+		kernel when a dir is deleted, so dirs that are gone are forgotten, in
+		order to be watched again should they reappear.
+		"""
+		self.dirs &= set(dirs)
+
+		for dir_path in dirs:
+			if dir_path in self.dirs:
+				continue
+
+			wd = self.libc.inotify_add_watch(self.fd,
+						os.fsencode(dir_path), INOTIFY_MASK)
+			if wd < 0:
+				self.log.debug('Could not watch {}: {}'.format(
+						dir_path, os.strerror(self.get_errno())))
+			else:
+				self.dirs.add(dir_path)
+
+
+	def wait(self, timeout=None):
+		"""
+		Blocks until an event arrives or until the timeout (in seconds)
+		expires. Returns True in the former case.
+		"""
+		if not select.select([self.fd], [], [], timeout)[0]:
+			return False
+
+		self._drain()
+
+		while select.select([self.fd], [], [], INOTIFY_SETTLE)[0]:
+			self._drain()
+
+		return True
+
+
+	def _drain(self):
+		"""
+		Reads and discards the pending events.
+
+		Helper for the wait method.
+		"""
+		try:
+			while os.read(self.fd, 65536):
+				pass
+		except BlockingIOError:
+			pass
+
+
+	def close(self):
+		"""
+		Releases the inotify instance.
+		"""
+		os.close(self.fd)
+
+
+
+class Watcher:
+	"""
+	Watches a set of files and dirs and tells which files have changed since
+	it last looked. Uses inotify where available and polling otherwise.
+	"""
+
+	def __init__(self, paths, interval=POLL_INTERVAL, use_inotify=True):
+		"""
+		Constructor. Expects a [] of file and dir paths; dirs are watched
+		recursively, for files with one of WATCH_EXTENSIONS. The interval is
+		the number of seconds between two scans when polling.
+		"""
+		self.log = logging.getLogger(__name__)
+
+		self.paths = paths
+		self.interval = interval
+
+		self.files = {}  # file path: FileSignature
+		self.deps = {}  # file path: [] of the paths of the files it depends on
+		self.dep_files = {}  # dep file path: FileSignature or None if missing
+
+		self.inotify = None
+		if use_inotify:
+			try:
+				self.inotify = Inotify()
+			except OSError as err:
+				self.log.debug('Polling for changes: {}'.format(err))
+
+
+	def set_deps(self, file_path, dep_paths):
+		"""
+		Sets the files the given watched file depends on, e.g. the tables of a
+		CLDF metadata file; a change to any of these counts as a change to the
+		file itself. The dep files are looked at right away, so that changes
+		are told from the state these are in when the file has been linted.
+		"""
+		self.deps[file_path] = list(dep_paths)
+
+		for dep_path in self.deps[file_path]:
+			try:
+				self.dep_files[dep_path] = self._get_signature(dep_path,
+											self.dep_files.get(dep_path))
+			except OSError:
+				self.dep_files[dep_path] = None
+
+
+	def find_files(self):
+		"""
+		Returns the ([] of files, [] of dirs) tuple of the files to be linted
+		and the dirs that contain these, both sorted. Hidden files and dirs
+		are skipped.
+		"""
+		files = set()
+		dirs = set()
+
+		for path in self.paths:
+			if os.path.isdir(path):
+				for dir_path, dir_names, file_names in os.walk(path):
+					dir_names[:] = [name for name in dir_names
+									if not name.startswith('.')]
+					dirs.add(dir_path)
+
+					for name in file_names:
+						ext = name.rsplit('.', maxsplit=1)[-1].lower()
+						if not name.startswith('.') and ext in WATCH_EXTENSIONS:
+							files.add(os.path.join(dir_path, name))
+
+			else:
+				dir_path = os.path.dirname(path) or os.curdir
+				if os.path.isdir(dir_path):
+					dirs.add(dir_path)
+				if os.path.isfile(path):
+					files.add(path)
+
+		for file_path in files:
+			for dep_path in self.deps.get(file_path, []):
+				dir_path = os.path.dirname(dep_path) or os.curdir
+				if os.path.isdir(dir_path):
+					dirs.add(dir_path)
+
+		return sorted(files), sorted(dirs)
+
+
+	def _get_signature(self, file_path, old=None):
+		"""
+		Returns the FileSignature of the given file, reusing the old one if
+		the file's mtime and size are the same. Raises OSError if the file
+		cannot be read.
+
+		Helper for the scan method.
+		"""
+		stat = os.stat(file_path)
+		if old and old[:2] == (stat.st_mtime_ns, stat.st_size):
+			return old
+
+		return FileSignature(stat.st_mtime_ns, stat.st_size, get_digest(file_path))
+
+
+	def scan(self):
+		"""
+		Looks at the watched files and returns the ([] of changed files, [] of
+		removed files) tuple. New files count as changed. A file is changed if
+		its contents differ from the last scan or if these of a file it depends
+		on do (see set_deps); files that cannot be read are considered removed.
+		"""
+		files, dirs = self.find_files()
+
+		if self.inotify:
+			self.inotify.set_dirs(dirs)
+
+		new_files = {}
+		changed = []
+
+		for file_path in files:
+			old = self.files.get(file_path)
+
+			try:
+				new = self._get_signature(file_path, old)
+			except OSError:
+				continue
+
+			new_files[file_path] = new
+			if old is None or old.digest != new.digest:
+				changed.append(file_path)
+
+		removed = sorted(set(self.files) - set(new_files))
+		self.files = new_files
+
+		self.deps = {file_path: dep_paths
+					for file_path, dep_paths in self.deps.items()
+					if file_path in new_files}
+
+		new_deps = {}
+		changed_deps = set()
+
+		for dep_path in set([path for paths in self.deps.values() for path in paths]):
+			old = self.dep_files.get(dep_path)
+
+			try:
+				new = self._get_signature(dep_path, old)
+			except OSError:
+				new = None
+
+			new_deps[dep_path] = new
+			if getattr(old, 'digest', None) != getattr(new, 'digest', None):
+				changed_deps.add(dep_path)
+
+		self.dep_files = new_deps
+
+		for file_path, dep_paths in self.deps.items():
+			if file_path not in changed and changed_deps.intersection(dep_paths):
+				changed.append(file_path)
+
+		return sorted(changed), removed
+
+
+	def wait(self):
+		"""
+		Blocks until the watched files might have changed.
+		"""
+		if self.inotify:
+			self.inotify.wait(RESCAN_INTERVAL)
+		else:
+			time.sleep(self.interval)
+
+
+	def gen_changes(self):
+		"""
+		Yields a (changed, removed) tuple of [] of file paths each time some
+		of the watched files change, starting with the tuple of all the files.
+		Never stops on its own.
+		"""
+		yield self.scan()
+
+		while True:
+			self.wait()
+
+			changed, removed = self.scan()
+			if changed or removed:
+				yield changed, removed
+
+
+	def close(self):
+		"""
+		Stops watching.
+		"""
+		if self.inotify:
+			self.inotify.close()
+			self.inotify = None
@@ -42,9 +42,13 @@ setup(
 	keywords = 'IPA lint',
 
 	packages = find_packages(),
-	package_data = {'ipalint': ['data/*', 'tests/fixtures/*']},
+	package_data = {'ipalint': ['data/*', 'tests/fixtures/*', 'tests/fixtures/cldf/*']},
 
 	install_requires = [],
+	extras_require = {
+		'arrow': ['pyarrow'],
+		'spreadsheet': ['openpyxl', 'odfpy']
+	},
 
 	test_suite = 'ipalint.tests',
 	tests_require = ['hypothesis >= 3.5'],